@@ -1,36 +1,133 @@
 from abc import ABC, abstractmethod
+from functools import cached_property
+from statistics import NormalDist
+from typing import Sequence
+
 import numpy as np
-from scipy.stats import norm
-from config import HISTO_DAYS, LEAD_TIME, MC_SIMS, DEFAULT_SERVICE_LEVEL
-from safety_stock_experimentations.demand_distribution import DailyDemandDistribution
+from config import (
+    HISTO_DAYS,
+    LEAD_TIME,
+    MC_ANALYTIC,
+    MC_SIMS,
+    MC_REPLICATES,
+    MC_SAMPLING,
+    DEFAULT_SERVICE_LEVEL,
+    SIM_DAYS,
+)
+from safety_stock_experimentations.demand_distribution import (
+    DailyDemandDistribution,
+    DemandEnvironment,
+    mean_demand_array,
+    realised_demand_array,
+    sample_demand_distribution,
+)
+from safety_stock_experimentations.lead_time_demand import (
+    PERIODS_PER_CHUNK,
+    SAMPLING_MODES,
+    lead_time_days,
+    lead_time_demand_from_uniforms,
+    lead_time_demand_quantiles,
+    lead_time_dimension,
+    lead_time_uniforms,
+)
+
+
+def rolling_mean_std(values: np.ndarray, window: int, start: int, stop: int):
+    # mean and sample std of values[..., t - window:t] for every t in [start, stop),
+    # along the last axis, from prefix sums and sums of squares so each day costs O(1)
+    offset = values.mean(axis=-1, keepdims=True)  # centring keeps the sum-of-squares difference well conditioned
+    centred = values - offset
+    padding = np.zeros((*values.shape[:-1], 1))
+    cumulative_sum = np.concatenate((padding, np.cumsum(centred, axis=-1)), axis=-1)
+    cumulative_sum_sq = np.concatenate((padding, np.cumsum(centred**2, axis=-1)), axis=-1)
+
+    time_periods = np.arange(start, stop)
+    window_sum = cumulative_sum[..., time_periods] - cumulative_sum[..., time_periods - window]
+    window_sum_sq = (
+        cumulative_sum_sq[..., time_periods] - cumulative_sum_sq[..., time_periods - window]
+    )
+    variance = (window_sum_sq - window_sum**2 / window) / (window - 1)
+    return window_sum / window + offset, np.sqrt(np.maximum(variance, 0.0))
 
 
 class Agent(ABC):
-    def __init__(self, daily_demand_distributions: list[DailyDemandDistribution], service_level: float = DEFAULT_SERVICE_LEVEL):
+    # service_level may be a single target or a sequence of targets; with a
+    # sequence, reorder points carry a leading axis with one entry per target.
+    # random_streams (e.g. sweep.CommonRandomNumbers) gives agents that sample a
+    # dedicated generator per day instead of the global NumPy state.
+    def __init__(
+        self,
+        daily_demand_distributions: list[DailyDemandDistribution],
+        service_level: float | Sequence[float] = DEFAULT_SERVICE_LEVEL,
+        random_streams=None,
+    ):
         self._daily_demand_distributions = daily_demand_distributions
         self.service_level = service_level
+        self.random_streams = random_streams
 
     @abstractmethod
-    def compute_reorder_point(self, time_period) -> float:
+    def compute_reorder_point(self, time_period) -> float | np.ndarray:
         pass
 
+    def compute_reorder_point_schedule(self) -> np.ndarray | None:
+        # reorder points for days HISTO_DAYS..SIM_DAYS - 1 in one batch,
+        # None for agents that can only be evaluated day by day
+        return None
+
+    @property
+    def service_levels(self) -> np.ndarray:
+        return np.atleast_1d(np.asarray(self.service_level, dtype=float))
+
+    @property
+    def has_multiple_service_levels(self) -> bool:
+        return np.ndim(self.service_level) > 0
+
+    @property
+    def _safety_factors(self) -> np.ndarray:
+        # stdlib inverse normal CDF, so importing the agents does not load scipy.stats
+        return np.array([NormalDist().inv_cdf(level) for level in self.service_levels])
+
+    def reorder_point_standard_errors(self) -> np.ndarray:
+        # mean standard error of the reorder points per service level, NaN for
+        # agents whose reorder points are not estimated from samples
+        return np.full(len(self.service_levels), np.nan)
+
+    def _for_service_levels(self, reorder_points: np.ndarray):
+        # reorder_points has a leading service-level axis, dropped for a single target
+        return reorder_points if self.has_multiple_service_levels else reorder_points[0]
+
+    @cached_property
+    def _realised_demand(self) -> np.ndarray:
+        return realised_demand_array(self._daily_demand_distributions).astype(float)
+
+    @cached_property
+    def _mean_demand(self) -> np.ndarray:
+        return mean_demand_array(self._daily_demand_distributions)
+
     def get_historical_demand(self, time_period):
         start_time = time_period - HISTO_DAYS
-        return [
-            d.realised_demand
-            for d in self._daily_demand_distributions[start_time:time_period]
-        ]
+        return self._realised_demand[start_time:time_period]
 
 
 class BaseAgent(Agent):
     def compute_reorder_point(self, time_period):
         historical_demand = self.get_historical_demand(time_period)
         demand_mean = np.mean(historical_demand)
-        return demand_mean * LEAD_TIME
+        return self._for_service_levels(
+            np.full(len(self.service_levels), demand_mean * LEAD_TIME)
+        )
+
+    def compute_reorder_point_schedule(self) -> np.ndarray:
+        demand_mean, _ = rolling_mean_std(
+            self._realised_demand, HISTO_DAYS, HISTO_DAYS, SIM_DAYS
+        )
+        return self._for_service_levels(
+            np.tile(demand_mean * LEAD_TIME, (len(self.service_levels), 1))
+        )
 
 
 class SafetyStockAgent(Agent):
-    def compute_reorder_point(self, time_period) -> float:
+    def compute_reorder_point(self, time_period) -> float | np.ndarray:
         historical_demand = self.get_historical_demand(time_period)
 
         demand_mean = np.mean(historical_demand)
@@ -39,57 +136,224 @@ class SafetyStockAgent(Agent):
         )  # sample standard deviation
 
         safety_stock = (
-            norm.ppf(self.service_level) * demand_std * np.sqrt(LEAD_TIME)
+            self._safety_factors * demand_std * np.sqrt(LEAD_TIME)
         )
-        return demand_mean * LEAD_TIME + safety_stock
+        return self._for_service_levels(demand_mean * LEAD_TIME + safety_stock)
 
+    def compute_reorder_point_schedule(self) -> np.ndarray:
+        demand_mean, demand_std = rolling_mean_std(
+            self._realised_demand, HISTO_DAYS, HISTO_DAYS, SIM_DAYS
+        )
+        safety_stock = (
+            self._safety_factors[:, None] * demand_std * np.sqrt(LEAD_TIME)
+        )
+        return self._for_service_levels(demand_mean * LEAD_TIME + safety_stock)
 
-class ForecastAgent(Agent):
-    def __init__(self, daily_demand_distribution, service_level):
-        super().__init__(daily_demand_distribution, service_level)
 
-    def compute_reorder_point(self, time_period) -> float:
-        forecast_demand_sum = 0
+class ForecastAgent(Agent):
+    def __init__(self, daily_demand_distribution, service_level, random_streams=None):
+        super().__init__(daily_demand_distribution, service_level, random_streams)
 
+    def compute_reorder_point(self, time_period) -> float | np.ndarray:
         max_index = len(self._daily_demand_distributions) - 1
 
-        for t in range(time_period + 1, time_period + 1 + LEAD_TIME):
-            index = min(t, max_index)
-            forecast_demand_sum += self._daily_demand_distributions[
-                index
-            ].mean_demand_distribution
+        forecast_indices = np.minimum(
+            np.arange(time_period + 1, time_period + 1 + LEAD_TIME), max_index
+        )
+        forecast_demand_sum = self._mean_demand[forecast_indices].sum()
 
         start_time = time_period - HISTO_DAYS
-        forecast_errors = [
-            self._daily_demand_distributions[
-                min(day, max_index)
-            ].mean_demand_distribution
-            - self._daily_demand_distributions[min(day, max_index)].realised_demand
-            for day in range(start_time, time_period)
-        ]
+        forecast_errors = self._forecast_errors[start_time:time_period]
 
         forecast_error_std = np.std(forecast_errors, ddof=1)
 
         safety_stock = (
-            norm.ppf(self.service_level)
+            self._safety_factors
             * forecast_error_std
             * np.sqrt(LEAD_TIME)
         )
 
-        return forecast_demand_sum + safety_stock
+        return self._for_service_levels(forecast_demand_sum + safety_stock)
 
+    def compute_reorder_point_schedule(self) -> np.ndarray:
+        max_index = len(self._daily_demand_distributions) - 1
 
-class MonteCarloAgent(Agent):
-    def __init__(self, daily_demand_distribution, service_level):
-        super().__init__(daily_demand_distribution, service_level)
-
-    def compute_reorder_point(self, time_period) -> float:
-        samples = self._sample_lead_time_demand(
-            time_period=time_period,
-            daily_demand_distribution=self._daily_demand_distributions,
-            mc_sims=MC_SIMS,
+        time_periods = np.arange(HISTO_DAYS, SIM_DAYS)
+        forecast_indices = np.minimum(
+            time_periods[:, None] + np.arange(1, LEAD_TIME + 1), max_index
+        )
+        forecast_demand_sum = self._mean_demand[forecast_indices].sum(axis=1)
+
+        _, forecast_error_std = rolling_mean_std(
+            self._forecast_errors, HISTO_DAYS, HISTO_DAYS, SIM_DAYS
+        )
+        safety_stock = (
+            self._safety_factors[:, None]
+            * forecast_error_std
+            * np.sqrt(LEAD_TIME)
         )
-        return float(np.quantile(samples, self.service_level))
+        return self._for_service_levels(forecast_demand_sum + safety_stock)
+
+    @cached_property
+    def _forecast_errors(self) -> np.ndarray:
+        return self._mean_demand - self._realised_demand
+
+
+class MonteCarloAgent(Agent):
+    def __init__(
+        self,
+        daily_demand_distribution,
+        service_level,
+        random_streams=None,
+        vectorized: bool = True,
+        analytic: bool = MC_ANALYTIC,
+        sampling: str = MC_SAMPLING,
+        mc_sims: int = MC_SIMS,
+        replicates: int = MC_REPLICATES,
+    ):
+        super().__init__(daily_demand_distribution, service_level, random_streams)
+        # vectorized=False keeps the original per-sample ciw path for comparison;
+        # analytic=True replaces sampling by exact lead-time quantiles whenever the
+        # demand is a DemandEnvironment of Gamma/Poisson components. Otherwise
+        # mc_sims samples per day are drawn as `replicates` independent sets with
+        # the given sampling mode ("random", or "sobol", "antithetic" and
+        # "latin_hypercube" by inversion of a DemandEnvironment), and the spread
+        # of the per-set quantiles gives the standard error of the reorder point.
+        # Exact quantiles are not sampled, so the other modes need analytic=False.
+        if sampling not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode {sampling!r}, expected one of {SAMPLING_MODES}")
+        if analytic and sampling != "random":
+            raise ValueError(
+                f"{sampling!r} sampling needs analytic=False (MC_ANALYTIC = False in config.py), "
+                "analytic reorder points are not sampled"
+            )
+        self.vectorized = vectorized
+        self.analytic = analytic
+        self.sampling = sampling
+        self.mc_sims = mc_sims
+        self.replicates = replicates
+        self.quantile_standard_errors = {}  # time period -> per service level, sampled days only
+        self._analytic_quantile_chunks = {}  # aligned block of periods -> (service levels, periods)
+
+    @property
+    def _uses_analytic_quantiles(self) -> bool:
+        return self.analytic and isinstance(self._daily_demand_distributions, DemandEnvironment)
+
+    def compute_reorder_point(self, time_period) -> float | np.ndarray:
+        if self._uses_analytic_quantiles:
+            # day-by-day callers get the quantiles of the whole block of periods,
+            # which shares one grid, at the cost of one convolution pass
+            chunk, position = divmod(time_period, PERIODS_PER_CHUNK)
+            if chunk not in self._analytic_quantile_chunks:
+                self._analytic_quantile_chunks[chunk] = lead_time_demand_quantiles(
+                    self._daily_demand_distributions,
+                    np.arange(chunk * PERIODS_PER_CHUNK, (chunk + 1) * PERIODS_PER_CHUNK),
+                    self.service_levels,
+                )
+            reorder_points = self._analytic_quantile_chunks[chunk][:, position]
+        else:
+            reorder_points, _ = self.estimate_reorder_point(time_period)
+        if self.has_multiple_service_levels:
+            return reorder_points
+        return float(reorder_points[0])
+
+    def compute_reorder_point_schedule(self) -> np.ndarray | None:
+        time_periods = np.arange(HISTO_DAYS, SIM_DAYS)
+        if self._uses_analytic_quantiles:
+            return self._for_service_levels(
+                lead_time_demand_quantiles(self._daily_demand_distributions, time_periods, self.service_levels)
+            )
+        if self.sampling == "random":
+            return None  # drawn day by day, from one generator per day with random_streams
+        reorder_points, _ = self.estimate_reorder_points(time_periods)
+        return self._for_service_levels(reorder_points)
+
+    def estimate_reorder_point(self, time_period) -> tuple[np.ndarray, np.ndarray]:
+        reorder_points, standard_errors = self.estimate_reorder_points(np.array([time_period]))
+        return reorder_points[:, 0], standard_errors[:, 0]
+
+    def estimate_reorder_points(self, time_periods: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # sampled lead-time quantiles and their standard errors, both shaped
+        # (service levels, periods) and recorded in quantile_standard_errors;
+        # one set of samples serves every service-level target
+        replicate_samples = self._replicate_samples(time_periods)
+        reorder_points = np.quantile(np.concatenate(replicate_samples, axis=1), self.service_levels, axis=1)
+        if len(replicate_samples) < 2:
+            standard_errors = np.full(reorder_points.shape, np.nan)
+        else:
+            replicate_quantiles = np.array(
+                [np.quantile(samples, self.service_levels, axis=1) for samples in replicate_samples]
+            )
+            standard_errors = replicate_quantiles.std(axis=0, ddof=1) / np.sqrt(len(replicate_samples))
+        self.quantile_standard_errors.update(zip(np.asarray(time_periods).tolist(), standard_errors.T))
+        return reorder_points, standard_errors
+
+    def reorder_point_standard_errors(self) -> np.ndarray:
+        if not self.quantile_standard_errors:
+            return super().reorder_point_standard_errors()
+        return np.mean(list(self.quantile_standard_errors.values()), axis=0)
+
+    def _replicate_samples(self, time_periods: np.ndarray) -> list[np.ndarray]:
+        # (periods, samples) lead-time demand per replicate
+        if self.sampling == "random":
+            # i.i.d. draws per period, split into replicates afterwards
+            sample_lead_time_demand = (
+                self._sample_lead_time_demand_vectorized
+                if self.vectorized
+                else self._sample_lead_time_demand
+            )
+            samples = np.array(
+                [
+                    sample_lead_time_demand(
+                        time_period=time_period,
+                        daily_demand_distribution=self._daily_demand_distributions,
+                        mc_sims=self.mc_sims,
+                    )
+                    for time_period in time_periods
+                ],
+                dtype=float,
+            )
+            return np.array_split(samples, self.replicates, axis=1)
+
+        environment = self._daily_demand_distributions
+        if not isinstance(environment, DemandEnvironment):
+            raise TypeError(f"{self.sampling!r} sampling needs a DemandEnvironment")
+        # with random_streams, the point sets of every period are shared by the
+        # agents sharing those streams
+        rng = np.random if self.random_streams is None else self.random_streams.generator(int(time_periods[0]))
+        days = lead_time_days(environment, time_periods)
+        dimension = lead_time_dimension(environment)
+        # independently randomised point sets, so their quantiles are i.i.d.
+        replicate_sizes = np.diff(np.linspace(0, self.mc_sims, self.replicates + 1).astype(int))
+        return [
+            lead_time_demand_from_uniforms(
+                environment,
+                days,
+                lead_time_uniforms(self.sampling, int(n_samples), dimension, rng, n_sets=len(days)),
+            )
+            for n_samples in replicate_sizes
+        ]
+
+    def _sample_lead_time_demand_vectorized(self, time_period, daily_demand_distribution, mc_sims):
+        # with random_streams, the draws for a day are the same for every agent
+        # and service level sharing those streams
+        rng = np.random if self.random_streams is None else self.random_streams.generator(time_period)
+        max_index = len(daily_demand_distribution) - 1
+        if isinstance(daily_demand_distribution, DemandEnvironment):
+            lead_time_days = np.minimum(
+                np.arange(time_period + 1, time_period + 1 + LEAD_TIME), max_index
+            )
+            return daily_demand_distribution.sample(
+                np.broadcast_to(lead_time_days, (mc_sims, LEAD_TIME)), rng
+            ).sum(axis=1)
+
+        samples = np.zeros(mc_sims)
+        for j in range(1, LEAD_TIME + 1):
+            index = min(time_period + j, max_index)
+            samples += sample_demand_distribution(
+                daily_demand_distribution[index].demand_distribution, mc_sims, rng
+            )
+        return samples
 
     def _sample_lead_time_demand(self, time_period, daily_demand_distribution, mc_sims):
         samples = []
@@ -0,0 +1,127 @@
+import numpy as np
+
+from safety_stock_experimentations.config import (
+    BASE_STOCK,
+    HISTO_DAYS,
+    LEAD_TIME,
+    SIM_DAYS,
+    WRITE_OFF_RATE,
+)
+from safety_stock_experimentations.demand_distribution import realised_demand_array
+from safety_stock_experimentations.performance_tracker import (
+    DAILY_METRIC_DTYPES,
+    TRACKED_ORDER_OFFSETS,
+    performance_summary_from_columns,
+)
+from safety_stock_experimentations.profiling import NULL_PHASE_TIMER
+
+
+def reorder_point_schedule(agent) -> np.ndarray:
+    # shape (service levels, days)
+    schedule = agent.compute_reorder_point_schedule()
+    if schedule is None:
+        schedule = np.array(
+            [np.atleast_1d(agent.compute_reorder_point(day)) for day in range(HISTO_DAYS, SIM_DAYS)]
+        ).T
+    return np.atleast_2d(schedule)
+
+
+class BatchSimulator:
+    # Struct-of-arrays counterpart of Simulator: every (agent, environment,
+    # service level) combination is one row and all rows advance through the
+    # horizon together, day by day. Summaries are returned per agent in order,
+    # one per service level of that agent.
+    def __init__(self, agents, environments, phase_timer=NULL_PHASE_TIMER):
+        if len(agents) != len(environments):
+            raise ValueError("agents and environments must be paired one to one")
+        self.agents = agents
+        self.environments = environments
+        self.phase_timer = phase_timer
+
+    def run_simulation(self, reorder_point_schedules=None) -> list[dict]:
+        # callers that seed each agent's random state pass the schedules they
+        # computed, one per agent, see reorder_point_schedule
+        phase = self.phase_timer.phase
+        if reorder_point_schedules is None:
+            reorder_point_schedules = []
+            for agent in self.agents:
+                with phase(f"reorder_point[{type(agent).__name__}]"):
+                    reorder_point_schedules.append(reorder_point_schedule(agent))
+        reorder_points = np.concatenate(reorder_point_schedules)
+        demand = np.concatenate(
+            [
+                np.tile(
+                    realised_demand_array(environment)[:SIM_DAYS],
+                    (len(agent.service_levels), 1),
+                )
+                for agent, environment in zip(self.agents, self.environments)
+            ]
+        )
+        n_runs = len(reorder_points)
+
+        inventory = np.full(n_runs, BASE_STOCK, dtype=float)
+        # order pipeline as a ring buffer indexed by arrival_day % (LEAD_TIME + 1)
+        pipeline = np.zeros((n_runs, LEAD_TIME + 1))
+        in_transit = np.zeros(n_runs)
+
+        tracked_days = [
+            day
+            for day in range(HISTO_DAYS, SIM_DAYS)
+            if not ((day < HISTO_DAYS + LEAD_TIME + 2) | (day > SIM_DAYS - LEAD_TIME))
+        ]
+        n_tracked = len(tracked_days)
+        # (runs, tracked days) per metric, so each run's row is a contiguous column
+        tracked = {
+            name: np.zeros((n_runs, n_tracked), dtype=dtype)
+            for name, dtype in DAILY_METRIC_DTYPES.items()
+        }
+        tracked["day"][:] = tracked_days
+
+        track_index = 0
+        for day in range(HISTO_DAYS, SIM_DAYS):
+            demand_quantity = demand[:, day]
+
+            with phase("deliveries"):
+                arrival_slot = day % (LEAD_TIME + 1)
+                arrived = pipeline[:, arrival_slot].copy()
+                pipeline[:, arrival_slot] = 0
+                in_transit -= arrived
+                inventory += arrived
+
+            fulfilled_demand = np.minimum(demand_quantity, inventory)
+            inventory -= fulfilled_demand
+
+            with phase("write_offs"):
+                daily_writeoff = inventory * WRITE_OFF_RATE
+                inventory -= daily_writeoff
+
+            with phase("order_placement"):
+                reorder_point = reorder_points[:, day - HISTO_DAYS]
+                expected_inventory = inventory + in_transit
+                order_quantity = np.where(
+                    expected_inventory <= reorder_point, reorder_point - expected_inventory, 0.0
+                )
+                pipeline[:, (day + LEAD_TIME) % (LEAD_TIME + 1)] += order_quantity
+                in_transit += order_quantity
+
+            if track_index < n_tracked and day == tracked_days[track_index]:
+                with phase("performance_tracking"):
+                    tracked["demand"][:, track_index] = demand_quantity
+                    tracked["fulfilled_demand"][:, track_index] = fulfilled_demand
+                    tracked["write_offs"][:, track_index] = daily_writeoff
+                    tracked["inventory"][:, track_index] = inventory
+                    tracked["is_stockout_day"][:, track_index] = fulfilled_demand < demand_quantity
+                    for offset in TRACKED_ORDER_OFFSETS:
+                        if offset <= LEAD_TIME:
+                            tracked[f"order_t+{offset}"][:, track_index] = pipeline[
+                                :, (day + offset) % (LEAD_TIME + 1)
+                            ]
+                track_index += 1
+
+        with phase("performance_tracking"):
+            return [
+                performance_summary_from_columns(
+                    {name: column[run] for name, column in tracked.items()}
+                )
+                for run in range(n_runs)
+            ]
@@ -0,0 +1,236 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from pathlib import Path
+from datetime import datetime, timezone
+
+import ciw
+import numpy as np
+import pandas as pd
+
+from safety_stock_experimentations.agent import (
+    BaseAgent,
+    ForecastAgent,
+    MonteCarloAgent,
+    SafetyStockAgent,
+)
+from safety_stock_experimentations.catalogue import run_catalogue, synthetic_catalogue
+from safety_stock_experimentations.config import BENCHMARK_BASELINE_FILE, HISTO_DAYS, RESULTS_DIR, SIM_DAYS
+from safety_stock_experimentations.demand_distribution import (
+    GammaGammaHighVariance,
+    GammaPoisson,
+    SingleGammaLowVariance,
+)
+from safety_stock_experimentations.order_processor import OrderProcessor
+from safety_stock_experimentations.simulation_plots import SimulationPlots
+from safety_stock_experimentations.simulator import Simulator
+from safety_stock_experimentations.sweep import SweepExecutor
+
+BENCHMARK_SEED = 7
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.20  # flag a regression when the median is 20% slower
+REORDER_POINT_DAYS = 30  # days of compute_reorder_point timed per agent
+
+BUILDERS = {
+    "GammaPoisson": GammaPoisson,
+    "GammaGammaHighVariance": GammaGammaHighVariance,
+    "SingleGammaLowVariance": SingleGammaLowVariance,
+}
+AGENTS = {
+    "BaseAgent": BaseAgent,
+    "SafetyStockAgent": SafetyStockAgent,
+    "ForecastAgent": ForecastAgent,
+    "MonteCarloAgent": MonteCarloAgent,
+}
+SWEEP_ENVIRONMENT_CONFIGS = {
+    0: {"name": "90/10 Gamma/Poisson", "class": GammaPoisson},
+    2: {"name": "Gamma", "class": SingleGammaLowVariance},
+}
+SWEEP_AGENT_CONFIGS = {
+    0: {"name": "Historical Demand Agent", "class": BaseAgent},
+    1: {"name": "Safety Stock Agent", "class": SafetyStockAgent},
+    2: {"name": "Forecast Agent", "class": ForecastAgent},
+    3: {"name": "Monte Carlo Agent", "class": MonteCarloAgent},
+}
+SWEEP_SERVICE_LEVELS = [0.90, 0.95, 0.98]
+SWEEP_TRIALS = 2
+CATALOGUE_SKUS = 4096
+
+
+def _seed():
+    np.random.seed(BENCHMARK_SEED)
+    ciw.seed(BENCHMARK_SEED)
+
+
+def _environment():
+    _seed()
+    return GammaPoisson().build_environment()
+
+
+def _simulator(agent_class):
+    environment = _environment()
+    return Simulator(agent_class(environment, 0.95), environment)
+
+
+def _order_processor_operations():
+    order_processor = OrderProcessor()
+    for day in range(HISTO_DAYS, SIM_DAYS):
+        order_processor.manage_order(day)
+        order_processor.get_incoming_orders(day)
+        order_processor.place_order(day, 100)
+        for offset in (1, 2, 3):
+            order_processor.get_order_at_date(day + offset)
+
+
+def _sweep_summaries():
+    _seed()
+    return pd.DataFrame(
+        SweepExecutor(
+            SWEEP_ENVIRONMENT_CONFIGS,
+            SWEEP_AGENT_CONFIGS,
+            SWEEP_SERVICE_LEVELS,
+            n_trials=SWEEP_TRIALS,
+            max_workers=1,
+        ).run()
+    )
+
+
+@contextmanager
+def _catalogue_file() -> Iterator[Path]:
+    # removed with its summaries once the repeat is timed
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "catalogue.parquet"
+        synthetic_catalogue(CATALOGUE_SKUS, seed=BENCHMARK_SEED).to_parquet(path, index=False)
+        yield path
+
+
+def benchmark_cases() -> dict:
+    # name -> (setup, timed function of the setup's result); a setup that
+    # returns a context manager is entered around the timing and passes on
+    # what it yields
+    cases = {}
+    for name, builder_class in BUILDERS.items():
+        cases[f"builder.execute[{name}]"] = (
+            builder_class,
+            lambda builder: builder.execute(),
+        )
+        cases[f"builder.build_environment[{name}]"] = (
+            builder_class,
+            lambda builder: builder.build_environment(),
+        )
+
+    for name, agent_class in AGENTS.items():
+        cases[f"agent.compute_reorder_point[{name}]"] = (
+            lambda agent_class=agent_class: agent_class(_environment(), 0.95),
+            lambda agent: [
+                agent.compute_reorder_point(day)
+                for day in range(HISTO_DAYS, HISTO_DAYS + REORDER_POINT_DAYS)
+            ],
+        )
+        cases[f"simulator.run_simulation[{name}]"] = (
+            lambda agent_class=agent_class: _simulator(agent_class),
+            lambda simulator: simulator.run_simulation(),
+        )
+
+    cases["order_processor.horizon"] = (lambda: None, lambda _: _order_processor_operations())
+    cases["simulation_plots.create_daily_metrics_df"] = (
+        lambda: SimulationPlots(_sweep_summaries()),
+        lambda plots: plots._create_daily_metrics_df(),
+    )
+    cases["sweep.end_to_end"] = (lambda: None, lambda _: _sweep_summaries())
+    cases[f"catalogue.run[{CATALOGUE_SKUS} SKUs]"] = (
+        _catalogue_file,
+        lambda path: run_catalogue(path, path.with_name("summaries.parquet"), seed=BENCHMARK_SEED),
+    )
+    return cases
+
+
+def run_benchmarks(repeat: int = DEFAULT_REPEAT, selected: list[str] | None = None) -> dict:
+    results = {}
+    for name, (setup, function) in benchmark_cases().items():
+        if selected and not any(pattern in name for pattern in selected):
+            continue
+        timings = []
+        for _ in range(repeat):
+            _seed()
+            state = setup()
+            with state if isinstance(state, AbstractContextManager) else nullcontext(state) as state:
+                start = time.perf_counter()
+                function(state)
+                timings.append(time.perf_counter() - start)
+        results[name] = {
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "repeat": repeat,
+        }
+        print(f"{name:<55} median {results[name]['median'] * 1000:10.2f} ms")
+
+    return {
+        "metadata": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+        },
+        "benchmarks": results,
+    }
+
+
+def compare_benchmarks(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    # returns the names of benchmarks whose median slowed down by more than threshold
+    regressions = []
+    for name, current_result in current["benchmarks"].items():
+        baseline_result = baseline["benchmarks"].get(name)
+        if baseline_result is None:
+            print(f"{name:<55} new")
+            continue
+        ratio = current_result["median"] / baseline_result["median"]
+        status = "REGRESSION" if ratio > 1 + threshold else "ok"
+        if status == "REGRESSION":
+            regressions.append(name)
+        print(f"{name:<55} {ratio:6.2f}x baseline  {status}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the simulation hot paths")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="time the hot paths and write a JSON baseline")
+    run_parser.add_argument("--output", default=str(Path(RESULTS_DIR) / BENCHMARK_BASELINE_FILE))
+    run_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run_parser.add_argument("--select", nargs="*", help="only run benchmarks containing these names")
+
+    compare_parser = subparsers.add_parser("compare", help="rerun and compare against a baseline")
+    compare_parser.add_argument("baseline", nargs="?", default=str(Path(RESULTS_DIR) / BENCHMARK_BASELINE_FILE))
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    compare_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    compare_parser.add_argument("--select", nargs="*", help="only run benchmarks containing these names")
+    compare_parser.add_argument("--output", help="also write the new results to this file")
+
+    args = parser.parse_args(argv)
+    results = run_benchmarks(repeat=args.repeat, selected=args.select)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.command == "compare":
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare_benchmarks(baseline, results, threshold=args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
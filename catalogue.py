@@ -0,0 +1,311 @@
+import argparse
+import os
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from statistics import NormalDist
+from typing import TYPE_CHECKING, Iterator
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from safety_stock_experimentations.agent import rolling_mean_std
+from safety_stock_experimentations.config import (
+    BASE_STOCK,
+    CATALOGUE_CHUNK_SIZE,
+    DEFAULT_SERVICE_LEVEL,
+    HISTO_DAYS,
+    LEAD_TIME,
+    SIM_DAYS,
+    SWEEP_SEED,
+    WRITE_OFF_RATE,
+)
+from safety_stock_experimentations.demand_distribution_parameters import (
+    GammaParameterRange,
+    PoissonParameterRange,
+)
+from safety_stock_experimentations.seasonality import (
+    SeasonalityCurves,
+    SeasonalityProfile,
+    default_seasonality_profile,
+    load_seasonality_curves,
+    load_seasonality_profile,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# catalogue column -> default, None for required columns. Daily demand of a SKU
+# is Gamma(gamma_shape, gamma_scale * seasonality) with probability
+# 1 - poisson_weight and Poisson(poisson_rate) otherwise, like GammaPoisson;
+# seasonality_strength scales the deviation of the seasonality multipliers from 1,
+# and seasonality_curve names a per-SKU curve of the run's SeasonalityCurves
+# applied on top of the profile ("" for none)
+CATALOGUE_COLUMNS = {
+    "sku": None,
+    "gamma_shape": None,
+    "gamma_scale": None,
+    "poisson_rate": 0.0,
+    "poisson_weight": 0.0,
+    "seasonality_strength": 1.0,
+    "seasonality_curve": "",
+    "lead_time": LEAD_TIME,
+    "service_level": DEFAULT_SERVICE_LEVEL,
+}
+
+
+@dataclass
+class CatalogueRunReport:
+    output_path: Path
+    n_skus: int
+    n_chunks: int
+    seconds: float
+
+    @property
+    def sku_days(self) -> int:
+        return self.n_skus * (SIM_DAYS - HISTO_DAYS)
+
+    @property
+    def sku_days_per_second(self) -> float:
+        return self.sku_days / self.seconds if self.seconds > 0 else float("inf")
+
+
+def synthetic_catalogue(
+    n_skus: int,
+    gamma_parameter_range: GammaParameterRange = GammaParameterRange(),
+    poisson_parameter_range: PoissonParameterRange = PoissonParameterRange(),
+    seed: int = SWEEP_SEED,
+) -> "pd.DataFrame":
+    # SKUs with parameters drawn from the single-product parameter ranges
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "sku": [f"SKU-{index:07d}" for index in range(n_skus)],
+            "gamma_shape": rng.uniform(gamma_parameter_range.shape_min, gamma_parameter_range.shape_max, n_skus),
+            "gamma_scale": rng.uniform(gamma_parameter_range.scale_min, gamma_parameter_range.scale_max, n_skus),
+            "poisson_rate": rng.uniform(poisson_parameter_range.rate_min, poisson_parameter_range.rate_max, n_skus),
+            "poisson_weight": rng.choice([0.0, 0.1], n_skus),
+            "seasonality_strength": rng.uniform(0.0, 1.0, n_skus),
+            "lead_time": rng.integers(1, 2 * LEAD_TIME + 1, n_skus),
+            "service_level": rng.choice([0.90, 0.95, 0.98], n_skus),
+        }
+    )
+
+
+def read_catalogue(path: str | os.PathLike, chunk_size: int = CATALOGUE_CHUNK_SIZE) -> Iterator["pd.DataFrame"]:
+    # yields the catalogue in chunks of at most chunk_size SKUs, with defaults
+    # filled in; only one chunk is held in memory
+    import pandas as pd
+
+    path = Path(path)
+    if path.suffix == ".parquet":
+        chunks = (
+            batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size)
+        )
+    elif path.suffix == ".csv":
+        chunks = pd.read_csv(path, chunksize=chunk_size, dtype={"seasonality_curve": str})
+    else:
+        raise ValueError(f"Unsupported catalogue format {path.suffix!r}, expected .csv or .parquet")
+    for chunk in chunks:
+        yield _complete_catalogue_chunk(chunk.reset_index(drop=True))
+
+
+def _complete_catalogue_chunk(chunk: "pd.DataFrame") -> "pd.DataFrame":
+    missing = [column for column, default in CATALOGUE_COLUMNS.items() if default is None and column not in chunk]
+    if missing:
+        raise ValueError(f"Catalogue is missing required columns {missing}")
+    for column, default in CATALOGUE_COLUMNS.items():
+        if column not in chunk:
+            chunk[column] = default
+        elif default is not None:
+            chunk[column] = chunk[column].fillna(default)
+    if (chunk["lead_time"] < 1).any():
+        raise ValueError("lead_time must be at least 1 day")
+    if not chunk["service_level"].between(0, 1, inclusive="neither").all():
+        raise ValueError("service_level must lie strictly between 0 and 1")
+    return chunk
+
+
+def sample_catalogue_demand(chunk: "pd.DataFrame", seasonality_multipliers: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    # (SKUs, days) realised demand, truncated to integers like DemandEnvironment;
+    # seasonality_multipliers is one (days,) vector or a (SKUs, days) row per SKU
+    n_skus, n_days = len(chunk), seasonality_multipliers.shape[-1]
+    strength = chunk["seasonality_strength"].to_numpy(float)[:, None]
+    scale = chunk["gamma_scale"].to_numpy(float)[:, None] * (1 + strength * (seasonality_multipliers - 1))
+    demand = rng.gamma(chunk["gamma_shape"].to_numpy(float)[:, None], scale, size=(n_skus, n_days))
+
+    poisson_weight = chunk["poisson_weight"].to_numpy(float)
+    if poisson_weight.any():
+        use_poisson = rng.random((n_skus, n_days)) < poisson_weight[:, None]
+        poisson_demand = rng.poisson(chunk["poisson_rate"].to_numpy(float)[:, None], size=(n_skus, n_days))
+        demand = np.where(use_poisson, poisson_demand, demand)
+    return demand.astype(np.int32)
+
+
+def simulate_catalogue_chunk(demand: np.ndarray, lead_times: np.ndarray, service_levels: np.ndarray) -> dict[str, np.ndarray]:
+    # Safety-stock policy (as SafetyStockAgent, with each SKU's own lead time
+    # and service level) run for all SKUs at once over a (SKUs, days) demand
+    # array. Returns one summary value per SKU and metric.
+    n_skus = len(demand)
+    lead_times = np.asarray(lead_times, dtype=int)
+    demand_mean, demand_std = rolling_mean_std(demand.astype(float), HISTO_DAYS, HISTO_DAYS, SIM_DAYS)
+    safety_factors = np.array([NormalDist().inv_cdf(level) for level in np.asarray(service_levels, dtype=float)])
+    safety_stock = safety_factors[:, None] * demand_std * np.sqrt(lead_times)[:, None]
+    reorder_points = demand_mean * lead_times[:, None] + safety_stock
+
+    # order pipeline as a ring buffer indexed by arrival_day % (max lead time + 1)
+    ring_size = int(lead_times.max()) + 1
+    pipeline = np.zeros((n_skus, ring_size))
+    in_transit = np.zeros(n_skus)
+    inventory = np.full(n_skus, BASE_STOCK, dtype=float)
+    rows = np.arange(n_skus)
+
+    totals = {
+        name: np.zeros(n_skus)
+        for name in ("total_demand", "fulfilled_demand", "write_offs", "stock_out_count", "inventory", "tracked_days")
+    }
+    for day in range(HISTO_DAYS, SIM_DAYS):
+        arrival_slot = day % ring_size
+        arrived = pipeline[:, arrival_slot].copy()
+        pipeline[:, arrival_slot] = 0
+        in_transit -= arrived
+        inventory += arrived
+
+        demand_quantity = demand[:, day]
+        fulfilled_demand = np.minimum(demand_quantity, inventory)
+        inventory -= fulfilled_demand
+        daily_writeoff = inventory * WRITE_OFF_RATE
+        inventory -= daily_writeoff
+
+        reorder_point = reorder_points[:, day - HISTO_DAYS]
+        expected_inventory = inventory + in_transit
+        order_quantity = np.where(expected_inventory <= reorder_point, reorder_point - expected_inventory, 0.0)
+        pipeline[rows, (day + lead_times) % ring_size] += order_quantity
+        in_transit += order_quantity
+
+        # same warm-up and tail exclusion as the single-product simulators
+        tracked = (day >= HISTO_DAYS + lead_times + 2) & (day <= SIM_DAYS - lead_times)
+        totals["total_demand"] += np.where(tracked, demand_quantity, 0)
+        totals["fulfilled_demand"] += np.where(tracked, fulfilled_demand, 0)
+        totals["write_offs"] += np.where(tracked, daily_writeoff, 0)
+        totals["stock_out_count"] += tracked & (fulfilled_demand < demand_quantity)
+        totals["inventory"] += np.where(tracked, inventory, 0)
+        totals["tracked_days"] += tracked
+
+    total_demand = totals["total_demand"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fill_rate = np.where(total_demand > 0, totals["fulfilled_demand"] / total_demand, 0.0)
+        avg_service_level = 1 - totals["stock_out_count"] / totals["tracked_days"]
+        avg_inventory_level = totals["inventory"] / totals["tracked_days"]
+    return {
+        "total_demand": total_demand.astype(np.int64),
+        "fulfilled_demand": totals["fulfilled_demand"],
+        "fill_rate": fill_rate,
+        "write_offs": totals["write_offs"],
+        "stock_out_count": totals["stock_out_count"].astype(np.int64),
+        "total_lost_sales": total_demand - totals["fulfilled_demand"],
+        "avg_service_level": avg_service_level,
+        "avg_inventory_level": avg_inventory_level,
+        "reorder_point": reorder_points[:, -1],
+        "safety_stock": safety_stock[:, -1],
+    }
+
+
+def run_catalogue(
+    catalogue_path: str | os.PathLike,
+    output_path: str | os.PathLike,
+    chunk_size: int = CATALOGUE_CHUNK_SIZE,
+    seed: int = SWEEP_SEED,
+    seasonality: SeasonalityProfile | None = None,
+    seasonality_curves: SeasonalityCurves | None = None,
+) -> CatalogueRunReport:
+    # Streams the catalogue through the chunked engine and appends one row group
+    # of per-SKU summaries per chunk to a Parquet file, so memory is bounded by
+    # chunk_size x SIM_DAYS whatever the catalogue size. Demand of the chunk
+    # starting at catalogue row r is drawn from the stream (seed, r), so results
+    # are reproducible for a given chunk_size.
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = output_path.with_name(f".{output_path.name}-{uuid.uuid4().hex[:8]}.tmp")
+    seasonality_multipliers = (seasonality or default_seasonality_profile()).multipliers(SIM_DAYS)
+
+    start = time.perf_counter()
+    n_skus = 0
+    n_chunks = 0
+    writer = None
+    try:
+        for chunk in read_catalogue(catalogue_path, chunk_size):
+            rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(n_skus,)))
+            chunk_multipliers = seasonality_multipliers
+            if seasonality_curves is not None and (chunk["seasonality_curve"] != "").any():
+                chunk_multipliers = seasonality_multipliers * seasonality_curves.sku_multipliers(
+                    chunk["seasonality_curve"].astype(str), SIM_DAYS
+                )
+            demand = sample_catalogue_demand(chunk, chunk_multipliers, rng)
+            summaries = simulate_catalogue_chunk(
+                demand, chunk["lead_time"].to_numpy(), chunk["service_level"].to_numpy()
+            )
+            table = pa.table(
+                {
+                    "sku": pa.array(chunk["sku"].astype(str)),
+                    "lead_time": pa.array(chunk["lead_time"].to_numpy(np.int32)),
+                    "service_level": pa.array(chunk["service_level"].to_numpy(float)),
+                    **{name: pa.array(values) for name, values in summaries.items()},
+                }
+            )
+            if writer is None:
+                writer = pq.ParquetWriter(temporary_path, table.schema)
+            writer.write_table(table)
+            n_skus += len(chunk)
+            n_chunks += 1
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError(f"Catalogue {catalogue_path} has no SKUs")
+    os.replace(temporary_path, output_path)
+    return CatalogueRunReport(output_path, n_skus, n_chunks, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Safety-stock simulation of a SKU catalogue")
+    parser.add_argument("catalogue", help="CSV or Parquet file with one row of parameters per SKU")
+    parser.add_argument("output", help="Parquet file for the per-SKU summaries")
+    parser.add_argument("--chunk-size", type=int, default=CATALOGUE_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=SWEEP_SEED)
+    parser.add_argument("--synthetic", type=int, metavar="N_SKUS", help="first write a synthetic catalogue of N_SKUS")
+    parser.add_argument("--seasonality", metavar="PROFILE", help="JSON seasonality profile instead of the default one")
+    parser.add_argument(
+        "--seasonality-curves", metavar="CURVES", help="CSV or Parquet per-SKU curves for the seasonality_curve column"
+    )
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        catalogue = synthetic_catalogue(args.synthetic, seed=args.seed)
+        if args.catalogue.endswith(".parquet"):
+            catalogue.to_parquet(args.catalogue, index=False)
+        else:
+            catalogue.to_csv(args.catalogue, index=False)
+
+    report = run_catalogue(
+        args.catalogue,
+        args.output,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+        seasonality=load_seasonality_profile(args.seasonality) if args.seasonality else None,
+        seasonality_curves=load_seasonality_curves(args.seasonality_curves) if args.seasonality_curves else None,
+    )
+    print(
+        f"{report.n_skus} SKUs in {report.n_chunks} chunks, {report.seconds:.1f} s, "
+        f"{report.sku_days_per_second:,.0f} SKU-days/s -> {report.output_path}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+import argparse
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+from safety_stock_experimentations.config import (
+    ADAPTIVE_TRIALS,
+    AGGREGATE_DAILY_METRICS,
+    COMMON_RANDOM_NUMBERS,
+    DAILY_MOMENTS_FILE,
+    ENVIRONMENT_CACHE_DIR,
+    JOB_SERVER_HOST,
+    JOB_SERVER_PORT,
+    JOBS_DIR,
+    N_WORKERS,
+    PHASE_TIMINGS_FILE,
+    PROFILE_PHASES,
+    PROFILE_RENDERER,
+    PROFILE_RUN,
+    RESULTS_DIR,
+    SCHEDULE_LONGEST_FIRST,
+    SERVICE_LEVEL_GOAL,
+    SWEEP_SEED,
+    TASK_COSTS_FILE,
+)
+from safety_stock_experimentations.profiling import ImportProfiler
+
+# Each command imports what it needs when it runs: `run` loads the simulation
+# core (numpy, pyarrow; scipy only for the agents that use it, pandas only with
+# --aggregate-daily-metrics), `report` adds pandas, `serve` Dash and Plotly,
+# and `jobs` the job server.
+
+
+def _experiment(args) -> tuple[dict, dict, list[float]]:
+    # the experiment defined in main.py, narrowed by --environments, --agents
+    # and --service-levels
+    from safety_stock_experimentations.main import (
+        agent_configs,
+        environment_configs,
+        service_levels_list,
+    )
+
+    if getattr(args, "environments", None):
+        environment_configs = {key: environment_configs[key] for key in args.environments}
+    if getattr(args, "agents", None):
+        agent_configs = {key: agent_configs[key] for key in args.agents}
+    if getattr(args, "service_levels", None):
+        service_levels_list = args.service_levels
+    return environment_configs, agent_configs, service_levels_list
+
+
+def run_command(args) -> int:
+    from safety_stock_experimentations.environment_cache import EnvironmentCache
+    from safety_stock_experimentations.online_aggregation import DailyMetricsAggregator
+    from safety_stock_experimentations.profiling import NULL_PHASE_TIMER, PhaseTimer, profile_single_run
+    from safety_stock_experimentations.results_store import ResultsStore
+    from safety_stock_experimentations.scheduling import CostModel
+    from safety_stock_experimentations.sequential_sweep import SequentialSweepExecutor
+    from safety_stock_experimentations.sweep import SweepExecutor
+
+    environment_configs, agent_configs, service_levels_list = _experiment(args)
+    phase_timer = PhaseTimer() if args.profile_phases else NULL_PHASE_TIMER
+    # per-day moments of the daily metrics, folded in as runs finish and kept
+    # next to the store, so `serve` does not scan the daily metrics dataset
+    moments_path = Path(args.results_dir) / DAILY_MOMENTS_FILE
+    aggregator = None
+    if args.aggregate_daily_metrics:
+        aggregator = DailyMetricsAggregator.load(moments_path) or DailyMetricsAggregator()
+
+    # completed runs are written to the store as they finish; a rerun of the
+    # same sweep only simulates the runs that are missing. Without --trials and
+    # with ADAPTIVE_TRIALS, each cell runs batches of trials until its
+    # confidence targets are met.
+    executor_options = dict(
+        max_workers=args.workers,
+        seed=args.seed,
+        results_store=ResultsStore(args.results_dir),
+        environment_cache=EnvironmentCache(args.environment_cache),
+        phase_timer=phase_timer,
+        aggregator=aggregator,
+        # summaries are only counted here, their daily metrics are on disk
+        retain_daily_metrics=False,
+        # run timings of this and earlier sweeps order the tasks longest first
+        cost_model=CostModel(Path(args.results_dir) / TASK_COSTS_FILE) if SCHEDULE_LONGEST_FIRST else None,
+    )
+    if args.trials is None and ADAPTIVE_TRIALS:
+        sweep = SequentialSweepExecutor(
+            environment_configs, agent_configs, service_levels_list, **executor_options
+        )
+    else:
+        sweep = SweepExecutor(
+            environment_configs,
+            agent_configs,
+            service_levels_list,
+            **({} if args.trials is None else {"n_trials": args.trials}),
+            **executor_options,
+        )
+
+    try:
+        # the store only takes runs of the same seed and settings
+        sweep.completed_runs()
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 1
+    start = time.perf_counter()
+    inventory_data_summaries = sweep.run()
+    if aggregator is not None:
+        aggregator.save(moments_path)
+    print(
+        f"{len(inventory_data_summaries)} runs simulated in {time.perf_counter() - start:.1f} s "
+        f"-> {args.results_dir}"
+    )
+
+    if args.profile_phases:
+        # the summaries frame that `report` and `serve` build from the store
+        with phase_timer.phase("dataframe_building"):
+            executor_options["results_store"].load_summaries()
+        phase_timer.write_json(Path(args.results_dir) / PHASE_TIMINGS_FILE)
+        print(phase_timer.report())
+    if PROFILE_RUN is not None:
+        environment_key, agent_key, service_level, trial_number = PROFILE_RUN
+        profile_path = profile_single_run(
+            environment_key,
+            environment_configs[environment_key],
+            agent_key,
+            agent_configs[agent_key],
+            service_level,
+            Path(args.results_dir) / f"profile_run.{'json' if PROFILE_RENDERER == 'speedscope' else 'html'}",
+            seed=args.seed,
+            trial_number=trial_number,
+            common_random_numbers=COMMON_RANDOM_NUMBERS,
+            environment_cache=executor_options["environment_cache"],
+            renderer=PROFILE_RENDERER,
+        )
+        print(f"Profile of the selected run written to {profile_path}")
+    return 0
+
+
+def report_command(args) -> int:
+    from safety_stock_experimentations.environment_cache import EnvironmentCache
+    from safety_stock_experimentations.paired_comparison import paired_differences
+    from safety_stock_experimentations.results_store import ResultsStore
+    from safety_stock_experimentations.sequential_sweep import SequentialSweepExecutor
+    from safety_stock_experimentations.service_level_solver import ServiceLevelSolver
+
+    environment_configs, agent_configs, service_levels_list = _experiment(args)
+    results_store = ResultsStore(args.results_dir)
+    df_inventory_data_summaries = results_store.load_summaries()
+    # the stored runs of the selected environments, agents and service levels
+    selection = {
+        "environment": [config["name"] for config in environment_configs.values()] if args.environments else None,
+        "agent": [config["name"] for config in agent_configs.values()] if args.agents else None,
+        "service_level": args.service_levels,
+    }
+    for column, values in selection.items():
+        if values is not None and not df_inventory_data_summaries.empty:
+            df_inventory_data_summaries = df_inventory_data_summaries[
+                df_inventory_data_summaries[column].isin(values)
+            ]
+    if df_inventory_data_summaries.empty:
+        print(f"No selected results in {args.results_dir}, run the `run` command first", file=sys.stderr)
+        return 1
+
+    aggregations = dict(
+        write_offs=("write_offs", "mean"),
+        fill_rate=("fill_rate", "mean"),
+        avg_service_level=("avg_service_level", "mean"),
+        trials=("day", "count"),
+    )
+    if "reorder_point_standard_error" in df_inventory_data_summaries:
+        # mean standard error of the sampled reorder points, NaN for the other agents
+        aggregations["reorder_point_standard_error"] = ("reorder_point_standard_error", "mean")
+    print(df_inventory_data_summaries.groupby(["service_level", "agent"], observed=True).agg(**aggregations))
+    if ADAPTIVE_TRIALS:
+        sweep = SequentialSweepExecutor(
+            environment_configs, agent_configs, service_levels_list, results_store=results_store
+        )
+        sweep.observe_stored_runs()
+        print("\nTrials used per cell")
+        print(sweep.trials_report().to_string(index=False))
+
+    # runs of one trial share realised demand (and random streams), so agents and
+    # service levels are compared on paired per-trial differences
+    baseline_agent = next(iter(agent_configs.values()))["name"]
+    for metric in ("write_offs", "avg_service_level"):
+        print(f"\nPaired differences in {metric} against {baseline_agent}")
+        print(
+            paired_differences(
+                df_inventory_data_summaries, metric, compare="agent", baseline=baseline_agent
+            ).to_string(index=False)
+        )
+        print(f"\nPaired differences in {metric} against service level {service_levels_list[0]}")
+        print(
+            paired_differences(
+                df_inventory_data_summaries, metric, compare="service_level", baseline=service_levels_list[0]
+            ).to_string(index=False)
+        )
+
+    if SERVICE_LEVEL_GOAL is not None:
+        kpi, goal = SERVICE_LEVEL_GOAL
+        print(f"\nSmallest service-level target reaching {kpi} >= {goal}")
+        solver = ServiceLevelSolver(
+            environment_configs,
+            agent_configs,
+            kpi=kpi,
+            goal=goal,
+            environment_cache=EnvironmentCache(args.environment_cache),
+        )
+        print(solver.solve_all().to_string(index=False))
+    return 0
+
+
+def _daily_aggregator(results_dir, df_inventory_data_summaries):
+    # the moments kept by `run --aggregate-daily-metrics`, unless the store has
+    # taken runs without them since
+    from safety_stock_experimentations.online_aggregation import DailyMetricsAggregator
+
+    aggregator = DailyMetricsAggregator.load(Path(results_dir) / DAILY_MOMENTS_FILE)
+    if aggregator is None:
+        return None
+    stored_runs = {
+        (str(agent), str(environment), float(service_level)): int(runs)
+        for (agent, environment, service_level), runs in df_inventory_data_summaries.groupby(
+            ["agent", "environment", "service_level"], observed=True
+        ).size().items()
+    }
+    if aggregator.runs() != stored_runs:
+        print(f"{DAILY_MOMENTS_FILE} does not cover every stored run, reading the daily metrics", file=sys.stderr)
+        return None
+    return aggregator
+
+
+def serve_command(args) -> int:
+    from safety_stock_experimentations.profiling import NULL_PHASE_TIMER, PhaseTimer
+    from safety_stock_experimentations.results_store import ResultsStore
+    from safety_stock_experimentations.simulation_plots import SimulationPlots
+
+    phase_timer = PhaseTimer() if args.profile_phases else NULL_PHASE_TIMER
+    results_store = ResultsStore(args.results_dir)
+    with phase_timer.phase("dataframe_building"):
+        df_inventory_data_summaries = results_store.load_summaries()
+        daily_aggregator = _daily_aggregator(args.results_dir, df_inventory_data_summaries)
+    plotter = SimulationPlots(
+        df_inventory_data_summaries, results_store=results_store, daily_aggregator=daily_aggregator
+    )
+    if args.profile_phases:
+        # the app builds figures on demand; time the default views here (they
+        # stay memoized for the app)
+        with phase_timer.phase("plot_building"):
+            plotter.build_figures()
+        # next to the sweep phases of `run`
+        phase_timer.write_json(Path(args.results_dir) / PHASE_TIMINGS_FILE, update=True)
+        print(phase_timer.report())
+    plotter.run_dash_app(host=args.host, port=args.port)
+    return 0
+
+
+def jobs_command(args) -> int:
+    import asyncio
+
+    from safety_stock_experimentations.job_server import JobServer
+
+    server = JobServer(args.jobs_dir, args.environment_cache, max_workers=args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="safety-stock", description="Safety-stock simulations of agents over demand environments"
+    )
+    parser.add_argument(
+        "--profile-imports",
+        action="store_true",
+        help="report the time spent importing each package, on stderr",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--results-dir", default=RESULTS_DIR)
+    common.add_argument("--environment-cache", default=ENVIRONMENT_CACHE_DIR)
+
+    selection = argparse.ArgumentParser(add_help=False)
+    selection.add_argument("--environments", type=int, nargs="+", metavar="KEY", help="keys of main.environment_configs")
+    selection.add_argument("--agents", type=int, nargs="+", metavar="KEY", help="keys of main.agent_configs")
+    selection.add_argument("--service-levels", type=float, nargs="+", metavar="LEVEL")
+
+    run_parser = subparsers.add_parser(
+        "run", parents=[common, selection], help="run the sweep headless and write results"
+    )
+    run_parser.add_argument(
+        "--trials",
+        type=int,
+        help="trials per cell (default: N_SIMULATIONS, or sequential stopping when ADAPTIVE_TRIALS is set)",
+    )
+    run_parser.add_argument("--workers", type=int, default=N_WORKERS)
+    run_parser.add_argument("--seed", type=int, default=SWEEP_SEED)
+    run_parser.add_argument("--profile-phases", action=argparse.BooleanOptionalAction, default=PROFILE_PHASES)
+    run_parser.add_argument(
+        "--aggregate-daily-metrics",
+        action=argparse.BooleanOptionalAction,
+        default=AGGREGATE_DAILY_METRICS,
+        help=f"keep per-day mean/std of the daily metrics in RESULTS_DIR/{DAILY_MOMENTS_FILE} for `serve`",
+    )
+    run_parser.set_defaults(handler=run_command)
+
+    report_parser = subparsers.add_parser(
+        "report", parents=[common, selection], help="print summaries of the stored results"
+    )
+    report_parser.set_defaults(handler=report_command)
+
+    serve_parser = subparsers.add_parser("serve", parents=[common], help="serve the results app")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8050)
+    serve_parser.add_argument("--profile-phases", action=argparse.BooleanOptionalAction, default=PROFILE_PHASES)
+    serve_parser.set_defaults(handler=serve_command)
+
+    jobs_parser = subparsers.add_parser(
+        "jobs", help="serve sweep specifications over HTTP on a shared worker pool"
+    )
+    jobs_parser.add_argument("--jobs-dir", default=JOBS_DIR)
+    jobs_parser.add_argument("--environment-cache", default=ENVIRONMENT_CACHE_DIR)
+    jobs_parser.add_argument("--host", default=JOB_SERVER_HOST)
+    jobs_parser.add_argument("--port", type=int, default=JOB_SERVER_PORT)
+    jobs_parser.add_argument("--workers", type=int, default=N_WORKERS)
+    jobs_parser.set_defaults(handler=jobs_command)
+    return parser
+
+
+def main(argv=None) -> int:
+    start = time.perf_counter()
+    args = build_parser().parse_args(argv)
+    import_profiler = ImportProfiler()
+    with import_profiler.active() if args.profile_imports else nullcontext():
+        status = args.handler(args)
+    if args.profile_imports:
+        print(f"\nImports during `{args.command}`", file=sys.stderr)
+        print(import_profiler.report(), file=sys.stderr)
+        print(f"command wall time: {time.perf_counter() - start:.3f} s", file=sys.stderr)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,9 @@ SIM_DAYS = 730
 HISTO_DAYS = 365
 N_SIMULATIONS = 100  # 100
 MC_SIMS = 1000  # 1000
+MC_ANALYTIC = True  # MonteCarloAgent reorder points from exact lead-time quantiles instead of samples
+MC_SAMPLING = "random"  # "random", "sobol", "antithetic" or "latin_hypercube"; needs MC_ANALYTIC = False
+MC_REPLICATES = 4  # independent sample sets per day, for the quantile standard error
 N_SAMPLES = 100  # 100
 
 # Replenishment constants
@@ -15,3 +18,65 @@ WRITE_OFF_RATE = 0.01
 LEAD_TIME = 3
 BASE_STOCK = 0
 DEFAULT_SERVICE_LEVEL = 0.95
+
+# Demand seasonality
+SEASONALITY_PROFILE = None  # JSON month/weekday/holiday profile; None uses the built-in one
+SEASONALITY_CACHE_SIZE = 64  # multiplier vectors kept per (profile, horizon)
+
+# Sweep execution
+N_WORKERS = None  # None uses os.cpu_count() worker processes
+SWEEP_SEED = 11
+# per-(environment, trial, day) streams shared by all agents; only agents that
+# sample use them, so with the analytic MonteCarloAgent default (and the
+# history-based agents, which draw nothing) it has no effect on results
+COMMON_RANDOM_NUMBERS = True
+SCHEDULE_LONGEST_FIRST = True  # tasks dispatched by estimated cost, from per-agent run timings
+TASK_COSTS_FILE = "task_costs.json"  # run timings of earlier sweeps, kept in RESULTS_DIR
+PROGRESS_INTERVAL = 10.0  # seconds between projected-completion updates during a sweep
+
+# Results and caches
+RESULTS_DIR = "results"  # partitioned Parquet store of completed runs
+ENVIRONMENT_CACHE_DIR = ".environment_cache"  # memory-mapped generated environments
+AGGREGATE_DAILY_METRICS = False  # opt-in; `run` keeps per-day moments of the stored runs for `serve`
+DAILY_MOMENTS_FILE = "daily_moments.parquet"  # per-day mean/std of daily metrics, kept in RESULTS_DIR
+
+# Sequential stopping: trials per (environment, agent, service level) cell
+ADAPTIVE_TRIALS = False  # opt-in; False runs N_SIMULATIONS trials in every cell
+TRIAL_TOLERANCES = {  # target confidence-interval half-width per metric
+    "fill_rate": 0.002,
+    "avg_service_level": 0.005,
+    "write_offs": 10.0,
+}
+CONFIDENCE_LEVEL = 0.95
+MIN_TRIALS = 10
+TRIAL_BATCH_SIZE = 10
+MAX_TRIALS = 500
+
+# Inverse solver: smallest service-level target meeting a KPI goal
+SERVICE_LEVEL_GOAL = None  # e.g. ("fill_rate", 0.98) to solve for every agent and environment
+SOLVER_TRIALS = 20
+SOLVER_BOUNDS = (0.50, 0.999)
+SOLVER_TOLERANCE = 0.001  # width of the final service-level bracket
+SOLVER_POINTS_PER_ITERATION = 3  # targets simulated together per bracketing step
+SOLVER_MAX_ITERATIONS = 20
+
+# Profiling (opt-in)
+PROFILE_PHASES = False  # per-phase wall time, written to RESULTS_DIR/PHASE_TIMINGS_FILE
+PHASE_TIMINGS_FILE = "phase_timings.json"
+PROFILE_RUN = None  # (environment key, agent key, service level, trial number) of a sweep run to profile with pyinstrument
+PROFILE_RENDERER = "html"  # "html" or "speedscope"
+BENCHMARK_BASELINE_FILE = "benchmark_baseline.json"  # benchmark.py results, kept in RESULTS_DIR
+
+# Results app
+DASH_MAX_POINTS = 1000  # points per time series after LTTB downsampling
+
+# Local job server
+JOB_SERVER_HOST = "127.0.0.1"
+JOB_SERVER_PORT = 8060
+JOBS_DIR = "jobs"  # one results store per sweep specification, keyed by its hash
+
+# Lead-time demand quantiles (MonteCarloAgent analytic engine)
+LEAD_TIME_GRID_SIZE = 512  # grid points per lead-time density in the FFT convolution
+
+# Multi-SKU catalogue engine
+CATALOGUE_CHUNK_SIZE = 1024  # SKUs simulated together as one (SKUs x days) array
@@ -1,13 +1,15 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-import datetime as dt
+import os
+import random
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
 
-import ciw
 import numpy as np
 
 from safety_stock_experimentations.config import (
     SIM_DAYS,
-    SIMULATION_START_DATE,
     N_SAMPLES,
 )
 from safety_stock_experimentations.demand_distribution_parameters import (
@@ -15,17 +17,225 @@ from safety_stock_experimentations.demand_distribution_parameters import (
     PoissonParameterRange,
     GammaHighVarianceParameterRange,
 )
+from safety_stock_experimentations.seasonality import (
+    SeasonalityProfile,
+    default_seasonality_profile,
+)
+
+if TYPE_CHECKING:
+    import ciw
+
+_ciw_seed = None  # applied to ciw.rng when ciw is first imported
+
+
+def seed_ciw(seed: int):
+    # Same streams as ciw.seed: ciw distributions draw from `random` and
+    # ciw.rng. ciw is imported only by the per-day distribution paths; until
+    # then the seed is kept and applied by _import_ciw.
+    global _ciw_seed
+    _ciw_seed = seed
+    random.seed(seed)
+    if "ciw" in sys.modules:
+        sys.modules["ciw"].rng = np.random.default_rng(seed)
+
+
+def _import_ciw():
+    if "ciw" not in sys.modules:
+        import ciw
+
+        if _ciw_seed is not None:
+            ciw.rng = np.random.default_rng(_ciw_seed)
+    return sys.modules["ciw"]
 
 
 @dataclass
 class DailyDemandDistribution:
     time_step: int
     realised_demand: int
-    demand_distribution: ciw.dists.Distribution
+    demand_distribution: "ciw.dists.Distribution"
     mean_demand_distribution: float
 
 
+@dataclass
+class DemandComponent:
+    # per-day parameters of one mixture component: Gamma(shape, scale) or Poisson(rate)
+    weight: float
+    shape: np.ndarray | None = None
+    scale: np.ndarray | None = None
+    rate: np.ndarray | None = None
+
+    @property
+    def mean(self) -> np.ndarray:
+        if self.rate is not None:
+            return self.rate.astype(float)
+        return self.shape.astype(float) * self.scale
+
+    def sample(self, time_steps: np.ndarray, rng=np.random) -> np.ndarray:
+        # rng is the global NumPy state or a np.random.Generator
+        if self.rate is not None:
+            return rng.poisson(self.rate[time_steps]).astype(float)
+        return rng.gamma(self.shape[time_steps], self.scale[time_steps])
+
+    def demand_distribution(self, time_step: int) -> "ciw.dists.Distribution":
+        ciw = _import_ciw()
+        if self.rate is not None:
+            return ciw.dists.Poisson(rate=float(self.rate[time_step]))
+        return ciw.dists.Gamma(
+            shape=float(self.shape[time_step]), scale=float(self.scale[time_step])
+        )
+
+
+@dataclass
+class DemandEnvironment:
+    # Columnar environment: per-day parameters, realised demand and exact means
+    # as arrays. Indexing yields DailyDemandDistribution like the list form.
+    components: list[DemandComponent]
+    realised_demand: np.ndarray
+    mean_demand: np.ndarray
+
+    @classmethod
+    def from_components(cls, components: list[DemandComponent]) -> "DemandEnvironment":
+        mean_demand = sum(component.weight * component.mean for component in components)
+        environment = cls(
+            components=components,
+            realised_demand=np.empty(0, dtype=np.int32),
+            mean_demand=np.asarray(mean_demand, dtype=float),
+        )
+        realised_demand = environment.sample(np.arange(len(mean_demand)))
+        environment.realised_demand = realised_demand.astype(np.int32)  # truncated like int(sample)
+        return environment
+
+    def save(self, directory: str | os.PathLike):
+        # one .npy file per array so that load() can memory-map them
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "realised_demand.npy", self.realised_demand)
+        np.save(directory / "mean_demand.npy", self.mean_demand)
+        weights = []
+        for index, component in enumerate(self.components):
+            weights.append(component.weight)
+            for name in ("shape", "scale", "rate"):
+                array = getattr(component, name)
+                if array is not None:
+                    np.save(directory / f"component_{index}_{name}.npy", array)
+        np.save(directory / "component_weights.npy", np.asarray(weights))
+
+    @classmethod
+    def load(cls, directory: str | os.PathLike, mmap_mode: str | None = "r") -> "DemandEnvironment":
+        directory = Path(directory)
+
+        def load_array(file_name):
+            path = directory / file_name
+            return np.load(path, mmap_mode=mmap_mode) if path.exists() else None
+
+        components = [
+            DemandComponent(
+                weight=float(weight),
+                shape=load_array(f"component_{index}_shape.npy"),
+                scale=load_array(f"component_{index}_scale.npy"),
+                rate=load_array(f"component_{index}_rate.npy"),
+            )
+            for index, weight in enumerate(np.load(directory / "component_weights.npy"))
+        ]
+        return cls(
+            components=components,
+            realised_demand=load_array("realised_demand.npy"),
+            mean_demand=load_array("mean_demand.npy"),
+        )
+
+    def __len__(self) -> int:
+        return len(self.mean_demand)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[time_step] for time_step in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return DailyDemandDistribution(
+            time_step=index,
+            realised_demand=int(self.realised_demand[index]),
+            demand_distribution=self.demand_distribution(index),
+            mean_demand_distribution=float(self.mean_demand[index]),
+        )
+
+    def __iter__(self):
+        return (self[time_step] for time_step in range(len(self)))
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.realised_demand, self.mean_demand] + [
+            array
+            for component in self.components
+            for array in (component.shape, component.scale, component.rate)
+            if array is not None
+        ]
+        return sum(array.nbytes for array in arrays)
+
+    def demand_distribution(self, time_step: int) -> "ciw.dists.Distribution":
+        ciw = _import_ciw()
+        if len(self.components) == 1:
+            return self.components[0].demand_distribution(time_step)
+        return ciw.dists.MixtureDistribution(
+            [component.demand_distribution(time_step) for component in self.components],
+            [component.weight for component in self.components],
+        )
+
+    def sample(self, time_steps: np.ndarray, rng=np.random) -> np.ndarray:
+        # one demand draw per entry of time_steps, for arrays of any shape
+        time_steps = np.asarray(time_steps)
+        if len(self.components) == 1:
+            return self.components[0].sample(time_steps, rng)
+
+        weights = np.array([component.weight for component in self.components])
+        chosen = rng.choice(
+            len(self.components), size=time_steps.shape, p=weights / weights.sum()
+        )
+        samples = np.empty(time_steps.shape)
+        for index, component in enumerate(self.components):
+            mask = chosen == index
+            samples[mask] = component.sample(time_steps[mask], rng)
+        return samples
+
+
+def realised_demand_array(daily_demand_distributions) -> np.ndarray:
+    if isinstance(daily_demand_distributions, DemandEnvironment):
+        return daily_demand_distributions.realised_demand
+    return np.array([d.realised_demand for d in daily_demand_distributions])
+
+
+def mean_demand_array(daily_demand_distributions) -> np.ndarray:
+    if isinstance(daily_demand_distributions, DemandEnvironment):
+        return daily_demand_distributions.mean_demand
+    return np.array(
+        [d.mean_demand_distribution for d in daily_demand_distributions], dtype=float
+    )
+
+
+def sample_demand_distribution(
+    distribution: "ciw.dists.Distribution", size: int, rng=np.random
+) -> np.ndarray:
+    # NumPy counterpart of `distribution.sample()` drawing `size` values in one call
+    ciw = _import_ciw()
+    if isinstance(distribution, ciw.dists.Gamma):
+        return rng.gamma(distribution.shape, distribution.scale, size)
+    if isinstance(distribution, ciw.dists.Poisson):
+        return rng.poisson(distribution.rate, size).astype(float)
+    if isinstance(distribution, ciw.dists.MixtureDistribution):
+        probs = np.asarray(distribution.probs, dtype=float)
+        chosen = rng.choice(len(distribution.dists), size=size, p=probs / probs.sum())
+        samples = np.empty(size)
+        for index, component in enumerate(distribution.dists):
+            mask = chosen == index
+            samples[mask] = sample_demand_distribution(component, int(mask.sum()), rng)
+        return samples
+    raise TypeError(f"Unsupported demand distribution for vectorized sampling: {distribution!r}")
+
+
 class DailyDemandDistributionBuilder(ABC):
+    def __init__(self, seasonality: SeasonalityProfile | None = None):
+        # None: the SEASONALITY_PROFILE file of config.py, or the built-in profile
+        self._seasonality = default_seasonality_profile() if seasonality is None else seasonality
+
     def execute(self) -> list[DailyDemandDistribution]:
         daily_demand_distributions = []
         for time_step in range(SIM_DAYS):
@@ -43,35 +253,28 @@ class DailyDemandDistributionBuilder(ABC):
             )
         return daily_demand_distributions
 
+    def build_environment(self) -> DemandEnvironment:
+        seasonality_multipliers = self._get_seasonality_multipliers(SIM_DAYS)
+        return DemandEnvironment.from_components(
+            self._get_demand_components(seasonality_multipliers)
+        )
+
     @abstractmethod
-    def _get_daily_demand_distribution(self, time_step: int) -> ciw.dists.Distribution:
+    def _get_daily_demand_distribution(self, time_step: int) -> "ciw.dists.Distribution":
         pass
 
-    @staticmethod
-    def _get_daily_seasonality_multiplier(time_step: int) -> float:
-        current_date = SIMULATION_START_DATE + dt.timedelta(days=time_step)
-
-        month_multipliers = {
-            12: 1.10, # 12: 1.10,
-            11: 1.20, # 11: 1.20,
-            10: 1.30, # 10: 1.30,
-            9: 1.40, # 9: 1.40,
-            8: 1.50, # 8: 1.50,
-            7: 1.50, # 7: 1.50,
-            6: 1.30, # 6: 1.30,
-            5: 1.20, # 5: 1.20,
-            4: 1.10, # 4: 1.10,
-        }
-        month_multiplier = month_multipliers.get(current_date.month, 1.0)
-
-        weekday_multipliers = {
-            5: 1.50,  # Saturday
-            0: 1.20,  # Monday
-            4: 1.20,  # Friday
-        }
-        weekday_multiplier = weekday_multipliers.get(current_date.weekday(), 1.0)
-
-        return month_multiplier * weekday_multiplier
+    @abstractmethod
+    def _get_demand_components(self, seasonality_multipliers: np.ndarray) -> list[DemandComponent]:
+        pass
+
+    def _get_daily_seasonality_multiplier(self, time_step: int) -> float:
+        # days past the horizon read a longer vector, rounded up so it stays cached
+        n_days = SIM_DAYS if time_step < SIM_DAYS else 2 ** (time_step + 1).bit_length()
+        return float(self._get_seasonality_multipliers(n_days)[time_step])
+
+    def _get_seasonality_multipliers(self, n_days: int) -> np.ndarray:
+        # precomputed for the whole horizon and shared by every builder with the same profile
+        return self._seasonality.multipliers(n_days)
 
 
 class GammaPoisson(DailyDemandDistributionBuilder):
@@ -79,12 +282,14 @@ class GammaPoisson(DailyDemandDistributionBuilder):
         self,
         gamma_parameter_range: GammaParameterRange = GammaParameterRange(),
         poisson_parameter_range: PoissonParameterRange = PoissonParameterRange(),
+        seasonality: SeasonalityProfile | None = None,
     ):
-        super().__init__()
+        super().__init__(seasonality)
         self._gamma_parameter_range = gamma_parameter_range
         self._poisson_parameter_range = poisson_parameter_range
 
-    def _get_daily_demand_distribution(self, time_step: int) -> ciw.dists.Distribution:
+    def _get_daily_demand_distribution(self, time_step: int) -> "ciw.dists.Distribution":
+        ciw = _import_ciw()
         seasonality_multiplier = self._get_daily_seasonality_multiplier(time_step)
         return ciw.dists.MixtureDistribution(
             [
@@ -97,16 +302,34 @@ class GammaPoisson(DailyDemandDistributionBuilder):
             [0.9, 0.1],
         )
 
+    def _get_demand_components(self, seasonality_multipliers: np.ndarray) -> list[DemandComponent]:
+        n_days = len(seasonality_multipliers)
+        return [
+            DemandComponent(
+                weight=0.9,
+                shape=self._gamma_parameter_range.sample_shape(n_days).astype(np.float32),
+                scale=(
+                    self._gamma_parameter_range.sample_scale(n_days) * seasonality_multipliers
+                ).astype(np.float32),
+            ),
+            DemandComponent(
+                weight=0.1,
+                rate=self._poisson_parameter_range.sample(n_days).astype(np.float32),
+            ),
+        ]
+
 
 class GammaGammaHighVariance(DailyDemandDistributionBuilder):
     def __init__(
         self,
         gamma_parameter_range: GammaHighVarianceParameterRange = GammaHighVarianceParameterRange(),
+        seasonality: SeasonalityProfile | None = None,
     ):
-        super().__init__()
+        super().__init__(seasonality)
         self._gamma_parameter_range = gamma_parameter_range
 
-    def _get_daily_demand_distribution(self, time_step: int) -> ciw.dists.Distribution:
+    def _get_daily_demand_distribution(self, time_step: int) -> "ciw.dists.Distribution":
+        ciw = _import_ciw()
         seasonality_multiplier = self._get_daily_seasonality_multiplier(time_step)
         return ciw.dists.MixtureDistribution(
             [
@@ -122,18 +345,51 @@ class GammaGammaHighVariance(DailyDemandDistributionBuilder):
             [0.5, 0.5],
         )
 
+    def _get_demand_components(self, seasonality_multipliers: np.ndarray) -> list[DemandComponent]:
+        n_days = len(seasonality_multipliers)
+        return [
+            DemandComponent(
+                weight=0.5,
+                shape=self._gamma_parameter_range.sample_shape_low(n_days).astype(np.float32),
+                scale=(
+                    self._gamma_parameter_range.sample_scale_low(n_days) * seasonality_multipliers
+                ).astype(np.float32),
+            ),
+            DemandComponent(
+                weight=0.5,
+                shape=self._gamma_parameter_range.sample_shape_high(n_days).astype(np.float32),
+                scale=(
+                    self._gamma_parameter_range.sample_scale_high(n_days) * seasonality_multipliers
+                ).astype(np.float32),
+            ),
+        ]
+
 
 class SingleGammaLowVariance(DailyDemandDistributionBuilder):
     def __init__(
         self,
         gamma_parameter_range: GammaParameterRange = GammaParameterRange(),
+        seasonality: SeasonalityProfile | None = None,
     ):
-        super().__init__()
+        super().__init__(seasonality)
         self._gamma_parameter_range = gamma_parameter_range
 
-    def _get_daily_demand_distribution(self, time_step: int) -> ciw.dists.Distribution:
+    def _get_daily_demand_distribution(self, time_step: int) -> "ciw.dists.Distribution":
+        ciw = _import_ciw()
         seasonality_multiplier = self._get_daily_seasonality_multiplier(time_step)
         return ciw.dists.Gamma(
             shape=self._gamma_parameter_range.sample_shape(),
             scale=self._gamma_parameter_range.sample_scale() * seasonality_multiplier,
         )
+
+    def _get_demand_components(self, seasonality_multipliers: np.ndarray) -> list[DemandComponent]:
+        n_days = len(seasonality_multipliers)
+        return [
+            DemandComponent(
+                weight=1.0,
+                shape=self._gamma_parameter_range.sample_shape(n_days).astype(np.float32),
+                scale=(
+                    self._gamma_parameter_range.sample_scale(n_days) * seasonality_multipliers
+                ).astype(np.float32),
+            ),
+        ]
@@ -7,8 +7,8 @@ class PoissonParameterRange:
     rate_min: float = 75
     rate_max: float = 85
 
-    def sample(self) -> float:
-        return np.random.uniform(self.rate_min, self.rate_max)
+    def sample(self, size: int | None = None) -> float | np.ndarray:
+        return np.random.uniform(self.rate_min, self.rate_max, size)
 
 
 @dataclass
@@ -18,11 +18,11 @@ class GammaParameterRange:
     scale_min: float = 14
     scale_max: float = 18
 
-    def sample_shape(self) -> float:
-        return np.random.uniform(self.shape_min, self.shape_max)
+    def sample_shape(self, size: int | None = None) -> float | np.ndarray:
+        return np.random.uniform(self.shape_min, self.shape_max, size)
 
-    def sample_scale(self) -> float:
-        return np.random.uniform(self.scale_min, self.scale_max)
+    def sample_scale(self, size: int | None = None) -> float | np.ndarray:
+        return np.random.uniform(self.scale_min, self.scale_max, size)
 
 
 @dataclass
@@ -37,14 +37,14 @@ class GammaHighVarianceParameterRange:
     scale_min_high: float = 28
     scale_max_high: float = 30
 
-    def sample_shape_low(self) -> float:
-        return np.random.uniform(self.shape_min_low, self.shape_max_low)
+    def sample_shape_low(self, size: int | None = None) -> float | np.ndarray:
+        return np.random.uniform(self.shape_min_low, self.shape_max_low, size)
 
-    def sample_scale_low(self) -> float:
-        return np.random.uniform(self.scale_min_low, self.scale_max_low)
+    def sample_scale_low(self, size: int | None = None) -> float | np.ndarray:
+        return np.random.uniform(self.scale_min_low, self.scale_max_low, size)
 
-    def sample_shape_high(self) -> float:
-        return np.random.uniform(self.shape_min_high, self.shape_max_high)
+    def sample_shape_high(self, size: int | None = None) -> float | np.ndarray:
+        return np.random.uniform(self.shape_min_high, self.shape_max_high, size)
 
-    def sample_scale_high(self) -> float:
-        return np.random.uniform(self.scale_min_high, self.scale_max_high)
+    def sample_scale_high(self, size: int | None = None) -> float | np.ndarray:
+        return np.random.uniform(self.scale_min_high, self.scale_max_high, size)
@@ -0,0 +1,106 @@
+import dataclasses
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import uuid
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from safety_stock_experimentations import (
+    demand_distribution,
+    demand_distribution_parameters,
+    seasonality,
+)
+from safety_stock_experimentations.config import SIM_DAYS, SIMULATION_START_DATE
+from safety_stock_experimentations.demand_distribution import (
+    DailyDemandDistributionBuilder,
+    DemandEnvironment,
+)
+
+# bump when the layout of an entry on disk changes
+CACHE_FORMAT_VERSION = 1
+# the code every builder generates with: the base builder and the samplers, the
+# parameter ranges and the seasonality profiles
+GENERATOR_MODULES = (demand_distribution, demand_distribution_parameters, seasonality)
+
+
+@lru_cache(maxsize=None)
+def _source_digest(code) -> str:
+    try:
+        source = inspect.getsource(code)
+    except (OSError, TypeError):
+        source = ""
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def _generator_source_digest(builder_class) -> str:
+    # a builder defined outside the generator modules adds its own module
+    modules = dict.fromkeys([*GENERATOR_MODULES, sys.modules.get(builder_class.__module__)])
+    return hashlib.sha256(
+        "".join(_source_digest(module) for module in modules if module is not None).encode()
+    ).hexdigest()
+
+
+def builder_description(builder: DailyDemandDistributionBuilder) -> dict:
+    # what a builder generates from a given seed: its class (name and source),
+    # the source of the modules it generates with, its parameter-range
+    # dataclasses and its seasonality vector
+    builder_class = type(builder)
+    return {
+        "builder": f"{builder_class.__module__}.{builder_class.__qualname__}",
+        "builder_source": _source_digest(builder_class),
+        "generator_source": _generator_source_digest(builder_class),
+        "parameter_ranges": {
+            name: [type(value).__qualname__, dataclasses.asdict(value)]
+            for name, value in sorted(vars(builder).items())
+            if dataclasses.is_dataclass(value)
+        },
+        "seasonality": hashlib.sha256(
+            builder._get_seasonality_multipliers(SIM_DAYS).tobytes()
+        ).hexdigest(),
+    }
+
+
+class EnvironmentCache:
+    # Content-addressed store of generated DemandEnvironments. An entry is keyed by
+    # the builder class (name and source), the source of the generator modules,
+    # its parameter-range dataclasses, the seasonality vector, the seed and the
+    # horizon, and is saved as .npy arrays that
+    # are memory-mapped on load, so processes reading the same entry share pages.
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+
+    @staticmethod
+    def key(builder: DailyDemandDistributionBuilder, seed_sequence: np.random.SeedSequence) -> str:
+        description = {
+            **builder_description(builder),
+            "format_version": CACHE_FORMAT_VERSION,
+            "seed": [str(seed_sequence.entropy), list(seed_sequence.spawn_key)],
+            "sim_days": SIM_DAYS,
+            "start_date": SIMULATION_START_DATE.isoformat(),
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def load(self, key: str) -> DemandEnvironment | None:
+        path = self.root / key
+        if not path.exists():
+            return None
+        return DemandEnvironment.load(path, mmap_mode="r")
+
+    def save(self, key: str, environment: DemandEnvironment):
+        # written to a private directory and renamed, so readers never see a
+        # partial entry and concurrent writers of the same key are harmless
+        path = self.root / key
+        temporary_path = self.root / f".{key}-{uuid.uuid4().hex[:8]}"
+        environment.save(temporary_path)
+        try:
+            os.rename(temporary_path, path)
+        except OSError:
+            if not path.exists():
+                raise
+            shutil.rmtree(temporary_path, ignore_errors=True)
@@ -8,8 +8,9 @@ class InventoryManager:
         self.total_write_off_quantity = 0
         self.agent = agent
 
-    def reorder(self, time_period):
-        reorder_point = self.agent.compute_reorder_point(time_period)
+    def reorder(self, time_period, reorder_point=None):
+        if reorder_point is None:
+            reorder_point = self.agent.compute_reorder_point(time_period)
         orders_in_delivery = self.order_processor.get_incoming_orders(time_period)
         expected_inventory = self.inventory + orders_in_delivery
 
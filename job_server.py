@@ -0,0 +1,461 @@
+import asyncio
+import contextlib
+import dataclasses
+import functools
+import hashlib
+import inspect
+import json
+import os
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from safety_stock_experimentations.agent import (
+    BaseAgent,
+    ForecastAgent,
+    MonteCarloAgent,
+    SafetyStockAgent,
+)
+from safety_stock_experimentations.config import (
+    COMMON_RANDOM_NUMBERS,
+    ENVIRONMENT_CACHE_DIR,
+    JOB_SERVER_HOST,
+    JOB_SERVER_PORT,
+    JOBS_DIR,
+    N_SIMULATIONS,
+    N_WORKERS,
+    SWEEP_SEED,
+)
+from safety_stock_experimentations.demand_distribution import (
+    GammaGammaHighVariance,
+    GammaPoisson,
+    SingleGammaLowVariance,
+)
+from safety_stock_experimentations.environment_cache import EnvironmentCache
+from safety_stock_experimentations.results_store import ResultsStore
+from safety_stock_experimentations.scheduling import CostModel, SweepSchedule
+from safety_stock_experimentations.sweep import SweepExecutor, run_sweep_task, simulation_settings
+
+BUILDERS = {builder.__name__: builder for builder in (GammaPoisson, GammaGammaHighVariance, SingleGammaLowVariance)}
+AGENTS = {agent.__name__: agent for agent in (BaseAgent, SafetyStockAgent, ForecastAgent, MonteCarloAgent)}
+COMPLETE_MARKER = "complete"  # written in a specification's directory once all its runs are stored
+SPECIFICATION_FILE = "specification.json"
+
+
+def builder_parameter_ranges(builder_class) -> dict:
+    # the parameter-range dataclasses a builder takes, with their defaults
+    return {
+        name: parameter.default
+        for name, parameter in inspect.signature(builder_class).parameters.items()
+        if dataclasses.is_dataclass(parameter.default)
+    }
+
+
+def normalize_specification(specification: dict) -> dict:
+    # Complete a sweep specification with its defaults and check it; raises
+    # ValueError. Two specifications of the same sweep normalize to the same
+    # dict, whose hash keys the cached results. The simulation constants are
+    # part of it, so changing them in config.py does not reuse stale results.
+    #   {"environments": [{"builder": "GammaPoisson", "name": ..., "parameters":
+    #        {"gamma_parameter_range": {"shape_min": 5, ...}}}, ...],
+    #    "agents": [{"class": "MonteCarloAgent", "name": ...}, ...],
+    #    "service_levels": [0.9, 0.95], "trials": 20, "seed": 11}
+    unknown = set(specification) - {"environments", "agents", "service_levels", "trials", "seed", "common_random_numbers"}
+    if unknown:
+        raise ValueError(f"Unknown specification fields {sorted(unknown)}")
+
+    environments = []
+    for environment in specification.get("environments") or []:
+        builder = environment.get("builder")
+        if builder not in BUILDERS:
+            raise ValueError(f"Unknown builder {builder!r}, expected one of {sorted(BUILDERS)}")
+        defaults = builder_parameter_ranges(BUILDERS[builder])
+        parameters = environment.get("parameters", {})
+        if set(parameters) - set(defaults):
+            raise ValueError(f"{builder} takes the parameter ranges {sorted(defaults)}")
+        resolved = {}
+        for name, default in defaults.items():
+            values = {**dataclasses.asdict(default), **parameters.get(name, {})}
+            if set(values) - set(dataclasses.asdict(default)):
+                raise ValueError(f"{name} has the fields {sorted(dataclasses.asdict(default))}")
+            resolved[name] = {field: float(value) for field, value in values.items()}
+        environments.append({"builder": builder, "name": environment.get("name", builder), "parameters": resolved})
+
+    agents = []
+    for agent in specification.get("agents") or []:
+        if agent.get("class") not in AGENTS:
+            raise ValueError(f"Unknown agent {agent.get('class')!r}, expected one of {sorted(AGENTS)}")
+        agents.append({"class": agent["class"], "name": agent.get("name", agent["class"])})
+
+    service_levels = sorted({float(level) for level in specification.get("service_levels") or []})
+    if not environments or not agents or not service_levels:
+        raise ValueError("A specification needs environments, agents and service_levels")
+    if not all(0 < level < 1 for level in service_levels):
+        raise ValueError("Service levels must lie in (0, 1)")
+    for field, entries in (("environment", environments), ("agent", agents)):
+        names = [entry["name"] for entry in entries]
+        if len(set(names)) != len(names):
+            raise ValueError(f"{field} names must be unique")
+    trials = int(specification.get("trials", N_SIMULATIONS))
+    if trials < 1:
+        raise ValueError("trials must be at least 1")
+
+    return {
+        "environments": environments,
+        "agents": agents,
+        "service_levels": service_levels,
+        "trials": trials,
+        "seed": int(specification.get("seed", SWEEP_SEED)),
+        "common_random_numbers": bool(specification.get("common_random_numbers", COMMON_RANDOM_NUMBERS)),
+        "simulation": simulation_settings(),
+    }
+
+
+def specification_hash(specification: dict) -> str:
+    return hashlib.sha256(json.dumps(specification, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, default=_json_default).encode()
+
+
+class SweepJob(SweepExecutor):
+    # One sweep specification run on the server's shared pool. Summaries are
+    # written to the specification's results store as tasks finish, so a job
+    # interrupted by a restart resumes, and are published as events that
+    # clients stream: "progress", "summaries" (the new runs, without daily
+    # metrics), then "done" or "failed". Once the job has ended and no client
+    # is streaming, only its last progress event and final event are kept in
+    # memory; the summaries are in the results store.
+    def __init__(self, specification: dict, root: Path, environment_cache: EnvironmentCache, cost_model: CostModel):
+        environment_configs = {
+            key: {
+                "name": environment["name"],
+                # a partial is picklable and, like a builder class, builds with no arguments
+                "class": functools.partial(
+                    BUILDERS[environment["builder"]],
+                    **{
+                        name: type(default)(**environment["parameters"][name])
+                        for name, default in builder_parameter_ranges(BUILDERS[environment["builder"]]).items()
+                    },
+                ),
+            }
+            for key, environment in enumerate(specification["environments"])
+        }
+        agent_configs = {
+            key: {"name": agent["name"], "class": AGENTS[agent["class"]]}
+            for key, agent in enumerate(specification["agents"])
+        }
+        self.specification = specification
+        self.specification_hash = specification_hash(specification)
+        self.directory = root / self.specification_hash
+        super().__init__(
+            environment_configs,
+            agent_configs,
+            specification["service_levels"],
+            n_trials=specification["trials"],
+            seed=specification["seed"],
+            results_store=ResultsStore(self.directory),
+            environment_cache=environment_cache,
+            retain_daily_metrics=False,
+            common_random_numbers=specification["common_random_numbers"],
+            cost_model=cost_model,
+            progress_interval=None,
+        )
+        self.status = "queued"
+        self.events = []
+        self._subscribers = 0
+        self._changed = asyncio.Condition()
+
+    @property
+    def is_complete(self) -> bool:
+        return (self.directory / COMPLETE_MARKER).exists()
+
+    def status_document(self) -> dict:
+        return {
+            "job": self.specification_hash,
+            "status": self.status,
+            "results_dir": str(self.directory),
+            "specification": self.specification,
+        }
+
+    async def publish(self, event: dict):
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    async def finish(self, event: dict):
+        await self.publish(event)
+        async with self._changed:
+            self._compact_events()
+
+    def _compact_events(self):
+        # with self._changed held
+        if self._subscribers or not self.events or self.events[-1]["event"] not in ("done", "failed"):
+            return
+        progress = [event for event in self.events[:-1] if event["event"] == "progress"][-1:]
+        self.events = progress + self.events[-1:]
+
+    async def stream_events(self):
+        # every event since the job started, then new ones until it ends
+        position = 0
+        self._subscribers += 1
+        try:
+            while True:
+                async with self._changed:
+                    await self._changed.wait_for(lambda: position < len(self.events))
+                    events = self.events[position:]
+                for event in events:
+                    yield event
+                    if event["event"] in ("done", "failed"):
+                        return
+                position += len(events)
+        finally:
+            self._subscribers -= 1
+            async with self._changed:
+                self._compact_events()
+
+    async def run_on(self, pool: ProcessPoolExecutor, workers: int):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / SPECIFICATION_FILE, "w") as file:
+            json.dump(self.specification, file, indent=2)
+        self.status = "running"
+        futures = {}
+        try:
+            loop = asyncio.get_running_loop()
+            tasks = await asyncio.to_thread(self.tasks)  # reads the stored runs
+            keys = [self._cost_keys(task) for task in tasks]
+            schedule = SweepSchedule(
+                [sum(self.cost_model.estimate(key) for key in task_keys.values()) for task_keys in keys], workers
+            )
+            await self.publish(self._progress_event(schedule))
+
+            # queued longest first on the shared pool, behind the tasks of
+            # earlier jobs
+            futures = {
+                loop.run_in_executor(pool, run_sweep_task, tasks[index]): index for index in schedule.order
+            }
+            pending = set(futures)
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in finished:
+                    index = futures[future]
+                    summaries, phase_totals, agent_seconds = future.result()
+                    summaries = await asyncio.to_thread(self._collect, summaries, phase_totals)
+                    for agent_key, seconds in agent_seconds.items():
+                        self.cost_model.record(keys[index][agent_key], seconds)
+                    schedule.record(index, sum(agent_seconds.values()))
+                    await self.publish({"event": "summaries", "summaries": summaries})
+                    await self.publish(self._progress_event(schedule))
+
+            self.cost_model.save()
+            (self.directory / COMPLETE_MARKER).touch()
+            self.status = "done"
+            await self.finish({"event": "done", "cached": False})
+        except Exception as error:
+            self.status = "failed"
+            await self.finish({"event": "failed", "error": f"{type(error).__name__}: {error}"})
+        finally:
+            # after a failure the job's queued tasks leave the shared pool; running
+            # ones finish and their results (or errors) are dropped
+            for future in futures:
+                if not future.done():
+                    future.cancel()
+                elif not future.cancelled():
+                    future.exception()
+
+    def _progress_event(self, schedule: SweepSchedule) -> dict:
+        return {
+            "event": "progress",
+            "completed": schedule.completed,
+            "total": len(schedule.estimates),
+            "projected_seconds": schedule.projected_seconds(),
+        }
+
+    def stored_summaries(self) -> list[dict]:
+        return self.results_store.load_summaries().to_dict("records")
+
+
+class JobServer:
+    # Local HTTP service running sweep specifications on one warm process pool
+    # shared by every client (the Dash app, notebooks). Endpoints:
+    #   POST /jobs               submit a specification; a computed one returns
+    #                            its summaries at once, a running one its job
+    #   GET  /jobs               status of every job of this server
+    #   GET  /jobs/<id>          status, with the summaries once done
+    #   GET  /jobs/<id>/events   newline-delimited JSON events until the job ends
+    #   GET  /catalog            builders with their parameter ranges, and agents
+    # Environments are shared through the environment cache, and task costs
+    # through one cost model, across jobs.
+    def __init__(
+        self,
+        root: str | os.PathLike = JOBS_DIR,
+        environment_cache_dir: str | os.PathLike = ENVIRONMENT_CACHE_DIR,
+        max_workers: int | None = N_WORKERS,
+    ):
+        self.root = Path(root)
+        self.environment_cache = EnvironmentCache(environment_cache_dir)
+        self.cost_model = CostModel(self.root / "task_costs.json")
+        self.workers = max_workers or os.cpu_count() or 1
+        self.pool = None
+        self.jobs = {}
+
+    async def serve(self, host: str = JOB_SERVER_HOST, port: int = JOB_SERVER_PORT):
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            self.pool = pool
+            # workers import the simulation core and scipy once, up front
+            await asyncio.gather(
+                *(asyncio.get_running_loop().run_in_executor(pool, _warm_up) for _ in range(self.workers))
+            )
+            server = await asyncio.start_server(self._handle, host, port)
+            print(f"Job server listening on http://{host}:{port}/ with {self.workers} workers")
+            async with server:
+                await server.serve_forever()
+
+    def submit(self, specification: dict) -> tuple[SweepJob, bool]:
+        # the job of the specification and whether its results are cached
+        specification = normalize_specification(specification)
+        job_id = specification_hash(specification)
+        if job_id in self.jobs and self.jobs[job_id].status != "failed":
+            return self.jobs[job_id], self.jobs[job_id].is_complete
+        job = SweepJob(specification, self.root, self.environment_cache, self.cost_model)
+        self.jobs[job_id] = job
+        if job.is_complete:
+            job.status = "done"
+            job.events.append({"event": "done", "cached": True})
+            return job, True
+        asyncio.get_running_loop().create_task(job.run_on(self.pool, self.workers))
+        return job, False
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # one request per connection, answered with Connection: close
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            if len(request_line) != 3:
+                return
+            method, target, _ = request_line
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+            await self._route(method, target.split("?")[0].rstrip("/").split("/")[1:], body, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: list[str], body: bytes, writer: asyncio.StreamWriter):
+        if method == "GET" and path == ["catalog"]:
+            return await _respond(writer, 200, self.catalog())
+        if method == "GET" and path == ["jobs"]:
+            return await _respond(writer, 200, [job.status_document() for job in self.jobs.values()])
+        if method == "POST" and path == ["jobs"]:
+            try:
+                job, cached = self.submit(json.loads(body or b"{}"))
+            except (ValueError, TypeError, AttributeError) as error:
+                return await _respond(writer, 400, {"error": str(error)})
+            document = job.status_document()
+            if cached:
+                document["summaries"] = await asyncio.to_thread(job.stored_summaries)
+            return await _respond(writer, 200 if cached else 202, document)
+        if method == "GET" and len(path) in (2, 3) and path[0] == "jobs":
+            job = self.jobs.get(path[1])
+            if job is None:
+                return await _respond(writer, 404, {"error": f"Unknown job {path[1]!r}"})
+            if len(path) == 2:
+                document = job.status_document()
+                if job.status == "done":
+                    document["summaries"] = await asyncio.to_thread(job.stored_summaries)
+                return await _respond(writer, 200, document)
+            if path[2] == "events":
+                writer.write(_headers(200, "application/x-ndjson"))
+                # closed at once if the client goes away, so the job can drop its events
+                async with contextlib.aclosing(job.stream_events()) as events:
+                    async for event in events:
+                        writer.write(_dumps(event) + b"\n")
+                        await writer.drain()
+                return
+        await _respond(writer, 404, {"error": "Not found"})
+
+    @staticmethod
+    def catalog() -> dict:
+        return {
+            "builders": {
+                name: {
+                    parameter: dataclasses.asdict(default)
+                    for parameter, default in builder_parameter_ranges(builder).items()
+                }
+                for name, builder in BUILDERS.items()
+            },
+            "agents": sorted(AGENTS),
+        }
+
+
+def _warm_up():
+    from scipy import fft, special  # noqa: F401  used by MonteCarloAgent
+
+
+def _headers(status: int, content_type: str = "application/json", content_length: int | None = None) -> bytes:
+    reasons = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found"}
+    lines = [f"HTTP/1.1 {status} {reasons[status]}", f"Content-Type: {content_type}", "Connection: close"]
+    if content_length is not None:
+        lines.append(f"Content-Length: {content_length}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+async def _respond(writer: asyncio.StreamWriter, status: int, document):
+    body = _dumps(document)
+    writer.write(_headers(status, content_length=len(body)) + body)
+    await writer.drain()
+
+
+class JobClient:
+    # Blocking client for notebooks and the Dash app:
+    #   summaries = JobClient().run(specification)
+    #   SimulationPlots(pd.DataFrame(summaries))
+    def __init__(self, url: str = f"http://{JOB_SERVER_HOST}:{JOB_SERVER_PORT}"):
+        self.url = url.rstrip("/")
+
+    def _request(self, path: str, document=None):
+        request = urllib.request.Request(
+            self.url + path,
+            data=None if document is None else json.dumps(document).encode(),
+            headers={"Content-Type": "application/json"},
+            method="GET" if document is None else "POST",
+        )
+        return urllib.request.urlopen(request)
+
+    def submit(self, specification: dict) -> dict:
+        with self._request("/jobs", specification) as response:
+            return json.load(response)
+
+    def status(self, job: str) -> dict:
+        with self._request(f"/jobs/{job}") as response:
+            return json.load(response)
+
+    def events(self, job: str):
+        with self._request(f"/jobs/{job}/events") as response:
+            for line in response:
+                yield json.loads(line)
+
+    def run(self, specification: dict, on_event=None) -> list[dict]:
+        # summaries of the specification, computed or from the cache;
+        # on_event(event) sees progress and partial summaries meanwhile
+        document = self.submit(specification)
+        if "summaries" in document:
+            return document["summaries"]
+        for event in self.events(document["job"]):
+            if on_event is not None:
+                on_event(event)
+            if event["event"] == "failed":
+                raise RuntimeError(event["error"])
+        return self.status(document["job"])["summaries"]
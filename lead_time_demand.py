@@ -0,0 +1,178 @@
+import numpy as np
+
+from safety_stock_experimentations.config import LEAD_TIME, LEAD_TIME_GRID_SIZE
+from safety_stock_experimentations.demand_distribution import DemandEnvironment
+
+GRID_STD_SPAN = 10  # the grid covers [0, mean + GRID_STD_SPAN * std] of lead-time demand
+PERIODS_PER_CHUNK = 64  # aligned blocks of periods sharing one grid; bounds the arrays of one convolution
+SAMPLING_MODES = ("random", "sobol", "antithetic", "latin_hypercube")
+
+
+def lead_time_days(environment: DemandEnvironment, time_periods: np.ndarray, lead_time: int = LEAD_TIME) -> np.ndarray:
+    # (periods, lead_time) days whose demand falls in the lead time after each
+    # period, clipped to the horizon like the sampling agents
+    return np.minimum(
+        np.asarray(time_periods)[:, None] + np.arange(1, lead_time + 1), len(environment) - 1
+    )
+
+
+def lead_time_demand_quantiles(
+    environment: DemandEnvironment,
+    time_periods: np.ndarray,
+    probabilities: np.ndarray,
+    lead_time: int = LEAD_TIME,
+    grid_size: int = LEAD_TIME_GRID_SIZE,
+) -> np.ndarray:
+    # Quantiles of the demand summed over the lead time after each period,
+    # shape (probabilities, periods): the per-day mixture densities are
+    # discretised on a grid and convolved with an FFT. Periods are grouped in
+    # aligned blocks of PERIODS_PER_CHUNK that share one grid, so every day is
+    # discretised and transformed once per block rather than once per lead-time
+    # window, and the quantile of a period does not depend on which other
+    # periods are asked for.
+    probabilities = np.asarray(probabilities, dtype=float)
+    time_periods = np.asarray(time_periods)
+    quantiles = np.empty((len(probabilities), len(time_periods)))
+    chunks = time_periods // PERIODS_PER_CHUNK
+    for chunk in np.unique(chunks):
+        selected = np.flatnonzero(chunks == chunk)
+        chunk_periods = np.arange(chunk * PERIODS_PER_CHUNK, (chunk + 1) * PERIODS_PER_CHUNK)
+        step = _grid_step(environment.components, lead_time_days(environment, chunk_periods, lead_time), grid_size)
+        quantiles[:, selected] = _convolved_quantiles(
+            environment.components,
+            lead_time_days(environment, time_periods[selected], lead_time),
+            probabilities,
+            step,
+            grid_size,
+        )
+    return quantiles
+
+
+def _component_weights(components) -> np.ndarray:
+    weights = np.array([component.weight for component in components], dtype=float)
+    return weights / weights.sum()
+
+
+def _grid_step(components, days: np.ndarray, grid_size: int) -> float:
+    # one grid covering [0, mean + GRID_STD_SPAN * std] of the lead-time demand
+    # of every period, from the exact per-day mixture moments
+    day_mean = np.zeros(days.shape)
+    day_second_moment = np.zeros(days.shape)
+    for weight, component in zip(_component_weights(components), components):
+        if component.rate is not None:
+            mean = component.rate[days].astype(float)
+            variance = mean
+        else:
+            mean = component.shape[days].astype(float) * component.scale[days]
+            variance = mean * component.scale[days]
+        day_mean += weight * mean
+        day_second_moment += weight * (variance + mean**2)
+    total_mean = day_mean.sum(axis=1)
+    total_std = np.sqrt((day_second_moment - day_mean**2).sum(axis=1))
+    return float(np.max(total_mean + GRID_STD_SPAN * total_std)) / (grid_size - 1)
+
+
+def _convolved_quantiles(
+    components, days: np.ndarray, probabilities: np.ndarray, step: float, grid_size: int
+) -> np.ndarray:
+    from scipy import special
+    from scipy.fft import irfft, next_fast_len, rfft
+
+    unique_days, windows = np.unique(days, return_inverse=True)
+    windows = windows.reshape(days.shape)
+
+    # probability of each day's demand rounding to grid point i, from the CDF at
+    # the cell edges (i +- 0.5) * step
+    edges = (np.arange(grid_size + 1) - 0.5) * step
+    masses = np.zeros((len(unique_days), grid_size))
+    for weight, component in zip(_component_weights(components), components):
+        if component.rate is not None:
+            cdf = special.pdtr(np.floor(np.maximum(edges, 0)), component.rate[unique_days][:, None])
+            cdf = np.where(edges < 0, 0.0, cdf)
+        else:
+            cdf = special.gammainc(
+                component.shape[unique_days][:, None],
+                np.maximum(edges, 0) / component.scale[unique_days][:, None],
+            )
+        masses += weight * np.diff(cdf, axis=-1)
+
+    # padded so the lead-time convolution does not wrap around
+    n_fft = next_fast_len(days.shape[1] * grid_size)
+    spectrum = np.prod(rfft(masses, n=n_fft, axis=-1)[windows], axis=1)
+    density = np.maximum(irfft(spectrum, n=n_fft, axis=-1)[:, :grid_size], 0.0)
+    cdf = np.cumsum(density, axis=-1)
+    return np.array(
+        [[np.interp(probability, period_cdf, edges[1:]) for period_cdf in cdf] for probability in probabilities]
+    )
+
+
+def lead_time_uniforms(sampling: str, n_samples: int, dimension: int, rng=np.random, n_sets: int = 1) -> np.ndarray:
+    # (n_sets, n_samples, dimension) points in (0, 1), one point set per
+    # period: pseudo-random, scrambled Sobol, antithetic pairs (u, 1 - u) or a
+    # Latin hypercube; rng is the global NumPy state or a np.random.Generator
+    # and seeds the randomisation. All sets come from one draw, so the cost per
+    # period does not include building a QMC engine.
+    if sampling == "random":
+        return rng.random((n_sets, n_samples, dimension))
+    if sampling == "antithetic":
+        half = rng.random((n_sets, (n_samples + 1) // 2, dimension))
+        return np.concatenate([half, 1 - half], axis=1)[:, :n_samples]
+
+    generator = rng if isinstance(rng, np.random.Generator) else np.random.default_rng(rng.randint(2**31))
+    if sampling == "sobol":
+        from scipy.stats import qmc
+
+        # consecutive blocks of a power of two of one scrambled sequence, each
+        # with the balance properties of a full net, cut to n_samples
+        block_size = 2 ** int(np.ceil(np.log2(max(n_samples, 2))))
+        engine = qmc.Sobol(dimension, rng=generator)
+        points = np.concatenate([engine.random(block_size), engine.random(block_size * (n_sets - 1))])
+        return points.reshape(n_sets, block_size, dimension)[:, :n_samples]
+    if sampling == "latin_hypercube":
+        # one stratum per sample in every dimension, in random order, jittered
+        # uniformly within the stratum (scipy.stats.qmc.LatinHypercube)
+        strata = generator.random((n_sets, n_samples, dimension)).argsort(axis=1)
+        return (strata + generator.random((n_sets, n_samples, dimension))) / n_samples
+    raise ValueError(f"Unknown sampling mode {sampling!r}, expected one of {SAMPLING_MODES}")
+
+
+def lead_time_dimension(environment: DemandEnvironment, lead_time: int = LEAD_TIME) -> int:
+    # one uniform per day for the demand, plus one per day to pick the mixture component
+    return lead_time if len(environment.components) == 1 else 2 * lead_time
+
+
+def lead_time_demand_from_uniforms(environment: DemandEnvironment, days: np.ndarray, uniforms: np.ndarray) -> np.ndarray:
+    # lead-time demand of each row of uniforms by inversion: the last
+    # lead-time columns go through the component inverse CDFs, the ones before
+    # (mixtures only) choose the component of each day. days is (lead_time,)
+    # with uniforms (samples, dimension), or (periods, lead_time) with uniforms
+    # (periods, samples, dimension).
+    from scipy import special
+
+    n_days = days.shape[-1]
+    uniforms = np.clip(uniforms, np.finfo(float).tiny, 1 - np.finfo(float).eps)
+    value_uniforms = uniforms[..., -n_days:]
+    components = environment.components
+    if len(components) == 1:
+        chosen = np.zeros(value_uniforms.shape, dtype=int)
+    else:
+        weights = np.array([component.weight for component in components], dtype=float)
+        chosen = np.minimum(
+            np.searchsorted(np.cumsum(weights / weights.sum()), uniforms[..., :n_days], side="right"),
+            len(components) - 1,
+        )
+
+    day_indices = np.broadcast_to(np.expand_dims(days, -2), value_uniforms.shape)
+    demand = np.empty(value_uniforms.shape)
+    for index, component in enumerate(components):
+        mask = chosen == index
+        component_days = day_indices[mask]
+        if component.rate is not None:
+            # smallest k with P(X <= k) >= u
+            rate = component.rate[component_days].astype(float)
+            demand[mask] = np.ceil(special.pdtrik(value_uniforms[mask], rate))
+        else:
+            demand[mask] = special.gammaincinv(
+                component.shape[component_days].astype(float), value_uniforms[mask]
+            ) * component.scale[component_days]
+    return demand.sum(axis=-1)
@@ -0,0 +1,160 @@
+import os
+import uuid
+from collections.abc import Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from safety_stock_experimentations.config import SIM_DAYS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+AGGREGATION_KEYS = ("agent", "environment", "service_level")
+
+
+class RunningMoments:
+    # Welford count/mean/M2 per index (a day of the daily metrics, or a metric
+    # of the per-run summaries). update() takes a scalar index or an array of
+    # distinct indices (one run), merge() combines two partial states
+    # (Chan et al.), so memory does not grow with the number of runs.
+    def __init__(self, size: int = SIM_DAYS):
+        self.count = np.zeros(size, dtype=np.int64)
+        self.mean = np.zeros(size)
+        self._m2 = np.zeros(size)
+
+    def update(self, index, value):
+        count = self.count[index] + 1
+        delta = value - self.mean[index]
+        mean = self.mean[index] + delta / count
+        self._m2[index] += delta * (value - mean)
+        self.mean[index] = mean
+        self.count[index] = count
+
+    def merge(self, other: "RunningMoments"):
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(count > 0, other.count / count, 0.0)
+        self.mean = self.mean + delta * weight
+        self._m2 = self._m2 + other._m2 + delta**2 * self.count * weight
+        self.count = count
+
+    @property
+    def variance(self) -> np.ndarray:
+        # sample variance, NaN where an index has fewer than two observations
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, self._m2 / (self.count - 1), np.nan)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+
+class DailyMetricsAggregator:
+    # Online per-day mean/std of daily metrics for every (agent, environment,
+    # service level). Consumes Simulator.stream_daily_metrics records one at a
+    # time, or whole runs from summaries, in constant memory per key.
+    def __init__(self, metrics: Iterable[str] = ("inventory", "demand"), n_days: int = SIM_DAYS):
+        self.metrics = tuple(metrics)
+        self.n_days = n_days
+        self._moments = {}
+
+    def _moments_for(self, key) -> dict[str, RunningMoments]:
+        moments = self._moments.get(key)
+        if moments is None:
+            moments = {metric: RunningMoments(self.n_days) for metric in self.metrics}
+            self._moments[key] = moments
+        return moments
+
+    def update(self, agent: str, environment: str, daily_metrics: dict):
+        moments = self._moments_for((agent, environment, float(daily_metrics["service_level"])))
+        for metric in self.metrics:
+            moments[metric].update(daily_metrics["day"], daily_metrics[metric])
+
+    def consume(self, agent: str, environment: str, stream: Iterable[dict]):
+        for daily_metrics in stream:
+            self.update(agent, environment, daily_metrics)
+
+    def update_run(
+        self, agent: str, environment: str, service_level: float, daily_performance_metrics: dict
+    ):
+        # one Welford step for every day of a finished run
+        moments = self._moments_for((agent, environment, float(service_level)))
+        days = daily_performance_metrics["day"]
+        for metric in self.metrics:
+            moments[metric].update(days, daily_performance_metrics[metric].astype(float))
+
+    def merge(self, other: "DailyMetricsAggregator"):
+        for key, other_moments in other._moments.items():
+            moments = self._moments_for(key)
+            for metric in self.metrics:
+                moments[metric].merge(other_moments[metric])
+
+    def runs(self) -> dict[tuple, int]:
+        # runs folded in per (agent, environment, service level)
+        return {key: int(moments[self.metrics[0]].count.max()) for key, moments in self._moments.items()}
+
+    @classmethod
+    def from_dataframe(cls, frame: "pd.DataFrame", n_days: int = SIM_DAYS) -> "DailyMetricsAggregator":
+        # inverse of to_dataframe() with every key, so a saved state can take
+        # further runs
+        metrics = [column.removesuffix("_mean") for column in frame.columns if column.endswith("_mean")]
+        aggregator = cls(metrics, n_days)
+        for key, rows in frame.groupby(list(AGGREGATION_KEYS), observed=True):
+            moments = aggregator._moments_for((str(key[0]), str(key[1]), float(key[2])))
+            days = rows["day"].to_numpy(int)
+            count = rows["count"].to_numpy(np.int64)
+            for metric in metrics:
+                moments[metric].count[days] = count
+                moments[metric].mean[days] = rows[f"{metric}_mean"].to_numpy(float)
+                moments[metric]._m2[days] = np.nan_to_num(rows[f"{metric}_std"].to_numpy(float) ** 2 * (count - 1))
+        return aggregator
+
+    @classmethod
+    def load(cls, path: str | os.PathLike, n_days: int = SIM_DAYS) -> "DailyMetricsAggregator | None":
+        import pandas as pd
+
+        path = Path(path)
+        return cls.from_dataframe(pd.read_parquet(path), n_days) if path.exists() else None
+
+    def save(self, path: str | os.PathLike):
+        # written to a temporary file and renamed, like the results store
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        self.to_dataframe().to_parquet(temporary_path, index=False)
+        os.replace(temporary_path, path)
+
+    def to_dataframe(self, by: Iterable[str] = AGGREGATION_KEYS) -> "pd.DataFrame":
+        # one row per (by..., day) with {metric}_mean and {metric}_std; keys
+        # left out of `by` are pooled
+        import pandas as pd
+
+        by = tuple(by)
+        key_indices = [AGGREGATION_KEYS.index(name) for name in by]
+        pooled = {}
+        for key, moments in self._moments.items():
+            pooled_key = tuple(key[index] for index in key_indices)
+            if pooled_key not in pooled:
+                pooled[pooled_key] = {metric: RunningMoments(self.n_days) for metric in self.metrics}
+            for metric in self.metrics:
+                pooled[pooled_key][metric].merge(moments[metric])
+
+        frames = []
+        for pooled_key, moments in pooled.items():
+            days = np.flatnonzero(moments[self.metrics[0]].count)
+            columns = {name: value for name, value in zip(by, pooled_key)}
+            columns["day"] = days
+            columns["count"] = moments[self.metrics[0]].count[days]
+            for metric in self.metrics:
+                columns[f"{metric}_mean"] = moments[metric].mean[days]
+                columns[f"{metric}_std"] = moments[metric].std[days]
+            frames.append(pd.DataFrame(columns))
+        if not frames:
+            return pd.DataFrame(
+                columns=[*by, "day", "count"]
+                + [f"{metric}_{statistic}" for metric in self.metrics for statistic in ("mean", "std")]
+            )
+        return pd.concat(frames, ignore_index=True).sort_values([*by, "day"], ignore_index=True)
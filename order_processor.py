@@ -10,30 +10,76 @@ class Order:
 
 
 class OrderProcessor:
-    def __init__(self):
-        self.order_queue: List[Order] = []  # self.order_queue stores Order objects
+    # Order pipeline keyed by arrival day: a ring buffer holding the quantity due on
+    # each of the next max_lead_time + 1 days, plus a running in-transit total, so
+    # placing, receiving and querying orders are all O(1) when manage_order is
+    # called every day. Days may be skipped: orders due on a day that was never
+    # received are dropped, as with the previous list-based queue.
+    def __init__(self, max_lead_time: int = LEAD_TIME):
+        self._arrivals = [0] * (max_lead_time + 1)  # slot = arrival_day % len(self._arrivals)
+        self._in_transit = 0
+        self._first_day = 0  # slots hold arrival days [self._first_day, self._first_day + len)
 
-    def place_order(self, time_period: int, quantity: int):
-        arrival_day = time_period + LEAD_TIME  # time_period = current_day
-        self.order_queue.append(Order(arrival_day=arrival_day, quantity=quantity))
+    @property
+    def order_queue(self) -> List[Order]:
+        return [
+            Order(arrival_day=day, quantity=self.get_order_at_date(day))
+            for day in range(self._first_day, self._first_day + len(self._arrivals))
+            if self.get_order_at_date(day)
+        ]
+
+    def place_order(self, time_period: int, quantity: int, lead_time: int = LEAD_TIME):
+        if lead_time < 1:
+            raise ValueError("Orders need a lead time of at least one day")
+        self._advance(time_period)
+        arrival_day = time_period + lead_time  # time_period = current_day
+        if arrival_day < self._first_day:
+            return  # due on a day already received
+        if arrival_day >= self._first_day + len(self._arrivals):
+            self._resize(arrival_day - self._first_day + 1)
+
+        self._arrivals[arrival_day % len(self._arrivals)] += quantity
+        self._in_transit += quantity
 
     def manage_order(self, time_period: int) -> int:
-        arrived_orders = [
-            order for order in self.order_queue if order.arrival_day == time_period
-        ]
-        # if order.arrival_day < current_day order excluded after each call of process_order
-        self.order_queue = [
-            order for order in self.order_queue if order.arrival_day > time_period
-        ]
-        return sum(order.quantity for order in arrived_orders)
+        self._advance(time_period)
+        if self._first_day != time_period:
+            return 0  # already received
+        slot = time_period % len(self._arrivals)
+        arrived_quantity = self._arrivals[slot]
+        self._arrivals[slot] = 0
+        self._in_transit -= arrived_quantity
+        self._first_day = time_period + 1
+        return arrived_quantity
 
     def get_order_at_date(self, day):
-        orders_at_given_date = [order for order in self.order_queue if order.arrival_day == day]
-        return orders_at_given_date[0].quantity if orders_at_given_date else 0
+        if not self._first_day <= day < self._first_day + len(self._arrivals):
+            return 0
+        return self._arrivals[day % len(self._arrivals)]
 
     def get_incoming_orders(self, current_day: int) -> int:
-        return sum(
-            order.quantity
-            for order in self.order_queue
-            if order.arrival_day > current_day
+        # in-transit quantity arriving after current_day; without skipped days the
+        # range below holds current_day at most
+        last_day = min(current_day, self._first_day + len(self._arrivals) - 1)
+        if last_day < self._first_day:
+            return self._in_transit  # current_day already received
+        return self._in_transit - sum(
+            self.get_order_at_date(day) for day in range(self._first_day, last_day + 1)
         )
+
+    def _advance(self, day: int):
+        # drops the orders due before `day` that manage_order did not receive,
+        # so their slots can hold later arrival days
+        if day <= self._first_day:
+            return
+        for skipped_day in range(self._first_day, min(day, self._first_day + len(self._arrivals))):
+            slot = skipped_day % len(self._arrivals)
+            self._in_transit -= self._arrivals[slot]
+            self._arrivals[slot] = 0
+        self._first_day = day
+
+    def _resize(self, size: int):
+        arrivals = [0] * size
+        for day in range(self._first_day, self._first_day + len(self._arrivals)):
+            arrivals[day % size] = self.get_order_at_date(day)
+        self._arrivals = arrivals
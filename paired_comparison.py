@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+# Run summaries carry their trial number in the "day" column: the sweep has set
+# summary["day"] = trial_number since the first main.py, and the results store
+# partitions and resumes runs on it. Runs of one environment with the same "day"
+# share the generated demand (and, with COMMON_RANDOM_NUMBERS, the per-day
+# random streams), which is what makes them pairs.
+TRIAL_COLUMN = "day"
+PAIRING_COLUMNS = ("environment", "agent", "service_level")
+
+
+def paired_differences(
+    inventory_data_summaries: pd.DataFrame,
+    metric: str,
+    compare: str = "agent",
+    baseline=None,
+) -> pd.DataFrame:
+    # Difference of `metric` between each level of `compare` ("agent" or
+    # "service_level") and the baseline level, paired on trial within every
+    # combination of the other pairing columns. Runs sharing an environment and
+    # trial (and their random streams) are positively correlated, so the paired
+    # standard error is below the one of two independent samples;
+    # variance_reduction is 1 - var(paired) / (var(a) + var(b)).
+    group_columns = [column for column in PAIRING_COLUMNS if column != compare]
+    table = inventory_data_summaries.pivot_table(
+        index=group_columns + [TRIAL_COLUMN],
+        columns=compare,
+        values=metric,
+        observed=True,
+    )
+    if baseline is None:
+        baseline = table.columns[0]
+
+    rows = []
+    for group, runs in table.groupby(level=group_columns, observed=True):
+        group = group if isinstance(group, tuple) else (group,)
+        for level in table.columns:
+            if level == baseline:
+                continue
+            pairs = runs[[level, baseline]].dropna()
+            n_pairs = len(pairs)
+            if not n_pairs:  # e.g. a partial sweep read back by the report command
+                continue
+            differences = pairs[level] - pairs[baseline]
+            paired_variance = differences.var(ddof=1)
+            unpaired_variance = pairs[level].var(ddof=1) + pairs[baseline].var(ddof=1)
+            rows.append(
+                {
+                    **dict(zip(group_columns, group)),
+                    compare: level,
+                    "baseline": baseline,
+                    "n_pairs": n_pairs,
+                    "mean_difference": differences.mean(),
+                    "paired_std_error": np.sqrt(paired_variance / n_pairs),
+                    "unpaired_std_error": np.sqrt(unpaired_variance / n_pairs),
+                    "variance_reduction": (
+                        1 - paired_variance / unpaired_variance if unpaired_variance > 0 else np.nan
+                    ),
+                }
+            )
+    return pd.DataFrame(rows)
@@ -1,68 +1,98 @@
+from typing import TYPE_CHECKING
+
 import numpy as np
 
+from safety_stock_experimentations.config import HISTO_DAYS, SIM_DAYS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+TRACKED_ORDER_OFFSETS = (1, 2, 3)  # order_t+1 .. order_t+3
+
+DAILY_METRIC_DTYPES = {
+    "day": np.int32,
+    "demand": np.int64,
+    "fulfilled_demand": np.float64,
+    "write_offs": np.float64,
+    "inventory": np.float64,
+    "is_stockout_day": np.bool_,
+    **{f"order_t+{offset}": np.float64 for offset in TRACKED_ORDER_OFFSETS},
+}
+
+
+def performance_summary_from_columns(daily_performance_metrics: dict[str, np.ndarray]) -> dict:
+    demand = daily_performance_metrics["demand"]
+    fulfilled_demand = daily_performance_metrics["fulfilled_demand"]
+    total_demand = int(demand.sum())
+    total_fulfilled_demand = float(fulfilled_demand.sum())
+    stock_out_count = int(daily_performance_metrics["is_stockout_day"].sum())
+
+    fill_rate = (
+        1 - (total_demand - total_fulfilled_demand) / total_demand
+        if total_demand > 0
+        else 0
+    )
+    avg_service_level = (len(demand) - stock_out_count) / len(demand)
+
+    return {
+        "total_demand": total_demand,
+        "fulfilled_demand": total_fulfilled_demand,
+        "fill_rate": fill_rate,
+        "write_offs": float(daily_performance_metrics["write_offs"].sum()),
+        "stock_out_count": stock_out_count,
+        "total_lost_sales": float(np.maximum(demand - fulfilled_demand, 0).sum()),
+        "avg_service_level": avg_service_level,
+        "avg_inventory_level": float(daily_performance_metrics["inventory"].mean()),
+        "daily_performance_metrics": daily_performance_metrics,
+    }
+
+
+def daily_record(day, demand_quantity, fulfilled_demand, daily_writeoff, inventory, order_processor) -> dict:
+    # one tracked day of one run, keyed like DAILY_METRIC_DTYPES
+    record = {
+        "day": day,
+        "demand": demand_quantity,
+        "fulfilled_demand": fulfilled_demand,
+        "write_offs": daily_writeoff,
+        "inventory": inventory,
+        "is_stockout_day": fulfilled_demand < demand_quantity,
+    }
+    for offset in TRACKED_ORDER_OFFSETS:
+        record[f"order_t+{offset}"] = order_processor.get_order_at_date(day + offset)
+    return record
+
 
 class PerformanceTracker:
+    # One preallocated column per daily metric, sized for the simulated horizon.
 
-    def __init__(self):
-        self.total_demand = 0
-        self.total_fulfilled_demand = 0
-        self.write_offs = 0
-        self.stock_out_count = 0
-        self.total_lost_sales = 0
-        self.days_without_stockout = 0
-        self.daily_performance_metrics = []
+    def __init__(self, n_days: int = SIM_DAYS - HISTO_DAYS):
+        self._columns = {
+            name: np.zeros(n_days, dtype=dtype) for name, dtype in DAILY_METRIC_DTYPES.items()
+        }
+        self._n_days = 0
 
     def daily_performance(
         self, day, demand_quantity, fulfilled_demand, daily_writeoff, inventory, order_processor
     ):
-        self.total_fulfilled_demand += fulfilled_demand
-        self.write_offs += daily_writeoff
-        self.total_lost_sales += max(demand_quantity - fulfilled_demand, 0)
-        self.total_demand += demand_quantity
-        is_stockout_day = fulfilled_demand < demand_quantity
-
-        if is_stockout_day:
-            self.stock_out_count += 1
-        else:
-            self.days_without_stockout += 1
-
-        self.daily_performance_metrics.append(
-            {
-                "day": day,
-                "demand": demand_quantity,
-                "fulfilled_demand": fulfilled_demand,
-                "write_offs": daily_writeoff,
-                "inventory": inventory,
-                "is_stockout_day": is_stockout_day,
-                "order_t+1": order_processor.get_order_at_date(day + 1),
-                "order_t+2": order_processor.get_order_at_date(day + 2),
-                "order_t+3": order_processor.get_order_at_date(day + 3),
-            }
+        self.record(
+            daily_record(day, demand_quantity, fulfilled_demand, daily_writeoff, inventory, order_processor)
         )
 
-    def performance_summary(self):
-        fill_rate = (
-            1 - (self.total_demand - self.total_fulfilled_demand) / self.total_demand
-            if self.total_demand > 0
-            else 0
-        )
-        avg_service_level = self.days_without_stockout / (
-            len(self.daily_performance_metrics)
-        )
+    def record(self, daily_metrics: dict):
+        index = self._n_days
+        for name, column in self._columns.items():
+            column[index] = daily_metrics[name]
+        self._n_days += 1
 
-        return {
-            "total_demand": self.total_demand,
-            "fulfilled_demand": self.total_fulfilled_demand,
-            "fill_rate": fill_rate,
-            "write_offs": self.write_offs,
-            "stock_out_count": self.stock_out_count,
-            "total_lost_sales": self.total_lost_sales,
-            "avg_service_level": avg_service_level,
-            "avg_inventory_level": np.mean(
-                [
-                    performance_metrics_for_given_day["inventory"]
-                    for performance_metrics_for_given_day in self.daily_performance_metrics
-                ]
-            ),
-            "daily_performance_metrics": self.daily_performance_metrics,
-        }
+    @property
+    def daily_performance_metrics(self) -> dict[str, np.ndarray]:
+        # views on the filled part of each column, no copy
+        return {name: column[: self._n_days] for name, column in self._columns.items()}
+
+    def to_dataframe(self) -> "pd.DataFrame":
+        import pandas as pd
+
+        return pd.DataFrame(self.daily_performance_metrics, copy=False)
+
+    def performance_summary(self):
+        return performance_summary_from_columns(self.daily_performance_metrics)
@@ -0,0 +1,168 @@
+import builtins
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+_NO_PHASE = nullcontext()
+
+
+class PhaseTimer:
+    # Accumulates wall time and call counts per named phase.
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] += time.perf_counter() - start
+            self.counts[name] += 1
+
+    def merge(self, phase_totals: dict):
+        for name, phase in phase_totals.items():
+            self.totals[name] += phase["seconds"]
+            self.counts[name] += phase["calls"]
+
+    def to_dict(self) -> dict:
+        return {
+            name: {"seconds": self.totals[name], "calls": self.counts[name]}
+            for name in sorted(self.totals, key=self.totals.get, reverse=True)
+        }
+
+    def write_json(self, path: str | os.PathLike, update: bool = False):
+        # update=True keeps the phases of an existing file that were not timed here
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        phases = self.to_dict()
+        if update and path.exists():
+            with open(path) as file:
+                phases = {**json.load(file), **phases}
+        with open(path, "w") as file:
+            json.dump(phases, file, indent=2)
+
+    def report(self) -> str:
+        total = sum(self.totals.values())
+        lines = [f"{'phase':<45}{'seconds':>12}{'share':>8}{'calls':>10}"]
+        for name, phase in self.to_dict().items():
+            share = phase["seconds"] / total if total else 0.0
+            lines.append(f"{name:<45}{phase['seconds']:>12.3f}{share:>8.1%}{phase['calls']:>10}")
+        return "\n".join(lines)
+
+
+class NullPhaseTimer:
+    # Stand-in when profiling is off; phase() costs a single attribute lookup.
+    def phase(self, name: str):
+        return _NO_PHASE
+
+    def merge(self, phase_totals: dict):
+        pass
+
+    def to_dict(self) -> dict:
+        return {}
+
+
+NULL_PHASE_TIMER = NullPhaseTimer()
+
+
+class ImportProfiler:
+    # Wall time spent importing, per top-level package, while active(). Time is
+    # exclusive like `python -X importtime`: a package's own module bodies are
+    # charged to it and the packages they import to those packages. This module
+    # imports only the stdlib, so the profiler can start before numpy is loaded.
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self._child_seconds = []
+
+    @contextmanager
+    def active(self):
+        original_import = builtins.__import__
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level:
+                package = (globals or {}).get("__package__") or ""
+            else:
+                package = name
+            self._child_seconds.append(0.0)
+            start = time.perf_counter()
+            try:
+                return original_import(name, globals, locals, fromlist, level)
+            finally:
+                elapsed = time.perf_counter() - start
+                child_seconds = self._child_seconds.pop()
+                self.totals[package.partition(".")[0]] += elapsed - child_seconds
+                if self._child_seconds:
+                    self._child_seconds[-1] += elapsed
+
+        builtins.__import__ = timed_import
+        try:
+            yield self
+        finally:
+            builtins.__import__ = original_import
+
+    def report(self, top: int = 15) -> str:
+        total = sum(self.totals.values())
+        lines = [f"{'package':<45}{'seconds':>12}{'share':>8}"]
+        for package in sorted(self.totals, key=self.totals.get, reverse=True)[:top]:
+            seconds = self.totals[package]
+            share = seconds / total if total else 0.0
+            lines.append(f"{package:<45}{seconds:>12.3f}{share:>8.1%}")
+        lines.append(f"{'total':<45}{total:>12.3f}")
+        return "\n".join(lines)
+
+
+def profile_single_run(
+    environment_key,
+    environment_info: dict,
+    agent_key,
+    agent_info: dict,
+    service_level: float,
+    output_path: str | os.PathLike,
+    seed: int,
+    trial_number: int = 0,
+    common_random_numbers: bool = False,
+    environment_cache=None,
+    renderer: str = "html",
+):
+    # pyinstrument profile of one Simulator.run_simulation, written as an HTML page
+    # or a speedscope JSON file (renderer="speedscope"). The run is seeded like
+    # run_sweep_task, so it is the sweep's run of that trial and service level.
+    import numpy as np
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+
+    from safety_stock_experimentations.simulator import Simulator
+    from safety_stock_experimentations.sweep import (
+        CommonRandomNumbers,
+        build_environment,
+        seed_global_rngs,
+    )
+
+    environment = build_environment(
+        environment_info["class"](),
+        np.random.SeedSequence(seed, spawn_key=(environment_key, trial_number)),
+        environment_cache,
+    )
+    random_streams = (
+        CommonRandomNumbers(seed, environment_key, trial_number) if common_random_numbers else None
+    )
+    seed_global_rngs(np.random.SeedSequence(seed, spawn_key=(environment_key, trial_number, agent_key)))
+    simulator = Simulator(agent_info["class"](environment, service_level, random_streams), environment)
+
+    profiler = Profiler()
+    profiler.start()
+    simulator.run_simulation()
+    profiler.stop()
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if renderer == "speedscope":
+        output_path.write_text(profiler.output(renderer=SpeedscopeRenderer()))
+    else:
+        output_path.write_text(profiler.output_html())
+    return output_path
@@ -0,0 +1,224 @@
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow.dataset as ds
+
+SUMMARIES_DATASET = "summaries"
+DAILY_METRICS_DATASET = "daily_metrics"
+PARTITION_COLUMNS = ["environment", "agent"]
+FINGERPRINT_FILE = "sweep.json"  # settings of the sweeps whose runs are stored
+
+# compact on-disk types for the daily metrics table
+STORED_DAILY_METRIC_TYPES = {
+    "day": pa.int16(),
+    "demand": pa.int32(),
+    "fulfilled_demand": pa.float32(),
+    "write_offs": pa.float32(),
+    "inventory": pa.float32(),
+    "is_stockout_day": pa.bool_(),
+    "order_t+1": pa.float32(),
+    "order_t+2": pa.float32(),
+    "order_t+3": pa.float32(),
+}
+
+
+def _arrow_array(values, arrow_type: pa.DataType | None = None) -> pa.Array:
+    # pa.array imports pandas to look for pandas objects, so the columns written
+    # by a sweep are wrapped from their NumPy buffers
+    values = np.asarray(values)
+    if arrow_type is None:
+        arrow_type = pa.from_numpy_dtype(values.dtype)
+    if pa.types.is_boolean(arrow_type):
+        data = np.packbits(values.astype(bool), bitorder="little")
+    else:
+        data = np.ascontiguousarray(values, dtype=arrow_type.to_pandas_dtype())
+    return pa.Array.from_buffers(arrow_type, len(values), [None, pa.py_buffer(data)])
+
+
+class ResultsStore:
+    # Hive-partitioned Parquet datasets (environment=/agent=) holding one summary
+    # row and the daily metrics of every completed run. Files are written
+    # atomically and the summary file is written last, so a stored summary means
+    # the whole run is on disk.
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+
+    def write_summaries(self, inventory_data_summaries: list[dict]):
+        groups = {}
+        for summary in inventory_data_summaries:
+            key = (summary["environment"], summary["agent"], summary["day"])
+            groups.setdefault(key, []).append(summary)
+
+        for (environment, agent, trial_number), summaries in groups.items():
+            file_name = f"trial-{trial_number:05d}-{uuid.uuid4().hex[:8]}.parquet"
+            self._write_table(
+                DAILY_METRICS_DATASET, environment, agent, file_name,
+                self._daily_metrics_table(summaries),
+            )
+            self._write_table(
+                SUMMARIES_DATASET, environment, agent, file_name, self._summaries_table(summaries)
+            )
+
+    def claim(self, fingerprint: dict):
+        # Records the fingerprint of a sweep resuming into this store (see
+        # SweepExecutor.fingerprint), or raises ValueError when the stored runs
+        # come from a different sweep: runs are keyed by (environment, agent,
+        # trial, service level) only, so the seed and simulation settings must
+        # match, and a stored environment or agent name must keep its meaning.
+        # Environments and agents new to the store are added.
+        fingerprint = json.loads(json.dumps(fingerprint, sort_keys=True))
+        path = self.root / FINGERPRINT_FILE
+        stored = {"environments": {}, "agents": {}}
+        if path.exists():
+            with open(path) as file:
+                stored = json.load(file)
+        elif (self.root / SUMMARIES_DATASET).exists():
+            raise ValueError(f"{self.root} holds runs without a {FINGERPRINT_FILE}, written by an older version")
+
+        settings = {name: value for name, value in fingerprint.items() if name not in ("environments", "agents")}
+        stored_settings = {name: value for name, value in stored.items() if name not in ("environments", "agents")}
+        differences = sorted(
+            name
+            for name in set(settings) | set(stored_settings)
+            if stored_settings and settings.get(name) != stored_settings.get(name)
+        )
+        for field in ("environments", "agents"):
+            differences += [
+                f"{field}[{name!r}]"
+                for name, description in fingerprint[field].items()
+                if stored[field].get(name, description) != description
+            ]
+        if differences:
+            raise ValueError(
+                f"{self.root} holds runs of a different sweep ({', '.join(differences)} changed); "
+                "use another results directory"
+            )
+
+        claimed = {
+            **settings,
+            **{field: {**stored[field], **fingerprint[field]} for field in ("environments", "agents")},
+        }
+        if claimed != stored:
+            self.root.mkdir(parents=True, exist_ok=True)
+            temporary_path = self.root / f".{FINGERPRINT_FILE}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(temporary_path, "w") as file:
+                json.dump(claimed, file, indent=2, sort_keys=True)
+            os.replace(temporary_path, path)
+
+    def completed_runs(self) -> set[tuple[str, str, int, float]]:
+        # (environment, agent, trial_number, service_level) of every stored run;
+        # read file by file with pyarrow.parquet, since importing pyarrow.dataset
+        # imports pandas and a headless sweep does not need it
+        runs = set()
+        for path in (self.root / SUMMARIES_DATASET).glob("environment=*/agent=*/[!.]*.parquet"):
+            environment = unquote(path.parent.parent.name.partition("=")[2])
+            agent = unquote(path.parent.name.partition("=")[2])
+            summaries = pq.ParquetFile(path).read(columns=["day", "service_level"]).to_pydict()
+            runs.update(
+                (environment, agent, int(trial_number), float(service_level))
+                for trial_number, service_level in zip(summaries["day"], summaries["service_level"])
+            )
+        return runs
+
+    def load_summaries(self, columns: list[str] | None = None) -> "pd.DataFrame":
+        import pandas as pd
+
+        dataset = self._dataset(SUMMARIES_DATASET)
+        if dataset is None:
+            return pd.DataFrame(columns=PARTITION_COLUMNS + (columns or []))
+        if columns is not None:
+            columns = PARTITION_COLUMNS + columns
+        summaries = dataset.to_table(columns=columns).to_pandas()
+        # summaries are small; plain strings keep label arithmetic in the plots working
+        return summaries.astype({column: str for column in PARTITION_COLUMNS})
+
+    def load_daily_metrics(self, columns: list[str] | None = None, filter=None) -> "pd.DataFrame":
+        import pandas as pd
+
+        dataset = self._dataset(DAILY_METRICS_DATASET)
+        if dataset is None:
+            return pd.DataFrame(columns=PARTITION_COLUMNS + (columns or []))
+        if columns is not None:
+            columns = PARTITION_COLUMNS + columns
+        return dataset.to_table(columns=columns, filter=filter).to_pandas()
+
+    def aggregate_daily_metrics(self, by: list[str], aggregations: dict[str, tuple[str, str]]) -> "pd.DataFrame":
+        # aggregations maps output name -> (column, "mean" | "sum" | ...), as in
+        # DataFrame.agg; only the referenced columns are read from disk
+        dataset = self._dataset(DAILY_METRICS_DATASET)
+        columns = sorted(set(by) | {column for column, _ in aggregations.values()})
+        table = dataset.to_table(columns=columns)
+        table = pa.table(
+            {
+                name: column.cast(pa.string()) if pa.types.is_dictionary(column.type) else column
+                for name, column in zip(table.column_names, table.columns)
+            }
+        )
+        aggregated = table.group_by(by).aggregate(list(aggregations.values()))
+        output_names = {
+            f"{column}_{function}": name for name, (column, function) in aggregations.items()
+        }
+        aggregated = aggregated.rename_columns(
+            [output_names.get(name, name) for name in aggregated.column_names]
+        )
+        return aggregated.to_pandas().sort_values(by, ignore_index=True)
+
+    @staticmethod
+    def _summaries_table(summaries: list[dict]) -> pa.Table:
+        names = [
+            name for name in summaries[0] if name not in PARTITION_COLUMNS + ["daily_performance_metrics"]
+        ]
+        return pa.table({name: _arrow_array([summary[name] for summary in summaries]) for name in names})
+
+    def _daily_metrics_table(self, summaries: list[dict]) -> pa.Table:
+        daily_performance_metrics = [summary["daily_performance_metrics"] for summary in summaries]
+        run_lengths = [len(metrics["day"]) for metrics in daily_performance_metrics]
+        columns = {
+            "service_level": _arrow_array(
+                np.repeat([summary["service_level"] for summary in summaries], run_lengths)
+            ),
+            "trial_number": _arrow_array(
+                np.repeat([summary["day"] for summary in summaries], run_lengths), pa.int32()
+            ),
+        }
+        for name, arrow_type in STORED_DAILY_METRIC_TYPES.items():
+            columns[name] = _arrow_array(
+                np.concatenate([metrics[name] for metrics in daily_performance_metrics]), arrow_type
+            )
+        return pa.table(columns)
+
+    def _write_table(self, dataset_name, environment, agent, file_name, table: pa.Table):
+        directory = (
+            self.root
+            / dataset_name
+            / f"environment={quote(environment, safe='')}"
+            / f"agent={quote(agent, safe='')}"
+        )
+        directory.mkdir(parents=True, exist_ok=True)
+        temporary_path = directory / f".{file_name}.tmp"
+        pq.write_table(table, temporary_path)
+        os.replace(temporary_path, directory / file_name)
+
+    def _dataset(self, dataset_name) -> "ds.Dataset | None":
+        path = self.root / dataset_name
+        if not path.exists():
+            return None
+        import pyarrow.dataset as ds
+
+        return ds.dataset(
+            path,
+            format="parquet",
+            partitioning=ds.HivePartitioning.discover(infer_dictionary=True),
+            exclude_invalid_files=True,
+            ignore_prefixes=["."],
+        )
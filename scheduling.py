@@ -0,0 +1,135 @@
+import heapq
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+from safety_stock_experimentations.config import MC_SIMS, SIM_DAYS
+
+COST_HISTORY_RUNS = 100  # recorded runs per key beyond which older timings fade out
+
+
+def qualified_name(factory) -> str:
+    factory = getattr(factory, "func", factory)  # a functools.partial binding parameters
+    return f"{factory.__module__}.{factory.__qualname__}"
+
+
+def cost_key(agent_class, environment_class, sim_days: int = SIM_DAYS, mc_sims: int = MC_SIMS) -> str:
+    return "|".join(
+        [
+            qualified_name(agent_class),
+            qualified_name(environment_class),
+            f"sim_days={sim_days}",
+            f"mc_sims={mc_sims}",
+        ]
+    )
+
+
+def projected_makespan(costs, workers: int) -> float:
+    # greedy list scheduling in the given order: each task starts on the first
+    # worker to become free, as idle pool workers take the next queued task
+    finish_times = [0.0] * max(workers, 1)
+    for cost in costs:
+        heapq.heapreplace(finish_times, finish_times[0] + cost)
+    return max(finish_times)
+
+
+class CostModel:
+    # Mean wall seconds of one agent run (all its service levels, with its share
+    # of the environment and of the batched simulation) per cost_key, from runs
+    # of earlier sweeps kept in a JSON file and from the calibration runs of the
+    # current one. Keys without timings are estimated by the mean over the known
+    # keys.
+    def __init__(self, path: str | os.PathLike | None = None):
+        self.path = None if path is None else Path(path)
+        self.seconds = {}
+        self.runs = {}
+        if self.path is not None and self.path.exists():
+            with open(self.path) as file:
+                for key, entry in json.load(file).items():
+                    self.seconds[key] = entry["seconds"]
+                    self.runs[key] = entry["runs"]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.seconds
+
+    def estimate(self, key: str) -> float:
+        if key in self.seconds:
+            return self.seconds[key]
+        return sum(self.seconds.values()) / len(self.seconds) if self.seconds else 1.0
+
+    def record(self, key: str, seconds: float):
+        runs = self.runs.get(key, 0) + 1
+        weight = 1 / min(runs, COST_HISTORY_RUNS)
+        self.seconds[key] = (1 - weight) * self.seconds.get(key, 0.0) + weight * seconds
+        self.runs[key] = runs
+
+    def save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(temporary_path, "w") as file:
+            json.dump(
+                {key: {"seconds": self.seconds[key], "runs": self.runs[key]} for key in sorted(self.seconds)},
+                file,
+                indent=2,
+            )
+        os.replace(temporary_path, self.path)
+
+
+class SweepSchedule:
+    # Longest-first order of tasks with estimated costs, and the projected
+    # completion time as they finish. The projection rescales the estimates
+    # of the remaining tasks by actual / estimated seconds of the finished ones.
+    def __init__(self, estimates: list[float], workers: int):
+        self.estimates = list(estimates)
+        self.workers = workers
+        self.order = sorted(range(len(self.estimates)), key=lambda index: -self.estimates[index])
+        self.start = time.perf_counter()
+        self._finished = set()
+        self._actual_seconds = 0.0
+        self._estimated_seconds = 0.0
+        self._last_report = self.start
+
+    @property
+    def completed(self) -> int:
+        return len(self._finished)
+
+    def update_estimates(self, estimates: dict[int, float]):
+        # new estimates for tasks that have not finished, e.g. once calibrated
+        for index, estimate in estimates.items():
+            if index not in self._finished:
+                self.estimates[index] = estimate
+        self.order = sorted(range(len(self.estimates)), key=lambda index: -self.estimates[index])
+
+    def record(self, index: int, seconds: float):
+        self._finished.add(index)
+        self._actual_seconds += seconds
+        self._estimated_seconds += self.estimates[index]
+
+    def projected_seconds(self) -> float:
+        # from now until the last task finishes
+        scale = self._actual_seconds / self._estimated_seconds if self._estimated_seconds else 1.0
+        return projected_makespan(
+            (scale * self.estimates[index] for index in self.order if index not in self._finished),
+            self.workers,
+        )
+
+    def report(self) -> str:
+        elapsed = time.perf_counter() - self.start
+        remaining = self.projected_seconds()
+        completion = time.strftime("%H:%M:%S", time.localtime(time.time() + remaining))
+        return (
+            f"{self.completed}/{len(self.estimates)} tasks on {self.workers} workers, "
+            f"{elapsed:.0f} s elapsed, projected completion in {remaining:.0f} s at {completion}"
+        )
+
+    def report_due(self, interval: float) -> str | None:
+        # a report at most every `interval` seconds, and when the last task finishes
+        now = time.perf_counter()
+        if now - self._last_report < interval and self.completed < len(self.estimates):
+            return None
+        self._last_report = now
+        return self.report()
@@ -0,0 +1,224 @@
+import datetime as dt
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from safety_stock_experimentations.config import (
+    SEASONALITY_CACHE_SIZE,
+    SEASONALITY_PROFILE,
+    SIM_DAYS,
+    SIMULATION_START_DATE,
+)
+
+MONTH_SEASONALITY_MULTIPLIERS = {
+    12: 1.10, # 12: 1.10,
+    11: 1.20, # 11: 1.20,
+    10: 1.30, # 10: 1.30,
+    9: 1.40, # 9: 1.40,
+    8: 1.50, # 8: 1.50,
+    7: 1.50, # 7: 1.50,
+    6: 1.30, # 6: 1.30,
+    5: 1.20, # 5: 1.20,
+    4: 1.10, # 4: 1.10,
+}
+
+WEEKDAY_SEASONALITY_MULTIPLIERS = {
+    5: 1.50,  # Saturday
+    0: 1.20,  # Monday
+    4: 1.20,  # Friday
+}
+
+# first day of each month in a leap year, so day-of-year curves have a slot for
+# 29 February that non-leap years skip
+_LEAP_YEAR_MONTH_OFFSETS = np.concatenate(
+    [[0], np.cumsum([31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])]
+)
+
+
+@dataclass(frozen=True)
+class SeasonalityProfile:
+    # Daily demand multiplier = month x weekday x holiday. Weekdays count from
+    # Monday = 0 like date.weekday(); holidays are recurring ("MM-DD") or one-off
+    # ("YYYY-MM-DD") dates. Missing entries multiply by 1. Frozen and made of
+    # tuples, so a profile is hashable and keys the multiplier cache.
+    name: str = "flat"
+    months: tuple[tuple[int, float], ...] = ()
+    weekdays: tuple[tuple[int, float], ...] = ()
+    holidays: tuple[tuple[str, float], ...] = ()
+
+    @classmethod
+    def from_dict(cls, document: dict) -> "SeasonalityProfile":
+        # {"name": ..., "month": {"12": 1.1}, "weekday": {"5": 1.5}, "holidays": {"12-24": 1.8}}
+        unknown = document.keys() - {"name", "month", "weekday", "holidays"}
+        if unknown:
+            raise ValueError(f"Unknown seasonality profile fields {sorted(unknown)}")
+        months = tuple(sorted((int(month), float(value)) for month, value in document.get("month", {}).items()))
+        weekdays = tuple(sorted((int(weekday), float(value)) for weekday, value in document.get("weekday", {}).items()))
+        holidays = tuple(sorted((str(date), float(value)) for date, value in document.get("holidays", {}).items()))
+        if any(not 1 <= month <= 12 for month, _ in months):
+            raise ValueError("Seasonality months must lie between 1 and 12")
+        if any(not 0 <= weekday <= 6 for weekday, _ in weekdays):
+            raise ValueError("Seasonality weekdays must lie between 0 (Monday) and 6 (Sunday)")
+        for date, _ in holidays:
+            _parse_holiday(date)
+        return cls(document.get("name", "custom"), months, weekdays, holidays)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "month": {str(month): value for month, value in self.months},
+            "weekday": {str(weekday): value for weekday, value in self.weekdays},
+            "holidays": dict(self.holidays),
+        }
+
+    def multipliers(self, n_days: int = SIM_DAYS, start_date: dt.date = SIMULATION_START_DATE) -> np.ndarray:
+        return seasonality_multipliers(self, n_days, start_date)
+
+
+BUILT_IN_SEASONALITY = SeasonalityProfile(
+    "built_in",
+    tuple(sorted(MONTH_SEASONALITY_MULTIPLIERS.items())),
+    tuple(sorted(WEEKDAY_SEASONALITY_MULTIPLIERS.items())),
+)
+
+
+def _parse_holiday(date: str) -> tuple[int | None, int, int]:
+    # "MM-DD" -> (None, month, day), "YYYY-MM-DD" -> (year, month, day)
+    try:
+        if date.count("-") == 1:
+            month, day = map(int, date.split("-"))
+            dt.date(2000, month, day)  # validated against a leap year
+            return None, month, day
+        parsed = dt.date.fromisoformat(date)
+    except ValueError:
+        raise ValueError(f"Seasonality holiday {date!r} is neither MM-DD nor YYYY-MM-DD") from None
+    return parsed.year, parsed.month, parsed.day
+
+
+def _calendar(n_days: int, start_date: dt.date) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # dates, months (1-12), days of month (1-31) and weekdays (Monday = 0) of the horizon
+    dates = np.datetime64(start_date, "D") + np.arange(n_days)
+    month_starts = dates.astype("datetime64[M]")
+    months = month_starts.astype(int) % 12 + 1
+    days_of_month = (dates - month_starts.astype("datetime64[D]")).astype(int) + 1
+    weekdays = (dates.astype(int) + 3) % 7  # 1970-01-01 was a Thursday
+    return dates, months, days_of_month, weekdays
+
+
+@lru_cache(maxsize=SEASONALITY_CACHE_SIZE)
+def seasonality_multipliers(
+    profile: SeasonalityProfile, n_days: int = SIM_DAYS, start_date: dt.date = SIMULATION_START_DATE
+) -> np.ndarray:
+    # The whole horizon at once from month, weekday and (month, day) lookup
+    # tables. Cached per (profile, horizon) and read-only, as builders share it.
+    dates, months, days_of_month, weekdays = _calendar(n_days, start_date)
+
+    month_table = np.ones(13)
+    for month, multiplier in profile.months:
+        month_table[month] = multiplier
+    weekday_table = np.ones(7)
+    for weekday, multiplier in profile.weekdays:
+        weekday_table[weekday] = multiplier
+    multipliers = month_table[months] * weekday_table[weekdays]
+
+    if profile.holidays:
+        recurring_table = np.ones((13, 32))
+        for date, multiplier in profile.holidays:
+            year, month, day = _parse_holiday(date)
+            if year is None:
+                recurring_table[month, day] *= multiplier
+            else:
+                index = (np.datetime64(dt.date(year, month, day), "D") - dates[0]).astype(int) if n_days else -1
+                if 0 <= index < n_days:
+                    multipliers[index] *= multiplier
+        multipliers *= recurring_table[months, days_of_month]
+
+    multipliers.setflags(write=False)
+    return multipliers
+
+
+@lru_cache(maxsize=None)
+def _load_profile(path: Path, modified: int) -> SeasonalityProfile:
+    with open(path) as file:
+        document = json.load(file)
+    document.setdefault("name", path.stem)
+    return SeasonalityProfile.from_dict(document)
+
+
+def load_seasonality_profile(path: str | os.PathLike) -> SeasonalityProfile:
+    # JSON profile (see SeasonalityProfile.from_dict), reread when the file changes
+    path = Path(path).resolve()
+    return _load_profile(path, path.stat().st_mtime_ns)
+
+
+def default_seasonality_profile() -> SeasonalityProfile:
+    if SEASONALITY_PROFILE is None:
+        return BUILT_IN_SEASONALITY
+    return load_seasonality_profile(SEASONALITY_PROFILE)
+
+
+class SeasonalityCurves:
+    # Custom per-SKU curves: one multiplier per day of the year for each named
+    # curve, from a long-format CSV or Parquet file with columns curve,
+    # day_of_year (1-366, counted in a leap year so 60 is 29 February) and
+    # multiplier; days a curve leaves out multiply by 1. Horizon matrices are
+    # cached per (start date, days).
+    def __init__(self, curve_ids, day_of_year_multipliers: np.ndarray):
+        self.curve_ids = [str(curve_id) for curve_id in curve_ids]
+        self.index = {curve_id: row for row, curve_id in enumerate(self.curve_ids)}
+        self.values = np.asarray(day_of_year_multipliers, dtype=float)
+        if self.values.shape != (len(self.curve_ids), 366):
+            raise ValueError("Seasonality curves need one row of 366 day-of-year multipliers per curve")
+        self._horizons = {}
+
+    @classmethod
+    def from_frame(cls, frame) -> "SeasonalityCurves":
+        missing = {"curve", "day_of_year", "multiplier"} - set(frame.columns)
+        if missing:
+            raise ValueError(f"Seasonality curves lack the columns {sorted(missing)}")
+        days = frame["day_of_year"].to_numpy(int)
+        if ((days < 1) | (days > 366)).any():
+            raise ValueError("day_of_year must lie between 1 and 366")
+        curve_ids, rows = np.unique(frame["curve"].astype(str).to_numpy(), return_inverse=True)
+        values = np.ones((len(curve_ids), 366))
+        values[rows, days - 1] = frame["multiplier"].to_numpy(float)
+        return cls(curve_ids, values)
+
+    def multipliers(self, n_days: int = SIM_DAYS, start_date: dt.date = SIMULATION_START_DATE) -> np.ndarray:
+        # (curves + 1, days); the last row is all ones, for SKUs without a curve
+        key = (n_days, start_date)
+        if key not in self._horizons:
+            _, months, days_of_month, _ = _calendar(n_days, start_date)
+            days_of_year = _LEAP_YEAR_MONTH_OFFSETS[months - 1] + days_of_month - 1
+            horizon = np.vstack([self.values[:, days_of_year], np.ones((1, n_days))])
+            horizon.setflags(write=False)
+            self._horizons[key] = horizon
+        return self._horizons[key]
+
+    def sku_multipliers(
+        self, curve_ids, n_days: int = SIM_DAYS, start_date: dt.date = SIMULATION_START_DATE
+    ) -> np.ndarray:
+        # (SKUs, days) rows of the named curves; "" selects no curve
+        no_curve = len(self.curve_ids)
+        try:
+            rows = [self.index[curve_id] if curve_id else no_curve for curve_id in curve_ids]
+        except KeyError as error:
+            raise ValueError(f"Unknown seasonality curve {error.args[0]!r}") from None
+        return self.multipliers(n_days, start_date)[rows]
+
+
+@lru_cache(maxsize=None)
+def _load_curves(path: Path, modified: int) -> SeasonalityCurves:
+    import pandas as pd
+
+    frame = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+    return SeasonalityCurves.from_frame(frame)
+
+
+def load_seasonality_curves(path: str | os.PathLike) -> SeasonalityCurves:
+    path = Path(path).resolve()
+    return _load_curves(path, path.stat().st_mtime_ns)
@@ -0,0 +1,175 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from safety_stock_experimentations.config import (
+    CONFIDENCE_LEVEL,
+    MAX_TRIALS,
+    MIN_TRIALS,
+    TRIAL_BATCH_SIZE,
+    TRIAL_TOLERANCES,
+)
+from safety_stock_experimentations.online_aggregation import RunningMoments
+from safety_stock_experimentations.sweep import SweepExecutor
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class SequentialSweepExecutor(SweepExecutor):
+    # Runs trials in batches of batch_size and keeps only the (environment,
+    # agent, service level) cells whose confidence interval half-width still
+    # exceeds its tolerance for one of the tracked metrics, until max_trials.
+    # Stopping is decided on whole batches, so the trials a cell uses do not
+    # depend on the worker count. Runs already in the results store count
+    # towards their cell.
+    def __init__(
+        self,
+        environment_configs: dict,
+        agent_configs: dict,
+        service_levels: list[float],
+        tolerances: dict[str, float] = TRIAL_TOLERANCES,
+        confidence: float = CONFIDENCE_LEVEL,
+        min_trials: int = MIN_TRIALS,
+        batch_size: int = TRIAL_BATCH_SIZE,
+        max_trials: int = MAX_TRIALS,
+        **executor_options,
+    ):
+        super().__init__(
+            environment_configs, agent_configs, service_levels, n_trials=max_trials, **executor_options
+        )
+        self.tolerances = dict(tolerances)
+        self.confidence = confidence
+        self.min_trials = min_trials
+        self.batch_size = batch_size
+        self.max_trials = max_trials
+        self._moments = {}
+
+    @property
+    def metrics(self) -> list[str]:
+        return list(self.tolerances)
+
+    def cells(self) -> list[tuple[int, int, float]]:
+        return [
+            (environment_key, agent_key, service_level)
+            for environment_key in self.environment_configs
+            for agent_key in self.agent_configs
+            for service_level in self.service_levels
+        ]
+
+    def _cell_name(self, cell) -> tuple[str, str, float]:
+        environment_key, agent_key, service_level = cell
+        return (
+            self.environment_configs[environment_key]["name"],
+            self.agent_configs[agent_key]["name"],
+            float(service_level),
+        )
+
+    def _observe(self, summary: dict):
+        key = (summary["environment"], summary["agent"], float(summary["service_level"]))
+        if key not in self._moments:
+            # one index per metric of the run summary
+            self._moments[key] = RunningMoments(len(self.metrics))
+        self._moments[key].update(
+            np.arange(len(self.metrics)), np.array([summary[metric] for metric in self.metrics], dtype=float)
+        )
+
+    def _trials(self, cell_name) -> int:
+        moments = self._moments.get(cell_name)
+        return 0 if moments is None else int(moments.count[0])
+
+    def half_widths(self, cell_name) -> np.ndarray:
+        # Student-t interval half-width per metric, inf below two trials;
+        # stdtrit is t.ppf without importing scipy.stats
+        from scipy.special import stdtrit
+
+        trials = self._trials(cell_name)
+        if trials < 2:
+            return np.full(len(self.metrics), np.inf)
+        quantile = stdtrit(trials - 1, (1 + self.confidence) / 2)
+        return quantile * self._moments[cell_name].std / np.sqrt(trials)
+
+    def _is_done(self, cell_name) -> bool:
+        trials = self._trials(cell_name)
+        if trials >= self.max_trials:
+            return True
+        return trials >= self.min_trials and bool(
+            np.all(self.half_widths(cell_name) <= np.array(list(self.tolerances.values())))
+        )
+
+    def observe_stored_runs(self) -> set:
+        # folds the runs already in the results store into their cells and
+        # returns their keys; trials_report() then describes the stored sweep
+        self._moments = {}
+        completed_runs = set()
+        if self.results_store is not None:
+            completed_runs = self.results_store.completed_runs()
+        if completed_runs:
+            stored = self.results_store.load_summaries(columns=["day", "service_level", *self.metrics])
+            for summary in stored.to_dict("records"):
+                self._observe(summary)
+        return completed_runs
+
+    def run(self) -> list[dict]:
+        # returns the summaries computed by this call, in batch and task order
+        self.completed_runs()  # claims the results store for this sweep
+        completed_runs = self.observe_stored_runs()
+
+        inventory_data_summaries = []
+        trial_start = 0
+        pool = (
+            nullcontext() if self.max_workers == 1 else ProcessPoolExecutor(max_workers=self.max_workers)
+        )
+        with pool:
+            while trial_start < self.max_trials:
+                active_cells = [cell for cell in self.cells() if not self._is_done(self._cell_name(cell))]
+                if not active_cells:
+                    break
+                trial_stop = min(max(trial_start + self.batch_size, self.min_trials), self.max_trials)
+
+                tasks = []
+                for environment_key in self.environment_configs:
+                    agent_service_levels = {}
+                    for cell_environment_key, agent_key, service_level in active_cells:
+                        if cell_environment_key == environment_key:
+                            agent_service_levels.setdefault(agent_key, []).append(service_level)
+                    for trial_number in range(trial_start, trial_stop):
+                        task = self._task(environment_key, trial_number, agent_service_levels, completed_runs)
+                        if task is not None:
+                            tasks.append(task)
+
+                batch_summaries = self._execute(tasks, None if self.max_workers == 1 else pool)
+                for summary in batch_summaries:
+                    self._observe(summary)
+                inventory_data_summaries.extend(batch_summaries)
+                trial_start = trial_stop
+        return inventory_data_summaries
+
+    def trials_report(self) -> "pd.DataFrame":
+        # trials used, confidence interval half-widths and convergence per cell
+        import pandas as pd
+
+        rows = []
+        for cell in self.cells():
+            cell_name = self._cell_name(cell)
+            environment, agent, service_level = cell_name
+            half_widths = self.half_widths(cell_name)
+            rows.append(
+                {
+                    "environment": environment,
+                    "agent": agent,
+                    "service_level": service_level,
+                    "trials": self._trials(cell_name),
+                    **{
+                        f"{metric}_half_width": half_width
+                        for metric, half_width in zip(self.metrics, half_widths)
+                    },
+                    "converged": bool(
+                        np.all(half_widths <= np.array(list(self.tolerances.values())))
+                    ),
+                }
+            )
+        return pd.DataFrame(rows)
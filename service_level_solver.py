@@ -0,0 +1,163 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from safety_stock_experimentations.batch_simulator import BatchSimulator, reorder_point_schedule
+from safety_stock_experimentations.config import (
+    COMMON_RANDOM_NUMBERS,
+    SOLVER_BOUNDS,
+    SOLVER_MAX_ITERATIONS,
+    SOLVER_POINTS_PER_ITERATION,
+    SOLVER_TOLERANCE,
+    SOLVER_TRIALS,
+    SWEEP_SEED,
+)
+from safety_stock_experimentations.environment_cache import EnvironmentCache
+from safety_stock_experimentations.sweep import (
+    CommonRandomNumbers,
+    build_environment,
+    seed_global_rngs,
+)
+
+
+@dataclass
+class ServiceLevelSolution:
+    environment: str
+    agent: str
+    kpi: str
+    goal: float
+    service_level: float | None  # None when even the upper bound misses the goal
+    achieved: float  # mean KPI over the trials at service_level (or the upper bound)
+    std_error: float
+    lower_bound: float
+    upper_bound: float
+    targets_evaluated: int
+    runs: int
+
+
+class ServiceLevelSolver:
+    # Finds, per (environment, agent), the smallest service-level target whose
+    # mean KPI over n_trials meets the goal. The trials reuse the sweep's seeded
+    # environments (and common random numbers), so the sample-mean KPI is a
+    # deterministic, monotone function of the target and can be bracketed: each
+    # iteration evaluates points_per_iteration targets inside the bracket in one
+    # batched simulation of every trial and keeps the sub-interval where the
+    # KPI crosses the goal, until it is narrower than tolerance. Environments
+    # and evaluated targets are kept across iterations and agents.
+    def __init__(
+        self,
+        environment_configs: dict,
+        agent_configs: dict,
+        kpi: str = "fill_rate",
+        goal: float = 0.98,
+        n_trials: int = SOLVER_TRIALS,
+        tolerance: float = SOLVER_TOLERANCE,
+        bounds: tuple[float, float] = SOLVER_BOUNDS,
+        points_per_iteration: int = SOLVER_POINTS_PER_ITERATION,
+        max_iterations: int = SOLVER_MAX_ITERATIONS,
+        seed: int = SWEEP_SEED,
+        environment_cache: EnvironmentCache | None = None,
+        common_random_numbers: bool = COMMON_RANDOM_NUMBERS,
+    ):
+        self.environment_configs = environment_configs
+        self.agent_configs = agent_configs
+        self.kpi = kpi
+        self.goal = goal
+        self.n_trials = n_trials
+        self.tolerance = tolerance
+        self.bounds = bounds
+        self.points_per_iteration = points_per_iteration
+        self.max_iterations = max_iterations
+        self.seed = seed
+        self.environment_cache = environment_cache
+        self.common_random_numbers = common_random_numbers
+        self._environments = {}
+        self._evaluations = {}  # (environment key, agent key) -> {target: per-trial KPI}
+
+    def environments(self, environment_key) -> list:
+        if environment_key not in self._environments:
+            builder_class = self.environment_configs[environment_key]["class"]
+            self._environments[environment_key] = [
+                build_environment(
+                    builder_class(),
+                    np.random.SeedSequence(self.seed, spawn_key=(environment_key, trial_number)),
+                    self.environment_cache,
+                )
+                for trial_number in range(self.n_trials)
+            ]
+        return self._environments[environment_key]
+
+    def evaluate(self, environment_key, agent_key, targets) -> dict[float, np.ndarray]:
+        # per-trial KPI for each target; targets evaluated before are not rerun
+        evaluations = self._evaluations.setdefault((environment_key, agent_key), {})
+        new_targets = sorted({round(float(target), 12) for target in targets} - evaluations.keys())
+        if new_targets:
+            agent_class = self.agent_configs[agent_key]["class"]
+            environments = self.environments(environment_key)
+            agents, reorder_point_schedules = [], []
+            for trial_number, environment in enumerate(environments):
+                # seeded like the sweep, so results agree with SweepExecutor runs
+                seed_global_rngs(
+                    np.random.SeedSequence(self.seed, spawn_key=(environment_key, trial_number, agent_key))
+                )
+                random_streams = (
+                    CommonRandomNumbers(self.seed, environment_key, trial_number)
+                    if self.common_random_numbers
+                    else None
+                )
+                agents.append(agent_class(environment, new_targets, random_streams))
+                reorder_point_schedules.append(reorder_point_schedule(agents[-1]))
+            # every trial steps through the horizon in one batch, runs ordered
+            # by trial then target
+            summaries = BatchSimulator(agents, environments).run_simulation(reorder_point_schedules)
+            kpi_values = np.array([summary[self.kpi] for summary in summaries]).reshape(self.n_trials, -1).T
+            evaluations.update(zip(new_targets, kpi_values))
+        return {round(float(target), 12): evaluations[round(float(target), 12)] for target in targets}
+
+    def _mean_kpi(self, environment_key, agent_key, target) -> float:
+        return float(self.evaluate(environment_key, agent_key, [target])[round(float(target), 12)].mean())
+
+    def solve(self, environment_key, agent_key) -> ServiceLevelSolution:
+        lower, upper = self.bounds
+        self.evaluate(environment_key, agent_key, [lower, upper])
+        if self._mean_kpi(environment_key, agent_key, lower) >= self.goal:
+            upper = lower
+        elif self._mean_kpi(environment_key, agent_key, upper) >= self.goal:
+            for _ in range(self.max_iterations):
+                if upper - lower <= self.tolerance:
+                    break
+                candidates = np.linspace(lower, upper, self.points_per_iteration + 2)
+                self.evaluate(environment_key, agent_key, candidates[1:-1])
+                meets_goal = [
+                    self._mean_kpi(environment_key, agent_key, candidate) >= self.goal
+                    for candidate in candidates
+                ]
+                first = meets_goal.index(True)
+                lower, upper = candidates[first - 1], candidates[first]
+
+        evaluations = self._evaluations[(environment_key, agent_key)]
+        kpi_values = evaluations[round(float(upper), 12)]
+        attained = kpi_values.mean() >= self.goal
+        return ServiceLevelSolution(
+            environment=self.environment_configs[environment_key]["name"],
+            agent=self.agent_configs[agent_key]["name"],
+            kpi=self.kpi,
+            goal=self.goal,
+            service_level=float(upper) if attained else None,
+            achieved=float(kpi_values.mean()),
+            std_error=float(kpi_values.std(ddof=1) / np.sqrt(self.n_trials)) if self.n_trials > 1 else np.nan,
+            lower_bound=float(lower),
+            upper_bound=float(upper),
+            targets_evaluated=len(evaluations),
+            runs=len(evaluations) * self.n_trials,
+        )
+
+    def solve_all(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            [
+                vars(self.solve(environment_key, agent_key))
+                for environment_key in self.environment_configs
+                for agent_key in self.agent_configs
+            ]
+        )
@@ -1,89 +1,297 @@
+from functools import cached_property
+
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from dash import Dash, dcc, html
+from dash import Dash, Input, Output, dcc, html
 import pandas as pd
 
+from safety_stock_experimentations.config import DASH_MAX_POINTS
+
+DAILY_METRIC_COLUMNS = ["day", "demand", "inventory", "fulfilled_demand", "write_offs"]
+
+# tab value -> (tab label, SimulationPlots method building the figure)
+FIGURES = {
+    "inventory_demand": ("Average Inventory & Demand Over Time", "plot_daily_inventory_demand"),
+    "service_level_vs_write_offs": ("Observed Service Level vs Write-Offs", "plot_service_level_vs_write_offs"),
+    "fill_rate_vs_write_offs": ("Fill Rate vs Write-Offs", "plot_fill_rate_vs_write_offs"),
+    "service_level_trend": ("Write-Offs vs Service Level Trend", "plot_service_level_write_off_trend"),
+}
+FILTER_COLUMNS = ("agent", "environment", "service_level")
+
+
+def _repeat_categorical(values: pd.Series, repeats: np.ndarray) -> pd.Categorical:
+    categorical = pd.Categorical(values)
+    return pd.Categorical.from_codes(
+        np.repeat(categorical.codes, repeats), categories=categorical.categories
+    )
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets: keeps the first and last point and, per
+    # bucket, the point spanning the largest triangle with the previously kept
+    # point and the mean of the next bucket
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean()
+        next_y = y[stop:next_stop].mean()
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        indices[bucket + 1] = previous
+    return indices
+
+
+def _selection_key(values) -> tuple | None:
+    # None and an empty selection both mean "everything"
+    return tuple(sorted(values)) if values else None
+
+
+def _select(df: pd.DataFrame, **selection) -> pd.DataFrame:
+    mask = np.ones(len(df), dtype=bool)
+    for column, values in selection.items():
+        if values:
+            mask &= df[column].isin(values).to_numpy()
+    return df[mask]
+
+
 class SimulationPlots:
 
-    def __init__(self, df_inventory_data_summaries):
+    def __init__(self, df_inventory_data_summaries, results_store=None, daily_aggregator=None):
+        # without a daily_performance_metrics column, daily metrics are read
+        # lazily from results_store; per-day averages come from daily_aggregator
+        # (a DailyMetricsAggregator fed during the sweep) when one is given
         self.df_inventory_data_summaries = df_inventory_data_summaries
+        self.results_store = results_store
+        self.daily_aggregator = daily_aggregator
+        self._figures = {}
 
-        self.daily_metrics_df = self._create_daily_metrics_df()
+    @classmethod
+    def from_store(cls, results_store):
+        return cls(results_store.load_summaries(), results_store=results_store)
+
+    @property
+    def _reads_from_store(self) -> bool:
+        return (
+            self.results_store is not None
+            and "daily_performance_metrics" not in self.df_inventory_data_summaries
+        )
+
+    @cached_property
+    def daily_metrics_df(self):
+        return self._create_daily_metrics_df()
 
     def _create_daily_metrics_df(self):
-        records = []
-        for _, row in self.df_inventory_data_summaries.iterrows():
-            for daily_metric in row['daily_performance_metrics']:
-                record = {
-                    'agent': row['agent'],
-                    'environment': row['environment'],
-                    'service_level': row['service_level'],
-                    'trial_number': row['day'],
-                    'day': daily_metric['day'],
-                    'demand': daily_metric['demand'],
-                    'inventory': daily_metric['inventory'],
-                    'fulfilled_demand': daily_metric['fulfilled_demand'],
-                    'write_offs': daily_metric['write_offs'],
+        # concatenates the per-run metric columns; run-level fields are repeated
+        # per day, with categorical dtypes for agent and environment
+        if self._reads_from_store:
+            return self.results_store.load_daily_metrics(
+                columns=["service_level", "trial_number"] + DAILY_METRIC_COLUMNS
+            )
+
+        summaries = self.df_inventory_data_summaries
+        daily_performance_metrics = summaries["daily_performance_metrics"].tolist()
+        run_lengths = np.array([len(metrics["day"]) for metrics in daily_performance_metrics])
+
+        columns = {
+            "agent": _repeat_categorical(summaries["agent"], run_lengths),
+            "environment": _repeat_categorical(summaries["environment"], run_lengths),
+            "service_level": np.repeat(summaries["service_level"].to_numpy(), run_lengths),
+            "trial_number": np.repeat(summaries["day"].to_numpy(), run_lengths),
+        }
+        for name in DAILY_METRIC_COLUMNS:
+            columns[name] = np.concatenate(
+                [metrics[name] for metrics in daily_performance_metrics]
+            )
+        return pd.DataFrame(columns)
+
+    @cached_property
+    def _daily_inventory_demand_totals(self):
+        # per (agent, environment, service level, day) sums of inventory and
+        # demand and the number of runs, computed once; any filter selection is
+        # then pooled from it into exact means
+        by = ["agent", "environment", "service_level", "day"]
+        if self.daily_aggregator is not None:
+            moments = self.daily_aggregator.to_dataframe(by=FILTER_COLUMNS)
+            return pd.DataFrame(
+                {
+                    **{name: moments[name] for name in by},
+                    "inventory": moments["inventory_mean"] * moments["count"],
+                    "demand": moments["demand_mean"] * moments["count"],
+                    "runs": moments["count"],
                 }
-                records.append(record)
+            )
+        if self._reads_from_store:
+            return self.results_store.aggregate_daily_metrics(
+                by=by,
+                aggregations={
+                    "inventory": ("inventory", "sum"),
+                    "demand": ("demand", "sum"),
+                    "runs": ("day", "count"),
+                },
+            )
+
+        totals = self._sum_daily_inventory_demand_runs()
+        if totals is None:
+            totals = (
+                self.daily_metrics_df.groupby(by, observed=True)
+                .agg(inventory=("inventory", "sum"), demand=("demand", "sum"), runs=("day", "count"))
+                .reset_index()
+            )
+        return totals
+
+    def _sum_daily_inventory_demand_runs(self):
+        # reduced from the per-run arrays without building the long table
+        records = []
+        for (agent, environment, service_level), runs in self.df_inventory_data_summaries.groupby(
+            list(FILTER_COLUMNS)
+        ):
+            daily_performance_metrics = runs["daily_performance_metrics"].tolist()
+            days = daily_performance_metrics[0]["day"]
+            if any(len(metrics["day"]) != len(days) for metrics in daily_performance_metrics):
+                return None  # runs with different horizons need the long table
 
-        return pd.DataFrame(records)
+            records.append(
+                pd.DataFrame(
+                    {
+                        "agent": agent,
+                        "environment": environment,
+                        "service_level": service_level,
+                        "day": days,
+                        "inventory": np.sum(
+                            [metrics["inventory"] for metrics in daily_performance_metrics], axis=0
+                        ),
+                        "demand": np.sum(
+                            [metrics["demand"] for metrics in daily_performance_metrics], axis=0
+                        ),
+                        "runs": len(daily_performance_metrics),
+                    }
+                )
+            )
+        return pd.concat(records, ignore_index=True)
+
+    def _aggregate_daily_inventory_demand(self, agents=None, environments=None, service_levels=None):
+        # per-day means of inventory and demand for each (agent, environment)
+        totals = _select(
+            self._daily_inventory_demand_totals,
+            agent=agents,
+            environment=environments,
+            service_level=service_levels,
+        )
+        grouped = (
+            totals.groupby(["agent", "environment", "day"], observed=True)[["inventory", "demand", "runs"]]
+            .sum()
+            .reset_index()
+        )
+        grouped["average_inventory"] = grouped["inventory"] / grouped["runs"]
+        grouped["average_demand"] = grouped["demand"] / grouped["runs"]
+        return grouped[["agent", "environment", "day", "average_inventory", "average_demand"]]
 
-    def run_dash_app(self):
+    def _select_summaries(self, agents=None, environments=None, service_levels=None):
+        return _select(
+            self.df_inventory_data_summaries,
+            agent=agents,
+            environment=environments,
+            service_level=service_levels,
+        )
+
+    def filter_options(self) -> dict[str, list]:
+        return {
+            column: sorted(self.df_inventory_data_summaries[column].unique().tolist())
+            for column in FILTER_COLUMNS
+        }
+
+    def figure(self, name: str, agents=None, environments=None, service_levels=None):
+        # built on first request and memoized per filter selection
+        key = (
+            name,
+            _selection_key(agents),
+            _selection_key(environments),
+            _selection_key(service_levels),
+        )
+        if key not in self._figures:
+            plot = getattr(self, FIGURES[name][1])
+            self._figures[key] = plot(agents=key[1], environments=key[2], service_levels=key[3])
+        return self._figures[key]
+
+    def build_figures(self) -> dict:
+        return {name: self.figure(name) for name in FIGURES}
+
+    def run_dash_app(self, host: str = "127.0.0.1", port: int = 8050):
+        # figures are built in the callback for the open tab and the current
+        # filters, so the server starts without rendering anything
         app = Dash(__name__)
         app.title = "Inventory Simulation Results"
-
-        inventory_demand_plot = self.plot_daily_inventory_demand()
-        service_level_vs_write_offs_plot = self.plot_service_level_vs_write_offs()
-        fill_rate_vs_write_offs_plot = self.plot_fill_rate_vs_write_offs()
-        service_level_trend_plot = self.plot_service_level_write_off_trend()
+        filter_options = self.filter_options()
 
         app.layout = html.Div(
             [
                 html.H1("Inventory Simulation Results"),
-                dcc.Tabs(
+                html.Div(
                     [
-                        dcc.Tab(
-                            label="Average Inventory & Demand Over Time",
-                            children=[dcc.Graph(figure=inventory_demand_plot)],
-                        ),
-                        dcc.Tab(
-                            label="Observed Service Level vs Write-Offs",
-                            children=[dcc.Graph(figure=service_level_vs_write_offs_plot)],
-                        ),
-                        dcc.Tab(
-                            label="Fill Rate vs Write-Offs",
-                            children=[dcc.Graph(figure=fill_rate_vs_write_offs_plot)],
-                        ),
-                        dcc.Tab(
-                            label="Write-Offs vs Service Level Trend",
-                            children=[dcc.Graph(figure=service_level_trend_plot)],
-                        ),
+                        dcc.Dropdown(
+                            id=f"{column}-filter",
+                            options=filter_options[column],
+                            multi=True,
+                            placeholder=f"All {column.replace('_', ' ')}s",
+                        )
+                        for column in FILTER_COLUMNS
                     ]
                 ),
+                dcc.Tabs(
+                    id="figure-tabs",
+                    value=next(iter(FIGURES)),
+                    children=[dcc.Tab(label=label, value=name) for name, (label, _) in FIGURES.items()],
+                ),
+                dcc.Loading(dcc.Graph(id="figure")),
             ]
         )
 
-        print("Running Dash app at: http://127.0.0.1:8050/")
-        app.run(debug=False)
+        @app.callback(
+            Output("figure", "figure"),
+            Input("figure-tabs", "value"),
+            *[Input(f"{column}-filter", "value") for column in FILTER_COLUMNS],
+        )
+        def render_figure(name, agents, environments, service_levels):
+            return self.figure(name, agents, environments, service_levels)
 
-    def plot_daily_inventory_demand(self):
+        print(f"Running Dash app at: http://{host}:{port}/")
+        app.run(host=host, port=port, debug=False)
 
-        grouped = (
-            self.daily_metrics_df.groupby(["agent", "environment", "day"])
-            .agg(
-                average_inventory=("inventory", "mean"),
-                average_demand=("demand", "mean"),
+    def plot_daily_inventory_demand(self, agents=None, environments=None, service_levels=None):
+        # WebGL traces, each series downsampled to DASH_MAX_POINTS with LTTB
+        grouped = self._aggregate_daily_inventory_demand(agents, environments, service_levels)
+        inventory_points = []
+        demand_series = []
+        for (agent, env), group in grouped.groupby(["agent", "environment"], observed=True):
+            days = group["day"].to_numpy()
+            inventory_points.append(
+                group.iloc[lttb_indices(days, group["average_inventory"].to_numpy(), DASH_MAX_POINTS)]
             )
-            .reset_index()
-        )
+            demand_series.append(
+                (agent, env, group.iloc[lttb_indices(days, group["average_demand"].to_numpy(), DASH_MAX_POINTS)])
+            )
+        downsampled = pd.concat(inventory_points, ignore_index=True) if inventory_points else grouped
 
         fig = px.line(
-            grouped,
+            downsampled,
             x="day",
             y="average_inventory",
             color="agent",
             line_dash="environment",
+            render_mode="webgl",
             title="Average Inventory Level Over Time",
             labels={
                 "day": "Day",
@@ -91,8 +299,8 @@ class SimulationPlots:
             }
         )
 
-        for (agent, env), group in grouped.groupby(["agent", "environment"]):
-            fig.add_trace(go.Scatter(
+        for agent, env, group in demand_series:
+            fig.add_trace(go.Scattergl(
                 x=group["day"],
                 y=group["average_demand"],
                 mode="lines",
@@ -106,10 +314,10 @@ class SimulationPlots:
         )
         return fig
 
-    def plot_service_level_vs_write_offs(self):
+    def plot_service_level_vs_write_offs(self, agents=None, environments=None, service_levels=None):
 
         grouped = (
-            self.df_inventory_data_summaries.groupby(["agent", "environment"])
+            self._select_summaries(agents, environments, service_levels).groupby(["agent", "environment"])
             .agg(
                 write_offs=("write_offs", "mean"),
                 avg_service_level=("avg_service_level", "mean"),
@@ -135,10 +343,10 @@ class SimulationPlots:
         fig.update_layout(height=600)
         return fig
 
-    def plot_fill_rate_vs_write_offs(self):
+    def plot_fill_rate_vs_write_offs(self, agents=None, environments=None, service_levels=None):
 
         grouped = (
-            self.df_inventory_data_summaries.groupby(["agent", "environment"])
+            self._select_summaries(agents, environments, service_levels).groupby(["agent", "environment"])
             .agg(
                 write_offs=("write_offs", "mean"),
                 fill_rate=("fill_rate", "mean"),
@@ -164,9 +372,9 @@ class SimulationPlots:
         fig.update_layout(height=600)
         return fig
 
-    def plot_service_level_write_off_trend(self):
+    def plot_service_level_write_off_trend(self, agents=None, environments=None, service_levels=None):
         grouped = (
-            self.df_inventory_data_summaries.groupby(["agent", "environment", "service_level"])
+            self._select_summaries(agents, environments, service_levels).groupby(["agent", "environment", "service_level"])
             .agg(avg_service_level=("avg_service_level", "mean"),
                  avg_write_offs=("write_offs", "mean"))
             .reset_index()
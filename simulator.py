@@ -1,40 +1,87 @@
-import pandas as pd
-from config import HISTO_DAYS, LEAD_TIME, N_SIMULATIONS, SIM_DAYS
+import numpy as np
+from config import HISTO_DAYS, LEAD_TIME, SIM_DAYS
+from safety_stock_experimentations.demand_distribution import realised_demand_array
 from inventory_manager import InventoryManager
 from order_processor import OrderProcessor
-from performance_tracker import PerformanceTracker
+from performance_tracker import PerformanceTracker, daily_record
+from safety_stock_experimentations.profiling import NULL_PHASE_TIMER
 
 
 class Simulator:
-    def __init__(self, agent, environment):
+    def __init__(self, agent, environment, phase_timer=NULL_PHASE_TIMER):
         self.agent = agent
         self.environment = environment
+        self.phase_timer = phase_timer
 
     def run_simulation(self):
-        order_processor = OrderProcessor()
-        performance_tracker = PerformanceTracker()
-        inventory_manager = InventoryManager(
-            order_processor=order_processor, agent=self.agent
-        )
+        # Returns a summary, or a list of summaries when the agent has several
+        # service levels.
+        # one tracker per target, so repeated service levels stay separate runs
+        performance_trackers = [PerformanceTracker() for _ in self.agent.service_levels]
+        for daily_metrics in self.stream_daily_metrics():
+            performance_trackers[daily_metrics["target"]].record(daily_metrics)
+
+        with self.phase_timer.phase("performance_tracking"):
+            performance_summaries = [
+                performance_tracker.performance_summary() for performance_tracker in performance_trackers
+            ]
+        if self.agent.has_multiple_service_levels:
+            return performance_summaries
+        return performance_summaries[0]
+
+    def stream_daily_metrics(self):
+        # Generator over the tracked days: yields one daily_record (plus its
+        # target, the index into agent.service_levels, and that service_level)
+        # per service-level target as soon as the day is
+        # simulated, so consumers can aggregate without buffering the run.
+        # One inventory/order state per target; the agent is evaluated once per
+        # day for all targets.
+        service_levels = [float(service_level) for service_level in self.agent.service_levels]
+        order_processors = [OrderProcessor() for _ in service_levels]
+        inventory_managers = [
+            InventoryManager(order_processor=order_processor, agent=self.agent)
+            for order_processor in order_processors
+        ]
+        phase = self.phase_timer.phase
+        reorder_point_phase = f"reorder_point[{type(self.agent).__name__}]"
+        # history-based agents precompute all reorder points in one batch
+        with phase(reorder_point_phase):
+            reorder_point_schedule = self.agent.compute_reorder_point_schedule()
+        if reorder_point_schedule is not None:
+            reorder_point_schedule = np.atleast_2d(reorder_point_schedule)
+        realised_demand = realised_demand_array(self.environment)
 
         for day in range(HISTO_DAYS, SIM_DAYS):
-            demand_quantity = self.environment[day].realised_demand
-
-            inventory_manager.process_deliveries(day)
-            fulfilled_demand = min(demand_quantity, inventory_manager.inventory)
-            inventory_manager.inventory_update(fulfilled_demand)
-            daily_writeoff = inventory_manager.apply_writeoff()
-            inventory_manager.reorder(day)
-
-            if not ((day < HISTO_DAYS + LEAD_TIME + 2) | (day > SIM_DAYS - LEAD_TIME)):
-                performance_tracker.daily_performance(
-                    day=day,
-                    demand_quantity=demand_quantity,
-                    fulfilled_demand=fulfilled_demand,
-                    daily_writeoff=daily_writeoff,
-                    inventory=inventory_manager.inventory,
-                    order_processor=order_processor,
-                )
-            # TODO: How to handle cases where it's very unlikely that the sales are realised at T+1/T+2. Idea: Order at most the 95% quantile of the sales for T+3
-
-        return performance_tracker.performance_summary()
+            demand_quantity = int(realised_demand[day])
+            if reorder_point_schedule is None:
+                with phase(reorder_point_phase):
+                    reorder_points = np.atleast_1d(self.agent.compute_reorder_point(day))
+            else:
+                reorder_points = reorder_point_schedule[:, day - HISTO_DAYS]
+
+            for target, (service_level, order_processor, inventory_manager, reorder_point) in enumerate(
+                zip(service_levels, order_processors, inventory_managers, reorder_points)
+            ):
+                with phase("deliveries"):
+                    inventory_manager.process_deliveries(day)
+                fulfilled_demand = min(demand_quantity, inventory_manager.inventory)
+                inventory_manager.inventory_update(fulfilled_demand)
+                with phase("write_offs"):
+                    daily_writeoff = inventory_manager.apply_writeoff()
+                with phase("order_placement"):
+                    inventory_manager.reorder(day, reorder_point=reorder_point)
+
+                if not ((day < HISTO_DAYS + LEAD_TIME + 2) | (day > SIM_DAYS - LEAD_TIME)):
+                    with phase("performance_tracking"):
+                        daily_metrics = daily_record(
+                            day=day,
+                            demand_quantity=demand_quantity,
+                            fulfilled_demand=fulfilled_demand,
+                            daily_writeoff=daily_writeoff,
+                            inventory=inventory_manager.inventory,
+                            order_processor=order_processor,
+                        )
+                        daily_metrics["target"] = target
+                        daily_metrics["service_level"] = service_level
+                    yield daily_metrics
+                # TODO: How to handle cases where it's very unlikely that the sales are realised at T+1/T+2. Idea: Order at most the 95% quantile of the sales for T+3
@@ -0,0 +1,432 @@
+import heapq
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from dataclasses import dataclass
+
+import numpy as np
+
+from safety_stock_experimentations.batch_simulator import BatchSimulator, reorder_point_schedule
+from safety_stock_experimentations.config import (
+    BASE_STOCK,
+    COMMON_RANDOM_NUMBERS,
+    HISTO_DAYS,
+    LEAD_TIME,
+    LEAD_TIME_GRID_SIZE,
+    MC_ANALYTIC,
+    MC_REPLICATES,
+    MC_SAMPLING,
+    MC_SIMS,
+    N_SIMULATIONS,
+    N_WORKERS,
+    PROGRESS_INTERVAL,
+    SIM_DAYS,
+    SIMULATION_START_DATE,
+    SWEEP_SEED,
+    WRITE_OFF_RATE,
+)
+from safety_stock_experimentations.demand_distribution import seed_ciw
+from safety_stock_experimentations.environment_cache import EnvironmentCache, builder_description
+from safety_stock_experimentations.online_aggregation import DailyMetricsAggregator
+from safety_stock_experimentations.profiling import NULL_PHASE_TIMER, PhaseTimer
+from safety_stock_experimentations.results_store import ResultsStore
+from safety_stock_experimentations.scheduling import CostModel, SweepSchedule, cost_key, qualified_name
+from safety_stock_experimentations.seasonality import default_seasonality_profile
+
+
+CRN_STREAM_KEY = 2**31  # keeps day streams apart from the (environment, trial, agent) streams
+
+
+@dataclass(frozen=True)
+class SweepTask:
+    environment_key: int
+    environment_info: dict
+    trial_number: int
+    agent_configs: dict
+    agent_service_levels: dict  # agent key -> service levels still to simulate
+    seed: int
+    environment_cache: EnvironmentCache | None = None
+    profile_phases: bool = False
+    common_random_numbers: bool = False
+
+
+@dataclass(frozen=True)
+class CommonRandomNumbers:
+    # One reproducible generator per (environment, trial, day), independent of
+    # which agent asks and in which order, so paired comparisons between agents
+    # and service levels share their sampling randomness.
+    seed: int
+    environment_key: int
+    trial_number: int
+
+    def generator(self, day: int) -> np.random.Generator:
+        return np.random.default_rng(
+            np.random.SeedSequence(
+                self.seed,
+                spawn_key=(self.environment_key, self.trial_number, CRN_STREAM_KEY, day),
+            )
+        )
+
+
+def simulation_settings() -> dict:
+    # the config.py constants that the result of a run depends on
+    return {
+        "sim_days": SIM_DAYS,
+        "histo_days": HISTO_DAYS,
+        "lead_time": LEAD_TIME,
+        "lead_time_grid_size": LEAD_TIME_GRID_SIZE,
+        "mc_sims": MC_SIMS,
+        "mc_analytic": MC_ANALYTIC,
+        # the sampling settings only matter when reorder points are sampled
+        **({} if MC_ANALYTIC else {"mc_sampling": MC_SAMPLING, "mc_replicates": MC_REPLICATES}),
+        "base_stock": BASE_STOCK,
+        "write_off_rate": WRITE_OFF_RATE,
+        "start_date": SIMULATION_START_DATE.isoformat(),
+        "seasonality": default_seasonality_profile().to_dict(),
+    }
+
+
+def agent_description(agent_class) -> dict:
+    # an agent class, or a functools.partial binding some of its parameters
+    return {
+        "class": qualified_name(agent_class),
+        "parameters": {name: repr(value) for name, value in sorted(getattr(agent_class, "keywords", {}).items())},
+    }
+
+
+def seed_global_rngs(seed_sequence: np.random.SeedSequence):
+    # the simulation core draws from the global NumPy and ciw generators
+    numpy_seed, ciw_seed = seed_sequence.generate_state(2)
+    np.random.seed(numpy_seed)
+    seed_ciw(int(ciw_seed))
+
+
+def build_environment(builder, seed_sequence, environment_cache=None):
+    if environment_cache is None:
+        seed_global_rngs(seed_sequence)
+        return builder.build_environment()
+
+    cache_key = environment_cache.key(builder, seed_sequence)
+    environment = environment_cache.load(cache_key)
+    if environment is None:
+        seed_global_rngs(seed_sequence)
+        environment_cache.save(cache_key, builder.build_environment())
+        environment = environment_cache.load(cache_key)
+    return environment
+
+
+def run_sweep_task(task: SweepTask) -> tuple[list[dict], dict, dict]:
+    # The environment stream is keyed by (environment, trial) so every agent and
+    # service level sees the same realised demand; each agent gets its own
+    # stream keyed by (environment, trial, agent), or with common random numbers
+    # draws from the shared per-day streams. Returns the summaries, the
+    # per-phase timings (empty unless task.profile_phases) and the wall seconds
+    # per agent key: its own reorder points plus its share, by runs, of the
+    # environment and the batched simulation.
+    start = time.perf_counter()
+    phase_timer = PhaseTimer() if task.profile_phases else NULL_PHASE_TIMER
+    with phase_timer.phase("environment_generation"):
+        environment = build_environment(
+            task.environment_info["class"](),
+            np.random.SeedSequence(task.seed, spawn_key=(task.environment_key, task.trial_number)),
+            task.environment_cache,
+        )
+
+    random_streams = (
+        CommonRandomNumbers(task.seed, task.environment_key, task.trial_number)
+        if task.common_random_numbers
+        else None
+    )
+    agents, reorder_point_schedules, agent_seconds = [], [], {}
+    for agent_key, agent_info in task.agent_configs.items():
+        agent_start = time.perf_counter()
+        seed_global_rngs(
+            np.random.SeedSequence(
+                task.seed, spawn_key=(task.environment_key, task.trial_number, agent_key)
+            )
+        )
+        # one agent evaluates every service level from shared per-day statistics
+        agent = agent_info["class"](environment, list(task.agent_service_levels[agent_key]), random_streams)
+        with phase_timer.phase(f"reorder_point[{type(agent).__name__}]"):
+            reorder_point_schedules.append(reorder_point_schedule(agent))
+        agents.append(agent)
+        agent_seconds[agent_key] = time.perf_counter() - agent_start
+
+    # every agent of the trial steps through the horizon in one batch
+    sim = BatchSimulator(agents=agents, environments=[environment] * len(agents), phase_timer=phase_timer)
+    summaries = iter(sim.run_simulation(reorder_point_schedules))
+    inventory_data_summaries = []
+    for agent, (agent_key, agent_info) in zip(agents, task.agent_configs.items()):
+        service_levels = task.agent_service_levels[agent_key]
+        standard_errors = agent.reorder_point_standard_errors()
+        for service_level, standard_error, inventory_data_summary in zip(service_levels, standard_errors, summaries):
+            inventory_data_summary["service_level"] = service_level
+            # NaN unless the agent samples its reorder points
+            inventory_data_summary["reorder_point_standard_error"] = float(standard_error)
+            inventory_data_summary["agent"] = agent_info["name"]
+            inventory_data_summary["environment"] = task.environment_info["name"]
+            inventory_data_summary["day"] = task.trial_number  # the trial, see paired_comparison.TRIAL_COLUMN
+            inventory_data_summaries.append(inventory_data_summary)
+
+    shared_seconds = time.perf_counter() - start - sum(agent_seconds.values())
+    for agent_key, service_levels in task.agent_service_levels.items():
+        if agent_key in agent_seconds:
+            agent_seconds[agent_key] += shared_seconds * len(service_levels) / len(inventory_data_summaries)
+    return inventory_data_summaries, phase_timer.to_dict(), agent_seconds
+
+
+class SweepExecutor:
+    # Runs the environments x trials x agents x service levels grid on a process
+    # pool. Results do not depend on the worker count or completion order.
+    # With a ResultsStore, every finished task is written as soon as it completes
+    # and runs already in the store are skipped. With a DailyMetricsAggregator,
+    # daily metrics are folded into it as tasks complete; retain_daily_metrics=False
+    # then drops them from the returned summaries so memory stays flat in n_trials.
+    # Every task simulates the agents of one (environment, trial) in one batch.
+    # With a CostModel, tasks are dispatched longest first, with a projected
+    # completion time printed as they finish.
+    def __init__(
+        self,
+        environment_configs: dict,
+        agent_configs: dict,
+        service_levels: list[float],
+        n_trials: int = N_SIMULATIONS,
+        max_workers: int | None = N_WORKERS,
+        seed: int = SWEEP_SEED,
+        results_store: ResultsStore | None = None,
+        environment_cache: EnvironmentCache | None = None,
+        phase_timer=NULL_PHASE_TIMER,
+        aggregator: DailyMetricsAggregator | None = None,
+        retain_daily_metrics: bool = True,
+        common_random_numbers: bool = COMMON_RANDOM_NUMBERS,
+        cost_model: CostModel | None = None,
+        progress_interval: float | None = PROGRESS_INTERVAL,
+    ):
+        self.environment_configs = environment_configs
+        self.agent_configs = agent_configs
+        self.service_levels = tuple(service_levels)
+        self.n_trials = n_trials
+        self.max_workers = max_workers
+        self.seed = seed
+        self.results_store = results_store
+        self.environment_cache = environment_cache
+        self.phase_timer = phase_timer
+        self.aggregator = aggregator
+        self.retain_daily_metrics = retain_daily_metrics
+        self.common_random_numbers = common_random_numbers
+        self.cost_model = cost_model
+        self.progress_interval = progress_interval  # None prints no projections
+
+    def fingerprint(self) -> dict:
+        # What the stored runs of this sweep depend on besides their (environment,
+        # agent, trial, service level) key: the seed and simulation settings, and
+        # what each environment and agent name stands for. A results store only
+        # takes runs of matching sweeps, see ResultsStore.claim.
+        return {
+            "seed": self.seed,
+            "common_random_numbers": self.common_random_numbers,
+            "simulation": simulation_settings(),
+            "environments": {
+                environment_info["name"]: builder_description(environment_info["class"]())
+                for environment_info in self.environment_configs.values()
+            },
+            "agents": {
+                agent_info["name"]: agent_description(agent_info["class"])
+                for agent_info in self.agent_configs.values()
+            },
+        }
+
+    def completed_runs(self) -> set:
+        # the runs already in the results store, once it is claimed for this sweep
+        if self.results_store is None:
+            return set()
+        self.results_store.claim(self.fingerprint())
+        return self.results_store.completed_runs()
+
+    def tasks(self) -> list[SweepTask]:
+        completed_runs = self.completed_runs()
+        tasks = []
+        for environment_key, environment_info in self.environment_configs.items():
+            for trial_number in range(self.n_trials):
+                task = self._task(
+                    environment_key,
+                    trial_number,
+                    {agent_key: self.service_levels for agent_key in self.agent_configs},
+                    completed_runs,
+                )
+                if task is not None:
+                    tasks.append(task)
+        return tasks
+
+    def _task(
+        self, environment_key, trial_number, agent_service_levels: dict, completed_runs: set
+    ) -> SweepTask | None:
+        # the task for one (environment, trial) covering the given service levels
+        # per agent key, minus completed runs; None when nothing is left
+        environment_info = self.environment_configs[environment_key]
+        agent_service_levels = {
+            agent_key: tuple(
+                service_level
+                for service_level in service_levels
+                if (
+                    environment_info["name"],
+                    self.agent_configs[agent_key]["name"],
+                    trial_number,
+                    service_level,
+                )
+                not in completed_runs
+            )
+            for agent_key, service_levels in agent_service_levels.items()
+        }
+        agent_configs = {
+            agent_key: self.agent_configs[agent_key]
+            for agent_key, service_levels in agent_service_levels.items()
+            if service_levels
+        }
+        if not agent_configs:
+            return None
+        return SweepTask(
+            environment_key=environment_key,
+            environment_info=environment_info,
+            trial_number=trial_number,
+            agent_configs=agent_configs,
+            agent_service_levels=agent_service_levels,
+            seed=self.seed,
+            environment_cache=self.environment_cache,
+            profile_phases=isinstance(self.phase_timer, PhaseTimer),
+            common_random_numbers=self.common_random_numbers,
+        )
+
+    def run(self) -> list[dict]:
+        # returns the summaries computed by this call, in task order
+        if self.max_workers == 1:
+            return self._execute(self.tasks())
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            return self._execute(self.tasks(), pool)
+
+    def _execute(self, tasks: list[SweepTask], pool: ProcessPoolExecutor | None = None) -> list[dict]:
+        # runs in this process without a pool; summaries come back in task order
+        if self.cost_model is None:
+            task_results = self._dispatch(tasks, range(len(tasks)), pool)
+        else:
+            task_results = self._dispatch_longest_first(tasks, pool)
+        return [summary for index in range(len(tasks)) for summary in task_results[index]]
+
+    def _dispatch(self, tasks: list[SweepTask], order, pool) -> dict[int, list[dict]]:
+        # tasks are queued in `order` and idle workers take the next one from the
+        # pool's shared queue, so no worker waits on a static share of the tasks
+        task_results = {}
+        if pool is None:
+            for index in order:
+                summaries, phase_totals, _ = run_sweep_task(tasks[index])
+                task_results[index] = self._collect(summaries, phase_totals)
+        else:
+            futures = {pool.submit(run_sweep_task, tasks[index]): index for index in order}
+            for future in as_completed(futures):
+                summaries, phase_totals, _ = future.result()
+                task_results[futures[future]] = self._collect(summaries, phase_totals)
+        return task_results
+
+    def _dispatch_longest_first(self, tasks: list[SweepTask], pool) -> dict[int, list[dict]]:
+        # A task is estimated as the sum over its agents of the cost per agent
+        # run. One task for every key without recorded timings calibrates the
+        # model and is queued first; these runs are part of the sweep and their
+        # results are kept. The other tasks wait in a longest-first heap, from
+        # which free slots of a bounded window over the pool are filled, so the
+        # workers stay busy during calibration and later tasks are ordered by
+        # estimates that are rebuilt whenever a key is calibrated.
+        keys = [self._cost_keys(task) for task in tasks]
+        calibration_runs = {}
+        for index, task_keys in enumerate(keys):
+            for key in task_keys.values():
+                if key not in self.cost_model and key not in calibration_runs:
+                    calibration_runs[key] = index
+        calibrating = sorted(set(calibration_runs.values()))
+        if calibrating and self.progress_interval is not None:
+            print(f"Calibrating task costs on {len(calibrating)} tasks")
+
+        def estimate(index) -> float:
+            return sum(self.cost_model.estimate(key) for key in keys[index].values())
+
+        workers = 1 if pool is None else self._workers
+        schedule = SweepSchedule([estimate(index) for index in range(len(tasks))], workers)
+        waiting = set(range(len(tasks))) - set(calibrating)
+        queue = []
+
+        def rebuild_queue():
+            estimates = {index: estimate(index) for index in waiting}
+            schedule.update_estimates(estimates)
+            queue[:] = [(-estimate, index) for index, estimate in estimates.items()]
+            heapq.heapify(queue)
+
+        def next_task() -> int:
+            index = calibrating.pop(0) if calibrating else heapq.heappop(queue)[1]
+            waiting.discard(index)
+            return index
+
+        task_results = {}
+
+        def on_finished(index, summaries, phase_totals, agent_seconds):
+            task_results[index] = self._collect(summaries, phase_totals)
+            calibrated = any(key not in self.cost_model for key in keys[index].values())
+            for agent_key, seconds in agent_seconds.items():
+                self.cost_model.record(keys[index][agent_key], seconds)
+            if calibrated:
+                rebuild_queue()
+                schedule.update_estimates({index: estimate(index)})
+            schedule.record(index, sum(agent_seconds.values()))
+            if self.progress_interval is not None:
+                report = schedule.report_due(self.progress_interval)
+                if report is not None:
+                    print(report)
+
+        rebuild_queue()
+        if self.progress_interval is not None and tasks:
+            print(schedule.report())
+        if pool is None:
+            while calibrating or queue:
+                index = next_task()
+                on_finished(index, *run_sweep_task(tasks[index]))
+        else:
+            # twice the workers in flight keeps the pool's own queue from running dry
+            in_flight = {}
+            while calibrating or queue or in_flight:
+                while (calibrating or queue) and len(in_flight) < 2 * workers:
+                    index = next_task()
+                    in_flight[pool.submit(run_sweep_task, tasks[index])] = index
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    on_finished(in_flight.pop(future), *future.result())
+        self.cost_model.save()
+        return task_results
+
+    @property
+    def _workers(self) -> int:
+        return self.max_workers or os.cpu_count() or 1
+
+    @staticmethod
+    def _cost_keys(task: SweepTask) -> dict[int, str]:
+        # cost key of each agent run of the task
+        return {
+            agent_key: cost_key(agent_info["class"], task.environment_info["class"])
+            for agent_key, agent_info in task.agent_configs.items()
+        }
+
+    def _collect(self, inventory_data_summaries: list[dict], phase_totals: dict) -> list[dict]:
+        self.phase_timer.merge(phase_totals)
+        if self.results_store is not None:
+            with self.phase_timer.phase("result_storage"):
+                self.results_store.write_summaries(inventory_data_summaries)
+        if self.aggregator is not None:
+            with self.phase_timer.phase("online_aggregation"):
+                for summary in inventory_data_summaries:
+                    self.aggregator.update_run(
+                        summary["agent"],
+                        summary["environment"],
+                        summary["service_level"],
+                        summary["daily_performance_metrics"],
+                    )
+        if not self.retain_daily_metrics:
+            for summary in inventory_data_summaries:
+                del summary["daily_performance_metrics"]
+        return inventory_data_summaries
@@ -0,0 +1,19 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+# The repository root is the safety_stock_experimentations package, and some of
+# its modules import their siblings as top-level modules (from config import ...),
+# so both need to be importable whatever the checkout directory is called.
+REPOSITORY_ROOT = Path(__file__).resolve().parents[1]
+
+sys.path.insert(0, str(REPOSITORY_ROOT))
+if "safety_stock_experimentations" not in sys.modules:
+    _spec = importlib.util.spec_from_file_location(
+        "safety_stock_experimentations",
+        REPOSITORY_ROOT / "__init__.py",
+        submodule_search_locations=[str(REPOSITORY_ROOT)],
+    )
+    _package = importlib.util.module_from_spec(_spec)
+    sys.modules["safety_stock_experimentations"] = _package
+    _spec.loader.exec_module(_package)
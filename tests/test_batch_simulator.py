@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from safety_stock_experimentations.agent import (
+    BaseAgent,
+    ForecastAgent,
+    MonteCarloAgent,
+    SafetyStockAgent,
+)
+from safety_stock_experimentations.batch_simulator import BatchSimulator
+from safety_stock_experimentations.demand_distribution import GammaGammaHighVariance, GammaPoisson
+from safety_stock_experimentations.simulator import Simulator
+
+
+@pytest.fixture(scope="module")
+def environments():
+    np.random.seed(11)
+    return [GammaPoisson().build_environment(), GammaGammaHighVariance().build_environment()]
+
+
+def _assert_same_summary(batch_summary: dict, summary: dict):
+    assert batch_summary.keys() == summary.keys()
+    for key, value in summary.items():
+        if key == "daily_performance_metrics":
+            assert batch_summary[key].keys() == value.keys()
+            for metric, values in value.items():
+                np.testing.assert_array_equal(batch_summary[key][metric], values, err_msg=metric)
+        else:
+            assert batch_summary[key] == value, key
+
+
+@pytest.mark.parametrize("agent_class", [BaseAgent, SafetyStockAgent, ForecastAgent, MonteCarloAgent])
+def test_batch_engine_matches_per_run_engine(environments, agent_class):
+    summaries = [
+        Simulator(agent_class(environment, 0.95), environment).run_simulation() for environment in environments
+    ]
+    batch_summaries = BatchSimulator(
+        [agent_class(environment, 0.95) for environment in environments], environments
+    ).run_simulation()
+
+    assert len(batch_summaries) == len(summaries)
+    for batch_summary, summary in zip(batch_summaries, summaries):
+        _assert_same_summary(batch_summary, summary)
+
+
+def test_batch_engine_matches_per_run_engine_for_several_service_levels(environments):
+    service_levels = [0.90, 0.95, 0.98]
+    environment = environments[0]
+    summaries = Simulator(SafetyStockAgent(environment, service_levels), environment).run_simulation()
+    batch_summaries = BatchSimulator([SafetyStockAgent(environment, service_levels)], [environment]).run_simulation()
+
+    assert len(batch_summaries) == len(summaries) == len(service_levels)
+    for batch_summary, summary in zip(batch_summaries, summaries):
+        _assert_same_summary(batch_summary, summary)
+
+
+def test_repeated_service_levels_are_separate_runs(environments):
+    environment = environments[0]
+    summaries = Simulator(SafetyStockAgent(environment, [0.95, 0.95]), environment).run_simulation()
+    batch_summaries = BatchSimulator([SafetyStockAgent(environment, [0.95, 0.95])], [environment]).run_simulation()
+
+    assert len(summaries) == len(batch_summaries) == 2
+    for batch_summary, summary in zip(batch_summaries, summaries):
+        _assert_same_summary(batch_summary, summary)
+    _assert_same_summary(summaries[0], summaries[1])
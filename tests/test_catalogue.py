@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from safety_stock_experimentations.catalogue import (
+    CATALOGUE_COLUMNS,
+    read_catalogue,
+    run_catalogue,
+    sample_catalogue_demand,
+    simulate_catalogue_chunk,
+    synthetic_catalogue,
+)
+from safety_stock_experimentations.config import SIM_DAYS
+from safety_stock_experimentations.seasonality import default_seasonality_profile
+
+N_SKUS = 20
+CHUNK_SIZE = 7
+
+
+@pytest.fixture
+def catalogue():
+    return synthetic_catalogue(N_SKUS, seed=3)
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".csv"])
+def test_catalogue_is_read_in_bounded_chunks(tmp_path, catalogue, suffix):
+    path = tmp_path / f"catalogue{suffix}"
+    incomplete = catalogue.drop(columns=["poisson_rate", "poisson_weight"])
+    if suffix == ".parquet":
+        incomplete.to_parquet(path, index=False)
+    else:
+        incomplete.to_csv(path, index=False)
+
+    chunks = list(read_catalogue(path, CHUNK_SIZE))
+    assert [len(chunk) for chunk in chunks] == [7, 7, 6]
+    read = pd.concat(chunks, ignore_index=True)
+    assert set(read.columns) >= set(CATALOGUE_COLUMNS)
+    assert (read["poisson_weight"] == 0.0).all() and (read["seasonality_curve"] == "").all()
+    np.testing.assert_allclose(read["gamma_shape"], catalogue["gamma_shape"])
+    assert list(read["sku"]) == list(catalogue["sku"])
+
+
+def test_catalogue_without_a_required_column_is_refused(tmp_path, catalogue):
+    path = tmp_path / "catalogue.parquet"
+    catalogue.drop(columns=["gamma_scale"]).to_parquet(path, index=False)
+    with pytest.raises(ValueError, match="gamma_scale"):
+        next(read_catalogue(path))
+
+
+def test_each_chunk_is_simulated_from_its_own_stream(tmp_path, catalogue):
+    catalogue_path = tmp_path / "catalogue.parquet"
+    catalogue.to_parquet(catalogue_path, index=False)
+    report = run_catalogue(catalogue_path, tmp_path / "summaries.parquet", chunk_size=CHUNK_SIZE, seed=4)
+
+    assert (report.n_skus, report.n_chunks) == (N_SKUS, 3)
+    summaries_file = pq.ParquetFile(report.output_path)
+    assert summaries_file.num_row_groups == 3
+    summaries = summaries_file.read().to_pandas()
+    assert list(summaries["sku"]) == list(catalogue["sku"])
+
+    # the chunk starting at row r draws from the stream (seed, r) alone
+    multipliers = default_seasonality_profile().multipliers(SIM_DAYS)
+    for start in range(0, N_SKUS, CHUNK_SIZE):
+        chunk = catalogue.iloc[start : start + CHUNK_SIZE].reset_index(drop=True)
+        demand = sample_catalogue_demand(
+            chunk, multipliers, np.random.default_rng(np.random.SeedSequence(4, spawn_key=(start,)))
+        )
+        expected = simulate_catalogue_chunk(demand, chunk["lead_time"], chunk["service_level"])
+        for name, values in expected.items():
+            np.testing.assert_array_equal(summaries[name].iloc[start : start + CHUNK_SIZE], values, err_msg=name)
+
+    rerun = run_catalogue(catalogue_path, tmp_path / "rerun.parquet", chunk_size=CHUNK_SIZE, seed=4)
+    assert pq.read_table(rerun.output_path).equals(summaries_file.read())
+
+
+def test_skus_of_a_chunk_do_not_interact(catalogue):
+    # every SKU simulated alone, with its own lead time and pipeline, gives the
+    # row it gets in the chunk
+    demand = sample_catalogue_demand(
+        catalogue, default_seasonality_profile().multipliers(SIM_DAYS), np.random.default_rng(5)
+    )
+    lead_times = catalogue["lead_time"].to_numpy()
+    service_levels = catalogue["service_level"].to_numpy()
+    together = simulate_catalogue_chunk(demand, lead_times, service_levels)
+    for sku in range(0, N_SKUS, 3):
+        row = slice(sku, sku + 1)
+        alone = simulate_catalogue_chunk(demand[row], lead_times[row], service_levels[row])
+        for name, values in alone.items():
+            assert together[name][sku] == pytest.approx(values[0]), name
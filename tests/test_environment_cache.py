@@ -0,0 +1,72 @@
+import functools
+import inspect
+
+import numpy as np
+import pytest
+
+from safety_stock_experimentations import environment_cache as environment_cache_module
+from safety_stock_experimentations import seasonality
+from safety_stock_experimentations.demand_distribution import GammaPoisson, SingleGammaLowVariance
+from safety_stock_experimentations.demand_distribution_parameters import GammaParameterRange
+from safety_stock_experimentations.environment_cache import EnvironmentCache
+from safety_stock_experimentations.sweep import build_environment
+
+SEED_SEQUENCE = np.random.SeedSequence(7, spawn_key=(0, 1))
+
+
+def _assert_same_environment(cached, built):
+    np.testing.assert_array_equal(cached.realised_demand, built.realised_demand)
+    np.testing.assert_array_equal(cached.mean_demand, built.mean_demand)
+    assert len(cached.components) == len(built.components)
+    for cached_component, component in zip(cached.components, built.components):
+        assert cached_component.weight == component.weight
+        for name in ("shape", "scale", "rate"):
+            if getattr(component, name) is None:
+                assert getattr(cached_component, name) is None
+            else:
+                np.testing.assert_array_equal(getattr(cached_component, name), getattr(component, name))
+
+
+def test_second_build_is_loaded_from_the_cache(tmp_path, monkeypatch):
+    cache = EnvironmentCache(tmp_path)
+    built = build_environment(GammaPoisson(), SEED_SEQUENCE, cache)
+    _assert_same_environment(built, build_environment(GammaPoisson(), SEED_SEQUENCE))
+
+    def fail(self):
+        raise AssertionError("the cached environment was regenerated")
+
+    monkeypatch.setattr(GammaPoisson, "build_environment", fail)
+    cached = build_environment(GammaPoisson(), SEED_SEQUENCE, cache)
+    assert isinstance(cached.realised_demand, np.memmap)
+    _assert_same_environment(cached, built)
+
+
+@pytest.mark.parametrize(
+    "builder, seed_sequence",
+    [
+        (SingleGammaLowVariance(), np.random.SeedSequence(8, spawn_key=(0, 1))),
+        (SingleGammaLowVariance(), np.random.SeedSequence(7, spawn_key=(0, 2))),
+        (GammaPoisson(), SEED_SEQUENCE),
+        (SingleGammaLowVariance(GammaParameterRange(shape_min=2)), SEED_SEQUENCE),
+    ],
+)
+def test_key_changes_with_the_builder_and_seed(builder, seed_sequence):
+    assert EnvironmentCache.key(builder, seed_sequence) != EnvironmentCache.key(SingleGammaLowVariance(), SEED_SEQUENCE)
+    assert EnvironmentCache.key(builder, seed_sequence) == EnvironmentCache.key(builder, seed_sequence)
+
+
+def test_key_changes_with_the_source_of_a_generator_module(monkeypatch):
+    key = EnvironmentCache.key(GammaPoisson(), SEED_SEQUENCE)
+    getsource = inspect.getsource
+
+    def edited_getsource(code):
+        return getsource(code) + ("\n# edited" if code is seasonality else "")
+
+    # an edit to a module the builder only calls into, not to its class
+    monkeypatch.setattr(inspect, "getsource", edited_getsource)
+    monkeypatch.setattr(
+        environment_cache_module,
+        "_source_digest",
+        functools.lru_cache(maxsize=None)(environment_cache_module._source_digest.__wrapped__),
+    )
+    assert EnvironmentCache.key(GammaPoisson(), SEED_SEQUENCE) != key
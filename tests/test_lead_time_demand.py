@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from safety_stock_experimentations.agent import MonteCarloAgent
+from safety_stock_experimentations.config import HISTO_DAYS, LEAD_TIME, SIM_DAYS
+from safety_stock_experimentations.demand_distribution import (
+    DemandComponent,
+    DemandEnvironment,
+    GammaGammaHighVariance,
+    GammaPoisson,
+    SingleGammaLowVariance,
+)
+from safety_stock_experimentations.lead_time_demand import lead_time_days, lead_time_demand_quantiles
+
+PROBABILITIES = np.array([0.5, 0.9, 0.95, 0.98])
+MC_SAMPLES = 400_000
+
+
+@pytest.mark.parametrize("builder_class", [GammaPoisson, GammaGammaHighVariance, SingleGammaLowVariance])
+def test_quantiles_match_a_large_monte_carlo_sample(builder_class):
+    np.random.seed(21)
+    environment = builder_class().build_environment()
+    time_periods = np.array([HISTO_DAYS, 500, SIM_DAYS - 1])
+    quantiles = lead_time_demand_quantiles(environment, time_periods, PROBABILITIES)
+
+    rng = np.random.default_rng(22)
+    for index, days in enumerate(lead_time_days(environment, time_periods)):
+        samples = environment.sample(np.broadcast_to(days, (MC_SAMPLES, LEAD_TIME)), rng).sum(axis=1)
+        np.testing.assert_allclose(quantiles[:, index], np.quantile(samples, PROBABILITIES), rtol=0.005)
+
+
+def test_quantiles_of_gammas_sharing_a_scale_match_the_closed_form():
+    # a sum of Gammas with one scale is Gamma(sum of shapes, scale)
+    rng = np.random.default_rng(23)
+    shape = rng.uniform(2, 9, SIM_DAYS)
+    environment = DemandEnvironment(
+        components=[DemandComponent(weight=1.0, shape=shape, scale=np.full(SIM_DAYS, 12.0))],
+        realised_demand=np.zeros(SIM_DAYS, dtype=np.int32),
+        mean_demand=shape * 12.0,
+    )
+    time_periods = np.arange(HISTO_DAYS, SIM_DAYS, 37)
+    quantiles = lead_time_demand_quantiles(environment, time_periods, PROBABILITIES)
+    expected = stats.gamma.ppf(
+        PROBABILITIES[:, None], shape[lead_time_days(environment, time_periods)].sum(axis=1), scale=12.0
+    )
+    np.testing.assert_allclose(quantiles, expected, rtol=1e-3)
+
+
+def test_quantile_of_a_period_does_not_depend_on_the_other_periods():
+    np.random.seed(24)
+    environment = GammaPoisson().build_environment()
+    schedule = lead_time_demand_quantiles(environment, np.arange(HISTO_DAYS, SIM_DAYS), PROBABILITIES)
+    for time_period in (HISTO_DAYS, 400, 447, 448, SIM_DAYS - 1):
+        np.testing.assert_array_equal(
+            lead_time_demand_quantiles(environment, np.array([time_period]), PROBABILITIES)[:, 0],
+            schedule[:, time_period - HISTO_DAYS],
+        )
+
+
+def test_analytic_agent_schedule_matches_its_daily_reorder_points():
+    np.random.seed(25)
+    environment = GammaGammaHighVariance().build_environment()
+    agent = MonteCarloAgent(environment, [0.9, 0.95])
+    schedule = agent.compute_reorder_point_schedule()
+    for time_period in (HISTO_DAYS, 600):
+        np.testing.assert_array_equal(agent.compute_reorder_point(time_period), schedule[:, time_period - HISTO_DAYS])
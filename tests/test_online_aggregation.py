@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from safety_stock_experimentations import cli
+from safety_stock_experimentations.agent import BaseAgent, SafetyStockAgent
+from safety_stock_experimentations.batch_simulator import BatchSimulator
+from safety_stock_experimentations.config import DAILY_MOMENTS_FILE
+from safety_stock_experimentations.demand_distribution import GammaPoisson, SingleGammaLowVariance
+from safety_stock_experimentations.online_aggregation import DailyMetricsAggregator
+from safety_stock_experimentations.results_store import ResultsStore
+from safety_stock_experimentations.simulator import Simulator
+from safety_stock_experimentations.sweep import SweepExecutor
+
+METRICS = ("inventory", "demand", "write_offs")
+SERVICE_LEVELS = [0.9, 0.95]
+
+
+def _sweep(n_trials, aggregator, **options) -> list[dict]:
+    return SweepExecutor(
+        {0: {"name": "Gamma", "class": SingleGammaLowVariance}},
+        {0: {"name": "Safety Stock Agent", "class": SafetyStockAgent}},
+        SERVICE_LEVELS,
+        n_trials=n_trials,
+        max_workers=1,
+        progress_interval=None,
+        aggregator=aggregator,
+        **options,
+    ).run()
+
+
+def _assert_totals_match(moments, summaries):
+    # summed over days, the per-day moments give back the column-based totals
+    runs = len(summaries)
+    assert moments["count"].max() == runs
+    counts = moments["count"].to_numpy()
+    assert (moments["demand_mean"] * counts).sum() == pytest.approx(
+        sum(summary["total_demand"] for summary in summaries)
+    )
+    assert (moments["write_offs_mean"] * counts).sum() == pytest.approx(
+        sum(summary["write_offs"] for summary in summaries)
+    )
+    assert moments["inventory_mean"].mean() == pytest.approx(
+        np.mean([summary["avg_inventory_level"] for summary in summaries])
+    )
+
+
+def test_streamed_daily_metrics_match_the_column_summaries():
+    np.random.seed(3)
+    environment = GammaPoisson().build_environment()
+    aggregator = DailyMetricsAggregator(METRICS)
+    simulator = Simulator(BaseAgent(environment, SERVICE_LEVELS), environment)
+    aggregator.consume("Base", "Gamma Poisson", simulator.stream_daily_metrics())
+    summaries = BatchSimulator([BaseAgent(environment, SERVICE_LEVELS)], [environment]).run_simulation()
+
+    moments = aggregator.to_dataframe()
+    for service_level, summary in zip(SERVICE_LEVELS, summaries):
+        _assert_totals_match(moments[moments["service_level"] == service_level], [summary])
+
+
+def test_sweep_moments_match_the_stored_runs():
+    aggregator = DailyMetricsAggregator(METRICS)
+    summaries = _sweep(4, aggregator)
+    moments = aggregator.to_dataframe()
+    for service_level in SERVICE_LEVELS:
+        runs = [summary for summary in summaries if summary["service_level"] == service_level]
+        selected = moments[moments["service_level"] == service_level]
+        _assert_totals_match(selected, runs)
+        inventory = np.array([run["daily_performance_metrics"]["inventory"] for run in runs])
+        np.testing.assert_allclose(selected["inventory_std"], inventory.std(axis=0, ddof=1), rtol=1e-9)
+
+
+def test_saved_moments_take_further_runs(tmp_path):
+    results_store = ResultsStore(tmp_path / "results")
+    first = DailyMetricsAggregator(METRICS)
+    _sweep(2, first, results_store=results_store)
+    first.save(tmp_path / DAILY_MOMENTS_FILE)
+
+    resumed = DailyMetricsAggregator.load(tmp_path / DAILY_MOMENTS_FILE)
+    _sweep(4, resumed, results_store=results_store)  # trials 2 and 3 only
+    complete = DailyMetricsAggregator(METRICS)
+    _sweep(4, complete)
+
+    expected_runs = {("Safety Stock Agent", "Gamma", level): 4 for level in SERVICE_LEVELS}
+    assert resumed.runs() == complete.runs() == expected_runs
+    pd.testing.assert_frame_equal(resumed.to_dataframe(), complete.to_dataframe(), check_exact=False, rtol=1e-9)
+
+
+def test_run_command_keeps_moments_for_serve(tmp_path):
+    options = [
+        "--results-dir", str(tmp_path / "results"),
+        "--environment-cache", str(tmp_path / "cache"),
+        "--agents", "0", "1",
+        "--service-levels", "0.9",
+        "--workers", "1",
+    ]
+    assert cli.main(["run", "--trials", "2", "--aggregate-daily-metrics", *options]) == 0
+    summaries = ResultsStore(tmp_path / "results").load_summaries()
+    aggregator = cli._daily_aggregator(tmp_path / "results", summaries)
+    assert aggregator is not None and set(aggregator.runs().values()) == {2}
+
+    # runs stored without the moments leave them incomplete
+    assert cli.main(["run", "--trials", "3", "--no-aggregate-daily-metrics", *options]) == 0
+    summaries = ResultsStore(tmp_path / "results").load_summaries()
+    assert cli._daily_aggregator(tmp_path / "results", summaries) is None
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from safety_stock_experimentations.config import LEAD_TIME
+from safety_stock_experimentations.order_processor import OrderProcessor
+
+
+class ListOrderProcessor:
+    # the list-based order queue OrderProcessor replaced, with per-order lead times
+    def __init__(self):
+        self.order_queue = []
+
+    def place_order(self, time_period: int, quantity: int, lead_time: int = LEAD_TIME):
+        self.order_queue.append((time_period + lead_time, quantity))
+
+    def manage_order(self, time_period: int) -> int:
+        arrived_quantity = sum(quantity for day, quantity in self.order_queue if day == time_period)
+        self.order_queue = [(day, quantity) for day, quantity in self.order_queue if day > time_period]
+        return arrived_quantity
+
+    def get_order_at_date(self, day):
+        return sum(quantity for arrival_day, quantity in self.order_queue if arrival_day == day)
+
+    def get_incoming_orders(self, current_day: int) -> int:
+        return sum(quantity for day, quantity in self.order_queue if day > current_day)
+
+
+def _compare(seed: int, n_days: int = 80, max_lead_time: int = 2 * LEAD_TIME, day_steps=(1,), receive_probability=1.0):
+    rng = random.Random(seed)
+    order_processor = OrderProcessor()
+    reference = ListOrderProcessor()
+    day = 0
+    for _ in range(n_days):
+        if rng.random() < receive_probability:
+            assert order_processor.manage_order(day) == reference.manage_order(day)
+        for _ in range(rng.randint(0, 2)):
+            quantity = rng.randint(1, 50)
+            lead_time = rng.randint(1, max_lead_time)
+            order_processor.place_order(day, quantity, lead_time)
+            reference.place_order(day, quantity, lead_time)
+        assert order_processor.get_incoming_orders(day) == reference.get_incoming_orders(day)
+        for offset in range(max_lead_time + 2):
+            assert order_processor.get_order_at_date(day + offset) == reference.get_order_at_date(day + offset)
+        day += rng.choice(day_steps)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_ring_buffer_matches_list_implementation(seed):
+    _compare(seed)
+
+
+def test_order_queue_view_lists_pending_orders():
+    order_processor = OrderProcessor()
+    order_processor.place_order(0, 10)
+    order_processor.place_order(1, 5, lead_time=LEAD_TIME + 2)
+    assert [(order.arrival_day, order.quantity) for order in order_processor.order_queue] == [
+        (LEAD_TIME, 10),
+        (LEAD_TIME + 3, 5),
+    ]
+
+
+def test_orders_need_a_positive_lead_time():
+    with pytest.raises(ValueError):
+        OrderProcessor().place_order(0, 10, lead_time=0)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_ring_buffer_matches_list_implementation_with_skipped_days(seed):
+    # days jump ahead and are not always received, as when a caller does not
+    # call manage_order every day
+    _compare(seed, day_steps=(1, 2, 3, 5, 9), receive_probability=0.6)
+
+
+def test_orders_due_on_skipped_days_are_dropped():
+    order_processor = OrderProcessor()
+    order_processor.place_order(0, 10)
+    assert order_processor.get_incoming_orders(LEAD_TIME + 2) == 0
+    order_processor.place_order(LEAD_TIME + 2, 7)
+    assert order_processor.get_order_at_date(2 * LEAD_TIME + 2) == 7
+    assert order_processor.manage_order(2 * LEAD_TIME + 2) == 7
+    assert order_processor.get_incoming_orders(2 * LEAD_TIME + 2) == 0
@@ -0,0 +1,70 @@
+import ciw
+import numpy as np
+import pytest
+
+from safety_stock_experimentations.agent import MonteCarloAgent
+from safety_stock_experimentations.config import LEAD_TIME
+from safety_stock_experimentations.demand_distribution import DailyDemandDistribution
+
+MC_SIMS = 20_000
+SERVICE_LEVELS = [0.90, 0.95, 0.98]
+
+
+def _daily_demand_distributions(n_days: int = 12) -> list[DailyDemandDistribution]:
+    # ciw demand like GammaPoisson, with day-dependent parameters
+    return [
+        DailyDemandDistribution(
+            time_step=time_step,
+            realised_demand=0,
+            demand_distribution=ciw.dists.MixtureDistribution(
+                [
+                    ciw.dists.Gamma(shape=4.0 + time_step % 3, scale=5.0),
+                    ciw.dists.Poisson(rate=10.0),
+                ],
+                [0.9, 0.1],
+            ),
+            mean_demand_distribution=0.0,
+        )
+        for time_step in range(n_days)
+    ]
+
+
+def _agent(vectorized: bool) -> MonteCarloAgent:
+    return MonteCarloAgent(
+        _daily_demand_distributions(), SERVICE_LEVELS, vectorized=vectorized, analytic=False, mc_sims=MC_SIMS
+    )
+
+
+@pytest.mark.parametrize("time_period", [0, 4, 10])
+def test_vectorized_lead_time_demand_matches_per_sample_path(time_period):
+    ciw.seed(1)
+    np.random.seed(1)
+    distributions = _daily_demand_distributions()
+    per_sample = np.asarray(
+        _agent(vectorized=False)._sample_lead_time_demand(time_period, distributions, MC_SIMS), dtype=float
+    )
+    vectorized = _agent(vectorized=True)._sample_lead_time_demand_vectorized(time_period, distributions, MC_SIMS)
+
+    assert vectorized.shape == (MC_SIMS,)
+    assert vectorized.mean() == pytest.approx(per_sample.mean(), rel=0.02)
+    assert vectorized.std() == pytest.approx(per_sample.std(), rel=0.05)
+
+
+@pytest.mark.parametrize("time_period", [0, 4, 10])
+def test_vectorized_reorder_points_match_per_sample_path(time_period):
+    ciw.seed(2)
+    np.random.seed(2)
+    per_sample = _agent(vectorized=False).compute_reorder_point(time_period)
+    vectorized = _agent(vectorized=True).compute_reorder_point(time_period)
+
+    assert vectorized.shape == (len(SERVICE_LEVELS),)
+    np.testing.assert_allclose(vectorized, per_sample, rtol=0.03)
+    assert np.all(np.diff(vectorized) > 0)
+
+
+def test_lead_time_window_is_clamped_to_the_horizon():
+    np.random.seed(3)
+    distributions = _daily_demand_distributions(n_days=3)
+    samples = _agent(vectorized=True)._sample_lead_time_demand_vectorized(len(distributions) - 1, distributions, 1000)
+    # LEAD_TIME draws of the last day's distribution
+    assert samples.mean() == pytest.approx(LEAD_TIME * (0.9 * 6.0 * 5.0 + 0.1 * 10.0), rel=0.1)
@@ -0,0 +1,129 @@
+import functools
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pyarrow.compute as pc
+import pytest
+
+from safety_stock_experimentations.agent import BaseAgent, SafetyStockAgent
+from safety_stock_experimentations.demand_distribution import SingleGammaLowVariance
+from safety_stock_experimentations.demand_distribution_parameters import GammaParameterRange
+from safety_stock_experimentations.results_store import ResultsStore
+from safety_stock_experimentations.sweep import SweepExecutor
+
+ENVIRONMENT_CONFIGS = {0: {"name": "Gamma", "class": SingleGammaLowVariance}}
+AGENT_CONFIGS = {
+    0: {"name": "Historical Demand Agent", "class": BaseAgent},
+    1: {"name": "Safety Stock Agent", "class": SafetyStockAgent},
+}
+SERVICE_LEVELS = [0.90, 0.95]
+
+
+def _sweep(
+    results_dir, environment_configs=ENVIRONMENT_CONFIGS, agent_configs=AGENT_CONFIGS, n_trials=2, **options
+) -> SweepExecutor:
+    return SweepExecutor(
+        environment_configs,
+        agent_configs,
+        SERVICE_LEVELS,
+        n_trials=n_trials,
+        max_workers=1,
+        results_store=ResultsStore(results_dir),
+        progress_interval=None,
+        **options,
+    )
+
+
+def test_rerun_of_the_same_sweep_resumes(tmp_path):
+    assert len(_sweep(tmp_path).run()) == 2 * 2 * 2
+    assert _sweep(tmp_path).run() == []
+    assert len(_sweep(tmp_path, n_trials=3).run()) == 2 * 2  # the third trial only
+
+
+def test_store_takes_runs_of_new_agents(tmp_path):
+    _sweep(tmp_path, agent_configs={0: AGENT_CONFIGS[0]}).run()
+    assert len(_sweep(tmp_path).run()) == 2 * 2  # only the new agent's runs
+    assert len(ResultsStore(tmp_path).completed_runs()) == 2 * 2 * 2
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"seed": 99},
+        {"common_random_numbers": False},
+        {
+            "environment_configs": {
+                0: {
+                    "name": "Gamma",
+                    "class": functools.partial(SingleGammaLowVariance, GammaParameterRange(shape_min=2)),
+                }
+            }
+        },
+        {"agent_configs": {0: {"name": "Historical Demand Agent", "class": SafetyStockAgent}}},
+    ],
+)
+def test_store_of_a_different_sweep_is_refused(tmp_path, options):
+    _sweep(tmp_path).run()
+    with pytest.raises(ValueError, match="different sweep"):
+        _sweep(tmp_path, **options).run()
+
+
+def test_store_without_fingerprint_is_refused(tmp_path):
+    _sweep(tmp_path).run()
+    (tmp_path / "sweep.json").unlink()
+    with pytest.raises(ValueError, match="older version"):
+        _sweep(tmp_path).run()
+
+
+def test_sweep_writes_and_resumes_without_pandas(tmp_path):
+    # in a fresh interpreter: the test session has imported pandas already
+    script = f"""
+import sys
+sys.path.insert(0, {str(Path(__file__).parent)!r})
+import conftest
+from test_results_store import _sweep
+_sweep({str(tmp_path)!r}, n_trials=1).run()
+assert len(_sweep({str(tmp_path)!r}).run()) == 2 * 2
+assert "pandas" not in sys.modules, "pandas was imported"
+"""
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+
+def test_summaries_and_daily_metrics_round_trip(tmp_path):
+    # names that need quoting in the partition directories
+    environment_configs = {0: {"name": "90/10 Gamma=Poisson", "class": SingleGammaLowVariance}}
+    summaries = _sweep(tmp_path, environment_configs=environment_configs).run()
+    store = ResultsStore(tmp_path)
+
+    stored_summaries = store.load_summaries().set_index(["agent", "day", "service_level"])
+    assert len(stored_summaries) == len(summaries) == 2 * 2 * 2
+    daily_metrics = store.load_daily_metrics()
+    for summary in summaries:
+        stored = stored_summaries.loc[(summary["agent"], summary["day"], summary["service_level"])]
+        assert stored["environment"] == "90/10 Gamma=Poisson"
+        for name, value in summary.items():
+            if name not in ("agent", "day", "service_level", "environment", "daily_performance_metrics"):
+                assert stored[name] == pytest.approx(value, nan_ok=True), name
+
+        run = daily_metrics[
+            (daily_metrics["agent"] == summary["agent"])
+            & (daily_metrics["trial_number"] == summary["day"])
+            & (daily_metrics["service_level"] == summary["service_level"])
+        ]
+        for name, values in summary["daily_performance_metrics"].items():
+            np.testing.assert_allclose(run[name].to_numpy(), np.asarray(values, dtype=float), rtol=1e-6)
+
+    aggregated = store.aggregate_daily_metrics(["agent"], {"write_offs": ("write_offs", "sum")})
+    for agent, write_offs in zip(aggregated["agent"], aggregated["write_offs"]):
+        expected = sum(
+            np.sum(summary["daily_performance_metrics"]["write_offs"])
+            for summary in summaries
+            if summary["agent"] == agent
+        )
+        assert write_offs == pytest.approx(expected, rel=1e-5)
+
+    filtered = store.load_daily_metrics(columns=["day", "demand"], filter=pc.field("trial_number") == 1)
+    assert set(filtered.columns) == {"environment", "agent", "day", "demand"}
+    assert len(filtered) == len(daily_metrics) // 2
@@ -0,0 +1,138 @@
+import functools
+
+import numpy as np
+import pytest
+from scipy import stats
+
+from safety_stock_experimentations.agent import BaseAgent, MonteCarloAgent
+from safety_stock_experimentations.config import HISTO_DAYS, SIM_DAYS
+from safety_stock_experimentations.demand_distribution import GammaPoisson, SingleGammaLowVariance
+from safety_stock_experimentations.lead_time_demand import (
+    lead_time_days,
+    lead_time_demand_from_uniforms,
+    lead_time_demand_quantiles,
+    lead_time_dimension,
+    lead_time_uniforms,
+)
+from safety_stock_experimentations.sweep import SweepExecutor
+
+QMC_MODES = ["sobol", "antithetic", "latin_hypercube"]
+N_SAMPLES = 256
+TIME_PERIOD = 400
+
+
+@pytest.fixture(scope="module")
+def environments():
+    np.random.seed(5)
+    return {
+        "single_gamma": SingleGammaLowVariance().build_environment(),
+        "mixture": GammaPoisson().build_environment(),
+    }
+
+
+@pytest.mark.parametrize("sampling", ["random", *QMC_MODES])
+def test_uniforms_have_uniform_marginals(sampling):
+    uniforms = lead_time_uniforms(sampling, N_SAMPLES, 3, np.random.default_rng(0), n_sets=4)
+    assert uniforms.shape == (4, N_SAMPLES, 3)
+    assert np.all((uniforms >= 0) & (uniforms < 1))
+    for points in uniforms.reshape(-1, 3).T:
+        assert stats.kstest(points, "uniform").pvalue > 0.01
+
+
+@pytest.mark.parametrize("sampling", ["sobol", "latin_hypercube"])
+def test_stratified_modes_fill_every_stratum_equally(sampling):
+    # 16 equal bins per dimension hold N_SAMPLES / 16 points each, in every set
+    uniforms = lead_time_uniforms(sampling, N_SAMPLES, 3, np.random.default_rng(1), n_sets=3)
+    counts = np.apply_along_axis(lambda points: np.bincount((points * 16).astype(int), minlength=16), 1, uniforms)
+    assert np.all(counts == N_SAMPLES // 16)
+
+
+def test_antithetic_points_come_in_mirrored_pairs():
+    uniforms = lead_time_uniforms("antithetic", N_SAMPLES, 3, np.random.default_rng(2), n_sets=2)
+    np.testing.assert_allclose(uniforms[:, : N_SAMPLES // 2] + uniforms[:, N_SAMPLES // 2 :], 1.0)
+
+
+@pytest.mark.parametrize("environment_name", ["single_gamma", "mixture"])
+@pytest.mark.parametrize("sampling", ["random", *QMC_MODES])
+def test_lead_time_demand_by_inversion_matches_sampling(environments, environment_name, sampling):
+    environment = environments[environment_name]
+    days = lead_time_days(environment, np.array([TIME_PERIOD]))
+    uniforms = lead_time_uniforms(sampling, 20_000, lead_time_dimension(environment), np.random.default_rng(3))
+    inverted = lead_time_demand_from_uniforms(environment, days, uniforms)[0]
+    sampled = environment.sample(
+        np.broadcast_to(days[0], (20_000, days.shape[1])), np.random.default_rng(4)
+    ).sum(axis=1)
+
+    assert inverted.mean() == pytest.approx(environment.mean_demand[days[0]].sum(), rel=0.01)
+    for probability in (0.5, 0.9, 0.95):
+        assert np.quantile(inverted, probability) == pytest.approx(np.quantile(sampled, probability), rel=0.02)
+
+
+@pytest.mark.parametrize("sampling", QMC_MODES)
+def test_variance_drops_against_random_sampling(environments, sampling):
+    # spread over independent seeds of the estimated mean and 95% quantile of
+    # lead-time demand, at equal sample counts
+    environment = environments["single_gamma"]
+    days = lead_time_days(environment, np.array([TIME_PERIOD]))
+
+    def estimates(mode):
+        samples = np.array(
+            [
+                lead_time_demand_from_uniforms(
+                    environment,
+                    days,
+                    lead_time_uniforms(mode, N_SAMPLES, lead_time_dimension(environment), np.random.default_rng(seed)),
+                )[0]
+                for seed in range(100)
+            ]
+        )
+        return samples.mean(axis=1), np.quantile(samples, 0.95, axis=1)
+
+    random_means, random_quantiles = estimates("random")
+    means, quantiles = estimates(sampling)
+    assert means.var() < random_means.var() / 2
+    if sampling != "antithetic":  # mirroring balances the mean, not the tails
+        assert quantiles.var() < random_quantiles.var()
+
+
+def test_sampled_schedule_matches_day_by_day_estimates(environments):
+    environment = environments["mixture"]
+    agent = MonteCarloAgent(environment, [0.9, 0.95], analytic=False, sampling="sobol", mc_sims=N_SAMPLES)
+    schedule = agent.compute_reorder_point_schedule()
+
+    assert schedule.shape == (2, SIM_DAYS - HISTO_DAYS)
+    assert np.all(np.diff(schedule, axis=0) > 0)
+    # both against the exact quantiles of the default engine
+    exact = lead_time_demand_quantiles(environment, np.arange(HISTO_DAYS, SIM_DAYS), [0.9, 0.95])
+    relative_errors = np.abs(schedule / exact - 1)
+    assert relative_errors.mean() < 0.02 and relative_errors.max() < 0.1
+    np.testing.assert_allclose(
+        agent.estimate_reorder_point(TIME_PERIOD)[0], exact[:, TIME_PERIOD - HISTO_DAYS], rtol=0.1
+    )
+    standard_errors = agent.reorder_point_standard_errors()
+    assert standard_errors.shape == (2,) and np.all(np.isfinite(standard_errors)) and np.all(standard_errors > 0)
+
+
+def test_sampling_modes_other_than_random_need_sampled_reorder_points(environments):
+    with pytest.raises(ValueError, match="analytic=False"):
+        MonteCarloAgent(environments["mixture"], 0.95, analytic=True, sampling="sobol")
+    with pytest.raises(ValueError, match="Unknown sampling mode"):
+        MonteCarloAgent(environments["mixture"], 0.95, analytic=False, sampling="halton")
+
+
+def test_sweep_summaries_carry_the_reorder_point_standard_error():
+    sobol_agent = functools.partial(MonteCarloAgent, analytic=False, sampling="sobol", mc_sims=64)
+    summaries = SweepExecutor(
+        {0: {"name": "Gamma", "class": SingleGammaLowVariance}},
+        {0: {"name": "Base", "class": BaseAgent}, 1: {"name": "Sobol", "class": sobol_agent}},
+        [0.9, 0.95],
+        n_trials=1,
+        max_workers=1,
+        progress_interval=None,
+    ).run()
+
+    standard_errors = {
+        (summary["agent"], summary["service_level"]): summary["reorder_point_standard_error"] for summary in summaries
+    }
+    assert np.isnan(standard_errors["Base", 0.9]) and np.isnan(standard_errors["Base", 0.95])
+    assert 0 < standard_errors["Sobol", 0.9] < standard_errors["Sobol", 0.95]
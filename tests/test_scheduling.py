@@ -0,0 +1,99 @@
+import pytest
+
+from safety_stock_experimentations import sweep
+from safety_stock_experimentations.agent import BaseAgent, SafetyStockAgent
+from safety_stock_experimentations.demand_distribution import (
+    GammaGammaHighVariance,
+    GammaPoisson,
+    SingleGammaLowVariance,
+)
+from safety_stock_experimentations.scheduling import CostModel, SweepSchedule, cost_key, projected_makespan
+from safety_stock_experimentations.sweep import SweepExecutor
+
+ENVIRONMENT_CONFIGS = {
+    0: {"name": "Gamma", "class": SingleGammaLowVariance},
+    1: {"name": "Gamma Poisson", "class": GammaPoisson},
+}
+AGENT_CONFIGS = {
+    0: {"name": "Historical Demand Agent", "class": BaseAgent},
+    1: {"name": "Safety Stock Agent", "class": SafetyStockAgent},
+}
+
+
+def _sweep(cost_model=None) -> SweepExecutor:
+    return SweepExecutor(
+        ENVIRONMENT_CONFIGS,
+        AGENT_CONFIGS,
+        [0.9, 0.95],
+        n_trials=2,
+        max_workers=1,
+        progress_interval=None,
+        cost_model=cost_model,
+    )
+
+
+@pytest.fixture
+def dispatched(monkeypatch) -> list[tuple[str, int]]:
+    # (environment, trial) of each task, in the order run_sweep_task is called
+    order = []
+    run_sweep_task = sweep.run_sweep_task
+
+    def recording_run_sweep_task(task):
+        order.append((task.environment_info["name"], task.trial_number))
+        return run_sweep_task(task)
+
+    monkeypatch.setattr(sweep, "run_sweep_task", recording_run_sweep_task)
+    return order
+
+
+def test_cost_model_estimates_and_persists(tmp_path):
+    cost_model = CostModel(tmp_path / "task_costs.json")
+    assert cost_model.estimate("unknown") == 1.0
+    cost_model.record("a", 2.0)
+    cost_model.record("a", 4.0)
+    cost_model.record("b", 9.0)
+    assert cost_model.estimate("a") == pytest.approx(3.0)  # mean of the recorded runs
+    assert cost_model.estimate("unknown") == pytest.approx(6.0)  # mean over the known keys
+    cost_model.save()
+
+    reloaded = CostModel(tmp_path / "task_costs.json")
+    assert "a" in reloaded and "unknown" not in reloaded
+    assert reloaded.estimate("a") == pytest.approx(3.0) and reloaded.runs == {"a": 2, "b": 1}
+
+
+def test_schedule_orders_longest_first_and_projects_the_makespan():
+    schedule = SweepSchedule([1.0, 5.0, 3.0, 2.0], workers=2)
+    assert schedule.order == [1, 2, 3, 0]
+    assert projected_makespan([5.0, 3.0, 2.0, 1.0], 2) == 6.0
+    schedule.record(1, 10.0)  # twice as slow as estimated
+    assert schedule.projected_seconds() == pytest.approx(projected_makespan([6.0, 4.0, 2.0], 2))
+
+
+def test_tasks_are_dispatched_longest_first(dispatched):
+    cost_model = CostModel()
+    for agent_info in AGENT_CONFIGS.values():
+        cost_model.record(cost_key(agent_info["class"], SingleGammaLowVariance), 1.0)
+        cost_model.record(cost_key(agent_info["class"], GammaPoisson), 5.0)
+    _sweep(cost_model).run()
+    assert [environment for environment, _ in dispatched] == ["Gamma Poisson"] * 2 + ["Gamma"] * 2
+
+
+def test_uncalibrated_keys_are_dispatched_first(dispatched):
+    cost_model = CostModel()
+    for agent_info in AGENT_CONFIGS.values():
+        cost_model.record(cost_key(agent_info["class"], SingleGammaLowVariance), 5.0)
+    # pulls the estimate of unknown keys below the Gamma tasks
+    cost_model.record(cost_key(BaseAgent, GammaGammaHighVariance), 0.01)
+    _sweep(cost_model).run()
+    # one task calibrates the Gamma Poisson keys, then the estimates order the rest
+    assert dispatched == [("Gamma Poisson", 0), ("Gamma", 0), ("Gamma", 1), ("Gamma Poisson", 1)]
+    assert all(cost_key(agent_info["class"], GammaPoisson) in cost_model for agent_info in AGENT_CONFIGS.values())
+
+
+def test_dispatch_order_does_not_change_the_results():
+    def key(summary):
+        return summary["environment"], summary["agent"], summary["day"], summary["service_level"]
+
+    unscheduled = {key(summary): summary["fill_rate"] for summary in _sweep().run()}
+    scheduled = {key(summary): summary["fill_rate"] for summary in _sweep(CostModel()).run()}
+    assert scheduled == unscheduled
@@ -0,0 +1,102 @@
+import datetime as dt
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from safety_stock_experimentations.config import SIM_DAYS, SIMULATION_START_DATE
+from safety_stock_experimentations.demand_distribution import GammaPoisson
+from safety_stock_experimentations.seasonality import (
+    BUILT_IN_SEASONALITY,
+    MONTH_SEASONALITY_MULTIPLIERS,
+    WEEKDAY_SEASONALITY_MULTIPLIERS,
+    SeasonalityCurves,
+    SeasonalityProfile,
+    load_seasonality_profile,
+)
+
+
+def _previous_daily_multiplier(start_date: dt.date, time_step: int) -> float:
+    # the per-day formula the builders used before the profiles
+    current_date = start_date + dt.timedelta(days=time_step)
+    month_multiplier = MONTH_SEASONALITY_MULTIPLIERS.get(current_date.month, 1.0)
+    weekday_multiplier = WEEKDAY_SEASONALITY_MULTIPLIERS.get(current_date.weekday(), 1.0)
+    return month_multiplier * weekday_multiplier
+
+
+@pytest.mark.parametrize("start_date", [SIMULATION_START_DATE, dt.date(1999, 12, 27), dt.date(2024, 2, 28)])
+def test_built_in_profile_matches_the_previous_formula(start_date):
+    n_days = 3 * 365 + 40
+    expected = [_previous_daily_multiplier(start_date, time_step) for time_step in range(n_days)]
+    np.testing.assert_array_equal(BUILT_IN_SEASONALITY.multipliers(n_days, start_date), expected)
+
+
+def test_builders_read_the_profile_vector_day_by_day():
+    builder = GammaPoisson()
+    multipliers = builder._get_seasonality_multipliers(SIM_DAYS)
+    assert not multipliers.flags.writeable
+    for time_step in (0, 59, 400, SIM_DAYS - 1, SIM_DAYS + 100):
+        expected = _previous_daily_multiplier(SIMULATION_START_DATE, time_step)
+        assert builder._get_daily_seasonality_multiplier(time_step) == expected
+        if time_step < SIM_DAYS:
+            assert multipliers[time_step] == expected
+
+
+def test_holidays_multiply_their_dates():
+    profile = SeasonalityProfile.from_dict(
+        {"holidays": {"12-24": 2.0, "02-29": 3.0, "2024-07-04": 1.5, "2030-01-01": 9.0}}
+    )
+    start_date = dt.date(2023, 1, 1)
+    multipliers = profile.multipliers(2 * 365 + 1, start_date)
+
+    def on(date):
+        return multipliers[(date - start_date).days]
+
+    assert on(dt.date(2023, 12, 24)) == on(dt.date(2024, 12, 24)) == 2.0
+    assert on(dt.date(2024, 2, 29)) == 3.0 and on(dt.date(2023, 3, 1)) == 1.0
+    assert on(dt.date(2024, 7, 4)) == 1.5 and on(dt.date(2023, 7, 4)) == 1.0
+    assert np.count_nonzero(multipliers != 1.0) == 4  # the one-off past the horizon is left out
+
+
+def test_profile_round_trips_through_json(tmp_path):
+    profile = SeasonalityProfile.from_dict(
+        {"name": "shop", "month": {"12": 1.4}, "weekday": {"6": 0.5}, "holidays": {"01-01": 0.0}}
+    )
+    path = tmp_path / "shop.json"
+    path.write_text(json.dumps(profile.to_dict()))
+    assert load_seasonality_profile(path) == profile
+
+
+@pytest.mark.parametrize(
+    "document, message",
+    [
+        ({"month": {"13": 1.1}}, "months"),
+        ({"weekday": {"7": 1.1}}, "weekdays"),
+        ({"holidays": {"02-30": 1.1}}, "holiday"),
+        ({"season": {}}, "Unknown"),
+    ],
+)
+def test_invalid_profiles_are_refused(document, message):
+    with pytest.raises(ValueError, match=message):
+        SeasonalityProfile.from_dict(document)
+
+
+def test_curves_index_days_of_the_year_across_leap_years():
+    frame = pd.DataFrame(
+        {"curve": ["peak", "peak", "peak"], "day_of_year": [1, 60, 61], "multiplier": [2.0, 3.0, 4.0]}
+    )
+    curves = SeasonalityCurves.from_frame(frame)
+    start_date = dt.date(2023, 1, 1)
+    rows = curves.sku_multipliers(["peak", ""], 2 * 365 + 1, start_date)
+
+    def on(date):
+        return rows[:, (date - start_date).days]
+
+    np.testing.assert_array_equal(on(dt.date(2023, 1, 1)), [2.0, 1.0])
+    np.testing.assert_array_equal(on(dt.date(2024, 2, 29)), [3.0, 1.0])
+    np.testing.assert_array_equal(on(dt.date(2023, 3, 1)), [4.0, 1.0])
+    np.testing.assert_array_equal(on(dt.date(2024, 3, 1)), [4.0, 1.0])
+    assert np.count_nonzero(rows[0] != 1.0) == 5
+    with pytest.raises(ValueError, match="Unknown seasonality curve"):
+        curves.sku_multipliers(["trough"])
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from safety_stock_experimentations.agent import BaseAgent, SafetyStockAgent
+from safety_stock_experimentations.demand_distribution import SingleGammaLowVariance
+from safety_stock_experimentations.service_level_solver import ServiceLevelSolver
+from safety_stock_experimentations.sweep import SweepExecutor
+
+ENVIRONMENT_CONFIGS = {0: {"name": "Gamma", "class": SingleGammaLowVariance}}
+AGENT_CONFIGS = {
+    0: {"name": "Historical Demand Agent", "class": BaseAgent},
+    1: {"name": "Safety Stock Agent", "class": SafetyStockAgent},
+}
+N_TRIALS = 3
+
+
+def _solver(goal, **options) -> ServiceLevelSolver:
+    return ServiceLevelSolver(
+        ENVIRONMENT_CONFIGS, AGENT_CONFIGS, kpi="fill_rate", goal=goal, n_trials=N_TRIALS, **options
+    )
+
+
+def test_bracket_converges_on_the_smallest_target_meeting_the_goal():
+    solver = _solver(0.97, tolerance=0.002)
+    solution = solver.solve(0, 1)
+
+    assert solution.service_level == solution.upper_bound
+    assert solution.upper_bound - solution.lower_bound <= 0.002
+    assert solution.achieved >= 0.97
+    # the target just below the bracket misses the goal
+    assert solver.evaluate(0, 1, [solution.lower_bound])[round(solution.lower_bound, 12)].mean() < 0.97
+    assert solution.runs == solution.targets_evaluated * N_TRIALS
+
+
+def test_kpi_is_monotone_in_the_target():
+    targets = np.linspace(0.6, 0.99, 8)
+    kpi_values = _solver(0.97).evaluate(0, 1, targets)
+    means = [kpi_values[round(float(target), 12)].mean() for target in targets]
+    assert np.all(np.diff(means) >= 0)
+
+
+def test_goal_met_at_the_lower_bound_needs_no_bracketing():
+    solution = _solver(0.5, bounds=(0.6, 0.99)).solve(0, 1)
+    assert solution.service_level == solution.lower_bound == solution.upper_bound == 0.6
+    assert solution.targets_evaluated == 2
+
+
+def test_unreachable_goal_has_no_service_level():
+    # the historical demand agent ignores its target
+    solution = _solver(0.999).solve(0, 0)
+    assert solution.service_level is None
+    assert solution.achieved < 0.999
+    assert solution.targets_evaluated == 2
+
+
+def test_evaluations_agree_with_the_sweep():
+    targets = [0.9, 0.95]
+    kpi_values = _solver(0.97).evaluate(0, 1, targets)
+    summaries = SweepExecutor(
+        ENVIRONMENT_CONFIGS,
+        {1: AGENT_CONFIGS[1]},
+        targets,
+        n_trials=N_TRIALS,
+        max_workers=1,
+        progress_interval=None,
+    ).run()
+    for summary in summaries:
+        assert kpi_values[summary["service_level"]][summary["day"]] == pytest.approx(summary["fill_rate"])
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from safety_stock_experimentations.simulation_plots import lttb_indices
+
+
+@pytest.mark.parametrize("n, n_out", [(1000, 100), (365, 3), (101, 100), (50, 7)])
+def test_lttb_keeps_the_ends_and_n_out_increasing_points(n, n_out):
+    x = np.arange(n)
+    y = np.random.default_rng(n).normal(size=n).cumsum()
+    indices = lttb_indices(x, y, n_out)
+    assert len(indices) == n_out
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+@pytest.mark.parametrize("n_out", [50, 51, 2])
+def test_lttb_returns_every_point_of_a_short_series(n_out):
+    x = np.arange(50)
+    np.testing.assert_array_equal(lttb_indices(x, np.sin(x), n_out), np.arange(50))
+
+
+def test_lttb_keeps_an_isolated_spike():
+    x = np.arange(500)
+    y = np.zeros(500)
+    y[237] = 10.0
+    assert 237 in lttb_indices(x, y, 20)